@@ -1,31 +1,80 @@
-import math as maths
+from time import perf_counter as timer
 from tkinter import mainloop
-from typing import List, Iterable
+from typing import List, Optional
 
-from .interface.pane import ParticleWidget
 from .interface.window import ExperimentWindow
-from .experiment import Experiment
+from .experiment import Experiment, lunar_orbit
 from .interface.style import Style
+from .scheduler import Scheduler
+from .worker import SimulationWorker
 from graph import MotionGraphHandler, Animation
-from mechanics import Gravity, Universe, Particle, Coords, Velocity
+from mechanics import ArrayUniverse, ConservationMonitor
+
+COLLECTION_THRESHOLD = 50 #particles, beyond which they are all drawn as one collection
+FORK_BUDGET = 0.25 #of each frame, at most, spent running forks
 
 
 class SimulationAnimation(Animation):
     playing = False
     experiment: Experiment
-    particle_widgets: Iterable[ParticleWidget]
+    scheduler: Scheduler
+    worker: Optional[SimulationWorker]
+    status = None
 
-    def __init__(self, experiment: Experiment, particle_widgets: Iterable[ParticleWidget]):
-        super().__init__()
+    def __init__(self, experiment: Experiment, scheduler: Scheduler=None, worker: SimulationWorker=None):
+        self.scheduler = scheduler or Scheduler()
+        super().__init__(interval=self.scheduler.interval)
         self.experiment = experiment
-        self.particle_widgets = particle_widgets
+        self.worker = worker
 
     def step(self, n: int, graph, universe):
-        for x in range(int(self.experiment.speed)):
-            universe.tick(n)
+        # Playback Speed is in ticks per frame, at the scheduler's target frame rate
+        rate = self.experiment.speed * universe.TICK_LENGTH * self.scheduler.fps
+        if self.worker is None:
+            self.scheduler.run(universe, rate)
+        else:
+            self.worker.follow(universe, rate)
+        self.run_forks(graph.forks, universe.time)
+        # the simulation pane refreshes itself, at its own rate
         graph.update_positions()
-        for particle_widget in self.particle_widgets:
-            particle_widget.update()
+        self.show_status(graph, rate)
+
+    def run_forks(self, forks: list, time: float):
+        """Tick `forks` towards `time`, a tick of each at a time, for at most `FORK_BUDGET` of a frame
+
+        Forks which can't keep up within that, say with shorter ticks, catch up over later frames.
+        """
+        deadline = timer() + FORK_BUDGET / self.scheduler.fps
+        behind = [fork for fork in forks if fork.time + fork.TICK_LENGTH / 2 < time]
+        while behind and timer() < deadline:
+            for fork in behind:
+                fork.tick()
+            behind = [fork for fork in behind if fork.time + fork.TICK_LENGTH / 2 < time]
+
+    def show_status(self, graph, rate: float):
+        if self.status is None:
+            self.status = graph.animate(graph.figure.text(0.01, 0.01, "", color="red", fontsize=8))
+        lines = []
+        # in the background, it's the worker's scheduler that knows how the simulation is keeping up
+        runner = self.scheduler if self.worker is None else self.worker
+        if runner.behind and rate:
+            lines.append("Falling behind: {:.0%} of the set speed".format(runner.speed / rate))
+        monitor = graph.universe.monitor
+        if monitor is not None and monitor.latest is not None and monitor.latest['energy_error'] > monitor.threshold:
+            lines.append("Energy error {:.1e}: try a tick length of {:.3g} s".format(
+                float(monitor.latest['energy_error']), monitor.suggested_tick_length()))
+        self.status.set_text("\n".join(lines))
+
+    def play(self):
+        self.scheduler.reset()
+        if self.worker is not None:
+            self.worker.play()
+        super().play()
+
+    def pause(self):
+        if self.worker is not None:
+            self.worker.pause()
+        super().pause()
 
 
 class App:
@@ -38,27 +87,35 @@ class App:
         self.experiment_windows = []
 
     def demo(self):
-        experiment = Experiment("Lunar Orbit", Universe([Gravity(6.67408e-11)]))
+        self.load_experiment(lunar_orbit(), monitor=True)
 
-        experiment.universe <<= Particle("moon", 7.342e22, Coords(384.4e6, 0, (384.4e6 * maths.tan(maths.radians(5.14)))), Velocity(1022, 0), colour="grey")
-        experiment.universe <<= Particle("earth", 5.97237e24, Coords(0, 0, 0), Velocity(0, 0), colour="blue")
-        self.load_experiment(experiment)
+    def load_experiment(self, experiment: Experiment, background: bool=False, monitor: bool=False):
+        """Open a window simulating `experiment`, in a separate worker process if `background`
 
-    def load_experiment(self, experiment: Experiment):
+        With `monitor`, its energy is checked as it goes, warning if the tick length is too long;
+        each sample can cost as much again as a tick.
+        """
         universe = experiment.universe.copy()
+        worker = SimulationWorker(universe) if background else None
+        if monitor and worker is None and isinstance(universe, ArrayUniverse):
+            # in the background, the universe is ticked in another process, out of the monitor's sight
+            ConservationMonitor().attach(universe)
         window = ExperimentWindow(experiment, universe, style=self.style)
         window.iconbitmap(default='./app/rsc/icon.ico')
         axes = window.figure.add_subplot(111, projection='3d')
-        graph = MotionGraphHandler(universe, figure=window.figure, axes=axes)
+        graph = MotionGraphHandler(universe, figure=window.figure, axes=axes, blit=True,
+                                   collection=len(universe.particles) > COLLECTION_THRESHOLD)
         window.add_simulation(graph)
         graph.ensure_lines()
 
         graph.figure.suptitle(experiment.name)
-        graph.add_animation(SimulationAnimation(experiment, window.simulation_pane))
+        graph.add_animation(SimulationAnimation(experiment, worker=worker))
 
         graph.fit_all()
         window.simulation_pane.load_particles()
 
         self.experiment_windows.append(window)
         mainloop()
+        if worker is not None:
+            worker.stop(universe)
 
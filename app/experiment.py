@@ -1,4 +1,7 @@
-from mechanics import Universe
+import math as maths
+from typing import Callable, Dict
+
+from mechanics import Universe, ArrayUniverse, Gravity, Particle, Coords, Velocity, Leapfrog
 
 class Experiment:
     name: str
@@ -8,3 +11,17 @@ class Experiment:
     def __init__(self, name: str, universe: Universe=None):
         self.name = name
         self.universe = universe or Universe()
+
+
+def lunar_orbit() -> Experiment:
+    experiment = Experiment("Lunar Orbit", ArrayUniverse([Gravity(6.67408e-11)], integrator=Leapfrog()))
+
+    experiment.universe <<= Particle("moon", 7.342e22, Coords(384.4e6, 0, (384.4e6 * maths.tan(maths.radians(5.14)))), Velocity(1022, 0), colour="grey")
+    experiment.universe <<= Particle("earth", 5.97237e24, Coords(0, 0, 0), Velocity(0, 0), colour="blue")
+    return experiment
+
+
+# Built in experiments, by the name they can be loaded with
+EXPERIMENTS: Dict[str, Callable[[], Experiment]] = {
+    'lunar-orbit': lunar_orbit,
+}
@@ -4,10 +4,14 @@ from typing import List, Dict, Any, Union
 
 from graph import Line3DHandler, MotionGraphHandler
 from app.experiment import Experiment
-from mechanics import Gravity, Universe, Particle, Velocity, Coords
+from mechanics import Gravity, Universe, Particle, Velocity, Coords, instrumentation
 from .input import UserEntry, Vector3DEntry, ResetableUserEntry, ResetableVector3DEntry
 
 
+VISIBLE_ROWS = 6 #particles listed at once
+REFRESH_RATE = 5 #times a second
+
+
 class StackReplacementException(Exception): pass
 
 class ListPane(Frame):
@@ -66,16 +70,29 @@ class SimpleListPane(ListPane):
 
 
 class SimulationPane(ListPane):
+    """The universe's particles, as a scrolling list `rows` long
+
+    Widgets are only built for the particles in view, and are put away again when they are
+    scrolled out of it, unless they are being edited, so a universe of any size costs the same.
+    The values they show are refreshed `refresh_rate` times a second, however often the
+    simulation is drawn.
+    """
     simulation: MotionGraphHandler
     universe: Universe
     experiment: Experiment
     buttons: Frame
+    rows: int
+    refresh_rate: float
+    first: int = 0 #index of the particle at the top of the list
+    particle_widgets: Dict[Particle, 'ParticleWidget']
 
     def __init__(self, master, experiment: Experiment, universe: Universe, simulation: MotionGraphHandler=None,
                  entryconf: Dict[str, Any]=None,
                  labelconf: Dict[str, Any]=None,
                  specialbuttonconf: Dict[str, Any]=None,
                  buttonconf: Dict[str, Any]=None,
+                 rows: int=VISIBLE_ROWS,
+                 refresh_rate: float=REFRESH_RATE,
                  **kwargs
                  ):
         super().__init__(master, 'Simulation', labelconf=labelconf, **kwargs)
@@ -93,6 +110,18 @@ class SimulationPane(ListPane):
         self.add_particle = Button(self.buttons, command=self.add_particle, text='+ Add', **self.buttonconf)
         self.add_particle.pack(side=LEFT)
 
+        self.rows = rows
+        self.refresh_rate = refresh_rate
+        self.particle_widgets = {}
+        self.viewport = Frame(self, self.frameconf)
+        self.viewport.pack(fill=BOTH, expand=1)
+        self.scrollbar = Scrollbar(self.viewport, command=self.scroll)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        # added to, rather than replacing, whatever else the wheel is bound to, and only acted on over the list
+        self._wheel_bindings = [(sequence, self.bind_all(sequence, self._wheel, add='+'))
+                                for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>')]
+        self.after(self.interval, self.refresh)
+
     def add_particle(self):
         window = Toplevel(**self.frameconf)
 
@@ -161,17 +190,79 @@ class SimulationPane(ListPane):
         button.grid(row=4, column=1, sticky=E)
 
     def load_particles(self):
-        self.clear()
-        for experiment_particle, universe_particle in zip(self.experiment.universe.particles, self.universe.particles):
-            self.append(ParticleWidget(self, self.experiment.universe, self.universe, self.simulation,
-                                       experiment_particle, universe_particle,
-                                       self.simulation.particle_lines[universe_particle],
-                                       entryconf=self.entryconf,
-                                       specialbuttonconf=self.specialbuttonconf,
-                                       buttonconf=self.buttonconf,
-                                       labelconf=self.labelconf,
-                                       **self.frameconf
-                                       ))
+        self.sync()
+
+    @property
+    def interval(self) -> int:
+        """Milliseconds between refreshes"""
+        return max(int(1000 / self.refresh_rate), 1)
+
+    def refresh(self):
+        with instrumentation.phase('widgets'):
+            self.sync()
+            for widget in self:
+                widget.update()
+        self.after(self.interval, self.refresh)
+
+    def sync(self):
+        """Show widgets for the particles now in view, building only those not already there"""
+        particles = self.universe.particles
+        self.first = max(min(self.first, len(particles) - self.rows), 0)
+        visible = particles[self.first:self.first + self.rows]
+        if self.simulation is not None and [widget.universe_particle for widget in self] != visible:
+            for widget in self:
+                widget.pack_forget()
+            self.widgets = []
+            for index, particle in enumerate(visible, self.first):
+                if particle not in self.particle_widgets:
+                    self.particle_widgets[particle] = self.build(self.experiment.universe.particles[index], particle)
+                self.append(self.particle_widgets[particle])
+
+            shown, existing = set(visible), set(particles)
+            for particle, widget in list(self.particle_widgets.items()):
+                if particle not in existing or particle not in shown and not widget.editing:
+                    widget.destroy()
+                    del self.particle_widgets[particle]
+
+        if particles:
+            self.scrollbar.set(self.first / len(particles), (self.first + len(visible)) / len(particles))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def build(self, experiment_particle: Particle, universe_particle: Particle) -> 'ParticleWidget':
+        return ParticleWidget(self.viewport, self.experiment.universe, self.universe, self.simulation,
+                              experiment_particle, universe_particle,
+                              self.simulation.particle_lines.get(universe_particle),
+                              entryconf=self.entryconf,
+                              specialbuttonconf=self.specialbuttonconf,
+                              buttonconf=self.buttonconf,
+                              labelconf=self.labelconf,
+                              **self.frameconf
+                              )
+
+    def scroll(self, action: str, amount, units: str=None):
+        """Move the list as asked by its scrollbar"""
+        if action == MOVETO:
+            self.first = int(round(float(amount) * len(self.universe.particles)))
+        elif action == SCROLL:
+            self.first += int(amount) * (self.rows if units == PAGES else 1)
+        self.sync()
+
+    def _wheel(self, event):
+        # the widget under the pointer, as on some platforms the wheel goes to whichever has the focus
+        widget = self.winfo_containing(event.x_root, event.y_root)
+        viewport = str(self.viewport)
+        if widget is None or str(widget) != viewport and not str(widget).startswith(viewport + '.'):
+            return
+        self.scroll(SCROLL, -1 if event.num == 4 or event.delta > 0 else 1, UNITS)
+
+    def destroy(self):
+        for sequence, funcid in self._wheel_bindings:
+            # unbind_all would take everyone else's bindings with it, so just this one is taken out
+            script = self.tk.call('bind', 'all', sequence)
+            self.tk.call('bind', 'all', sequence, "\n".join(line for line in script.split("\n") if funcid not in line))
+            self.deletecommand(funcid)
+        super().destroy()
 
 
 class ExperimentPane(ListPane):
@@ -224,9 +315,11 @@ class UniversePane(ListPane):
                  entryconf: Dict[str, Any]=None,
                  buttonconf: Dict[str, Any]=None,
                  specialbuttonconf: Dict[str, Any]=None,
+                 window=None,
                  **conf
                  ):
         super().__init__(master, 'Universe', labelconf=labelconf, **conf)
+        self.window = window
         self.universe = universe
         self.experiment = experiment
         self.experiment_gfield = experiment.universe.fields[0]
@@ -243,6 +336,8 @@ class UniversePane(ListPane):
         self.buttons = Frame(self, **conf)
         self.testbutton = Button(self.buttons, text="Test", command=self.test_values, **(buttonconf or {}))
         self.applybutton = Button(self.buttons, text="Apply", command=self.apply_values, **(specialbuttonconf or {}))
+        self.forkbutton = Button(self.buttons, text="Fork", command=self.fork, **(buttonconf or {}))
+        self.unforkbutton = Button(self.buttons, text="Unfork", command=self.unfork, **(buttonconf or {}))
 
         self.update_values()
 
@@ -251,15 +346,32 @@ class UniversePane(ListPane):
         self.buttons.pack_configure(fill=X)
         self.applybutton.pack(side=RIGHT, padx=3, pady=6)
         self.testbutton.pack(side=RIGHT, padx=3, pady=6)
+        if window is not None:
+            self.forkbutton.pack(side=LEFT, padx=3, pady=6)
+            self.unforkbutton.pack(side=LEFT, padx=3, pady=6)
 
     def update_values(self):
         self.gconstentry.value = str(self.gfield.G)
 
     def apply_values(self):
         self.gfield.G = self.experiment_gfield.G = float(self.gconstentry.value)
+        self.universe.touch()
 
     def test_values(self):
         self.gfield.G = float(self.gconstentry.value)
+        self.universe.touch()
+
+    def fork(self):
+        """Branch the simulation from where it is now, with the G-constant entered, to run alongside it"""
+        fork = self.universe.fork()
+        gravities = [field for field in fork.fields if isinstance(field, Gravity)]
+        if not gravities:
+            raise ValueError("Only a universe with a Gravity field can be forked with another G-constant")
+        gravities[0].G = float(self.gconstentry.value)
+        self.window.simulation.add_fork(fork)
+
+    def unfork(self):
+        self.window.simulation.remove_forks()
 
 # Safety Imports
 from .particle import ParticleWidget
\ No newline at end of file
@@ -94,6 +94,10 @@ class ParticleWidget(Frame):
             )
             self.position['text'] = self._position_format.format(*self.universe_particle.position)
 
+    @property
+    def editing(self) -> bool:
+        return self.__edit_mode
+
     @property
     def value_widgets(self):
         yield self.colour_view
@@ -180,6 +184,7 @@ class ParticleWidget(Frame):
         self.universe_particle.mass = float(self.mass.value)
         self.universe_particle.position = Coords(*(float(c) for c in self.position.value))
         self.line.colour = self.colour_view['bg']
+        self.universe.touch()
 
     def apply_values(self):
         self.test_values()
@@ -211,12 +216,10 @@ class ParticleWidget(Frame):
         self.grid_all_default()
 
     def delete(self):
-        self.universe.particles.remove(self.universe_particle)
-        self.experiment_universe.particles.remove(self.experiment_particle)
+        self.universe.remove_particle(self.universe_particle)
+        self.experiment_universe.remove_particle(self.experiment_particle)
         self.simulation.particle_lines.pop(self.universe_particle)
-        self.line.xs = self.line.xs[-1:]
-        self.line.ys = self.line.ys[-1:]
-        self.line.zs = self.line.zs[-1:]
+        self.line.truncate(1)
         self.pack_forget()
         self.line.update()
 
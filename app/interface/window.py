@@ -6,7 +6,7 @@ from matplotlib.figure import Figure
 from app.experiment import Experiment
 from app.interface.style import Style
 from graph import FigureTk, MotionGraphHandler, PlayControls
-from mechanics import Universe
+from mechanics import Universe, instrumentation
 from .controls import SimulationControls
 from .pane import ListPane, ExperimentPane, UniversePane, SimulationPane
 
@@ -22,6 +22,8 @@ class ExperimentWindow(Tk):
     experiment_pane: ListPane
     simulation_pane: ListPane
     universe_pane: ListPane
+    timings = None
+    timings_interval: int = 500 #ms
 
 
     def __init__(self, experiment: Experiment, universe: Universe, simulation: MotionGraphHandler = None, style: Style=None, *args, **kwargs):
@@ -51,6 +53,7 @@ class ExperimentWindow(Tk):
                                           buttonconf=self.style.button_format,
                                           labelconf=self.style.label_format,
                                           entryconf=self.style.entry_format,
+                                          window=self,
                                           **self.style.frame_format
                                           )
         self.simulation_pane = SimulationPane(self, experiment, universe,
@@ -81,3 +84,27 @@ class ExperimentWindow(Tk):
         self.controls.grid(column=1, row=2)
         self.simulation = simulation
         self.simulation.axes.set_facecolor(self.style.graph_background)
+        self.show_timings_variable = BooleanVar(self, instrumentation.enabled)
+        self.timings_button = Checkbutton(self, text="Timings", variable=self.show_timings_variable,
+                                          command=lambda: self.show_timings(self.show_timings_variable.get()),
+                                          **self.style.label_format)
+        self.timings_button.grid(column=2, row=2, sticky=E)
+        if instrumentation.enabled:
+            self.show_timings()
+
+    def show_timings(self, show: bool=True):
+        """Turn timing on or off, overlaying the time each phase takes on the graph while it's on"""
+        instrumentation.enable(show)
+        if self.timings is None:
+            self.timings = self.simulation.animate(self.figure.text(0.01, 0.99, "", va='top', family='monospace',
+                                                                    fontsize=7, color='grey'))
+        self.timings.set_visible(show)
+        if show:
+            instrumentation.reset()
+            self._update_timings()
+
+    def _update_timings(self):
+        if not instrumentation.enabled:
+            return
+        self.timings.set_text(instrumentation.format_timings())
+        self.after(self.timings_interval, self._update_timings)
@@ -0,0 +1,54 @@
+import time
+from typing import Callable
+
+
+class Scheduler:
+    """Fits as many ticks into each frame as the simulated time rate asks for, and the frame allows
+
+    Each frame owes `rate` simulated seconds for every real second since the last one. Ticks are
+    run until that is paid off, or `budget` of the frame's time (at `fps`) has been used, leaving
+    the rest for drawing. Whatever is left over carries on to the next frame, up to `max_lag`
+    real seconds' worth, beyond which the simulation is simply running slower than real time.
+    """
+    fps: float
+    budget: float
+    max_lag: float
+
+    owed: float = 0 #simulated seconds
+    ticks: int = 0 #run in the last frame
+    speed: float = 0 #simulated seconds per real second, achieved in the last frame
+    behind: bool = False
+    _last: float = None
+
+    def __init__(self, fps: float=30, budget: float=0.75, max_lag: float=0.5, clock: Callable[[], float]=time.perf_counter):
+        self.fps = fps
+        self.budget = budget
+        self.max_lag = max_lag
+        self.clock = clock
+
+    @property
+    def interval(self) -> int:
+        """Milliseconds between frames"""
+        return max(int(1000 / self.fps), 1)
+
+    def run(self, universe, rate: float) -> int:
+        """Tick `universe` for this frame, aiming at `rate` simulated seconds per real second"""
+        start = self.clock()
+        elapsed = 1 / self.fps if self._last is None else start - self._last
+        self._last = start
+        self.owed = min(self.owed + rate * elapsed, rate * self.max_lag)
+
+        deadline = start + self.budget / self.fps
+        self.ticks = 0
+        while self.owed >= universe.TICK_LENGTH and self.clock() < deadline:
+            universe.tick(self.ticks)
+            self.owed -= universe.TICK_LENGTH
+            self.ticks += 1
+
+        self.speed = self.ticks * universe.TICK_LENGTH / elapsed if elapsed else 0
+        self.behind = self.owed >= universe.TICK_LENGTH
+        return self.ticks
+
+    def reset(self):
+        self.owed = 0
+        self._last = None
@@ -0,0 +1,232 @@
+import multiprocessing
+import time
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from mechanics import ArrayUniverse
+from .scheduler import Scheduler
+
+HEADER = 4 # int64s: the slot published last, how many times it's been published, the particle count and padding
+SLOTS = 3
+STATUS = 2 # float64s: the worker's speed in simulated seconds per real second, and whether it's falling behind
+ATTEMPTS = 4 # at reading a snapshot, before giving up on it for this frame
+
+
+class SnapshotBuffers:
+    """Three sets of position and velocity arrays in one shared memory block
+
+    The simulation writes each snapshot into the slot after the one it published last, then
+    marks it as the latest. Every slot has a sequence number, which is odd while it is being
+    written, so a reader copying it can tell if it was written over part way through, and try
+    again: with three slots, that only happens if the reader takes longer than two publishes.
+    Readers always take copies, so nothing outside the worker ever refers to the arrays.
+    """
+    memory: SharedMemory
+    header: np.ndarray
+    sequences: np.ndarray
+    times: np.ndarray
+    status: np.ndarray
+    positions: Tuple[np.ndarray, ...]
+    velocities: Tuple[np.ndarray, ...]
+
+    def __init__(self, count: int=None, name: str=None):
+        if name is None:
+            self.memory = SharedMemory(create=True, size=self.size(count))
+        else:
+            self.memory = SharedMemory(name=name)
+            count = int(np.ndarray((HEADER,), np.int64, self.memory.buf)[2])
+        buffer = self.memory.buf
+        self.header = np.ndarray((HEADER,), np.int64, buffer)
+        self.sequences = np.ndarray((SLOTS,), np.int64, buffer, offset=HEADER * 8)
+        self.times = np.ndarray((SLOTS,), np.float64, buffer, offset=(HEADER + SLOTS) * 8)
+        self.status = np.ndarray((STATUS,), np.float64, buffer, offset=(HEADER + 2 * SLOTS) * 8)
+        offset = (HEADER + 2 * SLOTS + STATUS) * 8
+        arrays = []
+        for _ in range(2 * SLOTS):
+            arrays.append(np.ndarray((count, 3), np.float64, buffer, offset=offset))
+            offset += count * 3 * 8
+        self.positions = tuple(arrays[0::2])
+        self.velocities = tuple(arrays[1::2])
+        self.header[2] = count
+
+    @staticmethod
+    def size(count: int) -> int:
+        return (HEADER + 2 * SLOTS + STATUS + 2 * SLOTS * count * 3) * 8
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    @property
+    def latest(self) -> int:
+        return int(self.header[0])
+
+    @property
+    def sequence(self) -> int:
+        return int(self.header[1])
+
+    def publish(self, universe: ArrayUniverse, scheduler: Optional[Scheduler]=None):
+        slot = (self.latest + 1) % SLOTS
+        self.sequences[slot] += 1 # odd: being written
+        np.copyto(self.positions[slot], universe.state.positions)
+        np.copyto(self.velocities[slot], universe.state.velocities)
+        self.times[slot] = universe.time
+        self.sequences[slot] += 1
+        if scheduler is not None:
+            self.status[:] = scheduler.speed, scheduler.behind
+        self.header[0] = slot
+        self.header[1] += 1
+
+    def read(self, universe: ArrayUniverse) -> bool:
+        """Copy the latest snapshot into `universe`'s own arrays, returning whether one was read whole"""
+        state = universe.state
+        state.detach()
+        for _ in range(ATTEMPTS):
+            slot = self.latest
+            sequence = int(self.sequences[slot])
+            if sequence % 2:
+                continue
+            np.copyto(state.positions, self.positions[slot])
+            np.copyto(state.velocities, self.velocities[slot])
+            simulated = float(self.times[slot])
+            if int(self.sequences[slot]) == sequence:
+                universe.time = simulated
+                return True
+        return False
+
+    def close(self):
+        # the arrays have to go before the memory they view can be closed
+        del self.header, self.sequences, self.times, self.status, self.positions, self.velocities
+        self.memory.close()
+
+
+def _work(connection: Connection, name: str, universe: ArrayUniverse, rate: float, fps: float):
+    buffers = SnapshotBuffers(name=name)
+    scheduler = Scheduler(fps, budget=1)
+    playing = False
+    while True:
+        while connection.poll(0 if playing else 1 / fps):
+            command, *arguments = connection.recv()
+            if command == 'stop':
+                buffers.close()
+                return
+            elif command == 'play':
+                playing = True
+                scheduler.reset()
+            elif command == 'pause':
+                playing = False
+            elif command == 'rate':
+                rate, = arguments
+            elif command == 'load':
+                name, universe = arguments
+                buffers.close()
+                buffers = SnapshotBuffers(name=name)
+                connection.send(('loaded', name))
+        if not playing:
+            continue
+
+        start = time.perf_counter()
+        scheduler.run(universe, rate)
+        buffers.publish(universe, scheduler)
+        time.sleep(max(0, 1 / fps - (time.perf_counter() - start)))
+
+
+class SimulationWorker:
+    """Runs an `ArrayUniverse` in a separate process, so physics and the GUI each get a core
+
+    The worker publishes its positions and velocities into `SnapshotBuffers`. `follow` copies
+    the latest of those into a local copy of the universe, whose arrays are its own to edit, and
+    sends the worker a fresh copy of it whenever it has been edited locally. `behind` and
+    `speed` are the worker's, like a `Scheduler`'s.
+    """
+    buffers: SnapshotBuffers
+    process: multiprocessing.Process
+    rate: float
+    fps: float
+
+    def __init__(self, universe: ArrayUniverse, rate: float=0, fps: float=60):
+        self.rate = rate
+        self.fps = fps
+        self.revision = universe.revision
+        self.buffers = self._buffers_for(universe)
+        self._retired: Dict[str, SnapshotBuffers] = {}
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_work, args=(child, self.buffers.name, universe, rate, fps),
+                                               daemon=True)
+        self.process.start()
+
+    @staticmethod
+    def _buffers_for(universe: ArrayUniverse) -> SnapshotBuffers:
+        buffers = SnapshotBuffers(len(universe.state))
+        for slot in range(SLOTS):
+            np.copyto(buffers.positions[slot], universe.state.positions)
+            np.copyto(buffers.velocities[slot], universe.state.velocities)
+            buffers.times[slot] = universe.time
+        return buffers
+
+    @property
+    def speed(self) -> float:
+        return float(self.buffers.status[0])
+
+    @property
+    def behind(self) -> bool:
+        return bool(self.buffers.status[1])
+
+    def play(self):
+        self.connection.send(('play',))
+
+    def pause(self):
+        self.connection.send(('pause',))
+
+    def set_rate(self, rate: float):
+        if rate != self.rate:
+            self.rate = rate
+            self.connection.send(('rate', rate))
+
+    def load(self, universe: ArrayUniverse):
+        """Replace the worker's universe with a copy of `universe`"""
+        # the worker may still be publishing into the old block, so it goes once the worker says it's done with it
+        self._retired[self.buffers.name] = self.buffers
+        self.buffers = self._buffers_for(universe)
+        self.connection.send(('load', self.buffers.name, universe))
+        self.revision = universe.revision
+
+    def _receive(self):
+        while self.connection.poll():
+            message, *arguments = self.connection.recv()
+            if message == 'loaded':
+                name, = arguments
+                # every block before the one the worker has moved on to is finished with
+                for retired in list(self._retired):
+                    if retired == name:
+                        break
+                    self._release(self._retired.pop(retired))
+
+    @staticmethod
+    def _release(buffers: SnapshotBuffers):
+        buffers.close()
+        buffers.memory.unlink()
+
+    def follow(self, universe: ArrayUniverse, rate: Optional[float]=None):
+        """Bring `universe` up to the worker's latest state, first sending it any local edits"""
+        if rate is not None:
+            self.set_rate(rate)
+        self._receive()
+        if universe.revision != self.revision:
+            self.load(universe)
+        else:
+            self.buffers.read(universe)
+
+    def stop(self, universe: Optional[ArrayUniverse]=None):
+        """Stop the worker, leaving `universe` (if given) with its final state"""
+        if universe is not None and universe.revision == self.revision:
+            self.buffers.read(universe)
+        if self.process.is_alive():
+            self.connection.send(('stop',))
+            self.process.join()
+        for buffers in list(self._retired.values()) + [self.buffers]:
+            self._release(buffers)
+        self._retired = {}
@@ -1,2 +1,2 @@
-from .graph import MotionGraphHandler, Line3DHandler, Animation
+from .graph import MotionGraphHandler, Line3DHandler, Animation, ReplayAnimation, ParticleCollection
 from .tk import FigureTk, PlayControls
\ No newline at end of file
@@ -1,12 +1,21 @@
 from abc import abstractmethod, ABC
-from typing import Tuple, List
+import itertools
+from typing import Tuple, List, Optional
 import math as maths
 
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import Collection
 from matplotlib.animation import FuncAnimation
 from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 
+from mechanics import instrumentation
 from mechanics.particle import Universe, Particle
+from mechanics.recording import TrajectoryReader
+from .lod import TrailDecimator
+
+TRAIL_LENGTH = 5000 #points kept in each particle's trail
 
 class Animation(ABC):
     playing: bool = True
@@ -14,7 +23,7 @@ class Animation(ABC):
     def __init__(self, interval: int=1, args: Tuple=(), f=None):
         if f:
             self.step = f
-        self.interval = 1
+        self.interval = interval
         self.args = args
 
     def __call__(self, f):
@@ -39,34 +48,131 @@ class Animation(ABC):
     def step(self, n: int, graph, universe: Universe): pass
 
 
+class ReplayAnimation(Animation):
+    """Plays a recording back through the graph's universe, `speed` recorded frames per frame shown"""
+    frame: int = 0
+
+    def __init__(self, reader: TrajectoryReader, speed: int=1, loop: bool=True, interval: int=1000 // 30):
+        super().__init__(interval=interval)
+        self.reader = reader
+        self.speed = speed
+        self.loop = loop
+
+    def step(self, n: int, graph, universe: Universe):
+        if self.frame >= len(self.reader):
+            if not self.loop or not len(self.reader):
+                return
+            self.frame = 0
+        self.reader.load(universe, self.frame)
+        graph.update_positions()
+        self.frame += self.speed
+
+
 class MotionGraphHandler:
+    """Plots the particles of a universe, with a trail behind each, and runs animations over them
+
+    If `blit`, animations are drawn by blitting: the trails, markers and any other artists passed
+    to `animate` are left out of full draws of the figure, which are kept as a background, and
+    each frame only those artists are drawn over it. The whole figure is only drawn again when
+    the view is rotated, zoomed or resized, or its limits change.
+
+    If `collection`, all the particles are drawn together by one `ParticleCollection`, rather
+    than each by a line and marker of its own, which is much quicker for many particles.
+
+    Forks of the universe added with `add_fork` are drawn alongside it, but it is up to the
+    animation to run them.
+    """
     universe: Universe
+    forks: List[Universe]
     axes: Axes3D
-    def __init__(self, universe: Universe, figure, axes: Axes3D, plot=None, animations: List[Animation]=None):
+    blit: bool
+    animated: list
+    collection: Optional['ParticleCollection'] = None
+    _background = None
+    _view: Optional[tuple] = None
+
+    def __init__(self, universe: Universe, figure, axes: Axes3D, plot=None, animations: List[Animation]=None,
+                 trail_length: int=TRAIL_LENGTH, decimate: bool=True, blit: bool=False, collection: bool=False):
         self.universe = universe
+        self.trail_length = trail_length
+        self.decimate = decimate
+        self.blit = blit
         self.plot = plot
         self.figure = figure
         self.axes = axes
         self.particle_lines = {}
         self.animations = animations or []
+        self.animated = []
+        self.forks = []
+        self._timers = []
+        if collection:
+            self.collection = ParticleCollection(axes)
+            for artist in self.collection.artists:
+                self.animate(artist)
+        if blit:
+            self.figure.canvas.mpl_connect('draw_event', self._on_draw)
 
     @classmethod
-    def create_graph(cls, universe: Universe):
+    def create_graph(cls, universe: Universe, **options):
         figure = plt.figure()
         axes = figure.add_subplot(111, projection='3d')
         axes.autoscale_view(True, True, True)
-        return cls(universe, figure, axes, plt)
+        return cls(universe, figure, axes, plt, **options)
+
+    @classmethod
+    def replay(cls, reader: TrajectoryReader, speed: int=1):
+        """A graph playing back a recording, without simulating anything"""
+        graph = cls.create_graph(reader.universe(), blit=True, collection=len(reader.names) > 50)
+        graph.ensure_lines()
+        graph.add_animation(ReplayAnimation(reader, speed))
+        graph.fit_all()
+        return graph
+
+    @property
+    def universes(self) -> List[Universe]:
+        return [self.universe] + self.forks
+
+    def add_fork(self, universe: Universe):
+        """Draw `universe`, a fork of this graph's, alongside it, with dashed trails (in either mode)"""
+        self.forks.append(universe)
+        self.ensure_lines()
+
+    def remove_forks(self):
+        for fork in self.forks:
+            for particle in fork.particles:
+                line = self.particle_lines.pop(particle, None)
+                if isinstance(line, Line3DHandler):
+                    line.line.remove()
+                    if line.marker:
+                        line.marker.line.remove()
+        self.forks = []
+        self._view = None # so the next frame is drawn in full, without them
 
     def ensure_lines(self):
-        for particle in self.universe.particles:
-            if particle not in self.particle_lines:
+        for particle, style in ((particle, '-' if universe is self.universe else '--')
+                                for universe in self.universes for particle in universe.particles):
+            if particle not in self.particle_lines and self.collection is not None:
+                self.particle_lines[particle] = CollectionTrail(self.collection, *([n] for n in particle.position),
+                                                                colour=particle.colour,
+                                                                size=particle.relative_radius*1e-7,
+                                                                style=style,
+                                                                max_length=self.trail_length,
+                                                                decimator=TrailDecimator() if self.decimate else None)
+            elif particle not in self.particle_lines:
                 self.particle_lines[particle] = Line3DHandler(self.axes, *([n] for n in particle.position),
                                                               colour=particle.colour,
+                                                              style=style,
+                                                              max_length=self.trail_length,
+                                                              decimator=TrailDecimator() if self.decimate else None,
                                                               marker=PointMarker(self.axes,
                                                                                  size=particle.relative_radius*1e-7,
                                                                                  colour=particle.colour
                                                                                  )
                                                               )
+                if self.blit:
+                    line = self.particle_lines[particle]
+                    line.line.set_animated(True)
+                    line.marker.line.set_animated(True)
 
     @property
     def particles(self) -> Tuple[Particle, ...]:
@@ -79,22 +185,81 @@ class MotionGraphHandler:
 
 
     def update_positions(self):
-        for particle, line in self.particle_lines.items():
-            line.add_point(*particle.position)
+        with instrumentation.phase('update_positions'):
+            for particle, line in self.particle_lines.items():
+                # straight from the array, for particles which are views of one, to save making Coords
+                line.add_point(*(particle.position if particle.state is None else particle.state.positions[particle.index]))
+            if self.collection is not None:
+                self.collection.update(self.lines)
 
     def show(self):
         self.plot.show()
 
     def add_animation(self, animation: Animation):
-        self.__animation = FuncAnimation(self.figure, animation.do, None, fargs=(self, self.universe) + animation.args,
-                                interval=1, blit=False)
+        if self.blit:
+            timer = self.figure.canvas.new_timer(interval=animation.interval)
+            timer.add_callback(self._frame, animation, itertools.count())
+            timer.start()
+            self._timers.append(timer)
+        else:
+            self.__animation = FuncAnimation(self.figure, animation.do, None, fargs=(self, self.universe) + animation.args,
+                                    interval=animation.interval, blit=False)
         self.animations.append(animation)
 
+    def animate(self, artist):
+        """Have `artist` drawn every frame, when blitting, rather than only with the background"""
+        if self.blit:
+            artist.set_animated(True)
+            self.animated.append(artist)
+        return artist
+
+    def animated_artists(self):
+        for line in self.lines:
+            if isinstance(line, Line3DHandler):
+                yield line.line
+                if line.marker:
+                    yield line.marker.line
+        yield from self.animated
+
+    def view(self) -> tuple:
+        """Everything which, if changed, means the background has to be drawn again"""
+        return (self.axes.elev, self.axes.azim, getattr(self.axes, 'roll', 0), self.axes.get_xlim3d(),
+                self.axes.get_ylim3d(), self.axes.get_zlim3d(), self.figure.bbox.bounds)
+
+    def _frame(self, animation: Animation, frames):
+        with instrumentation.phase('frame'):
+            animation.do(next(frames), self, self.universe, *animation.args)
+            self.redraw()
+
+    def redraw(self):
+        """Blit the animated artists over the background, or draw everything if the view has changed"""
+        canvas = self.figure.canvas
+        if self._background is None or self._view != self.view():
+            with instrumentation.phase('draw.full'):
+                canvas.draw() # the background is kept by _on_draw
+            return
+        with instrumentation.phase('draw'):
+            canvas.restore_region(self._background)
+            self._draw_animated()
+            canvas.blit(self.figure.bbox)
+
+    def _on_draw(self, event):
+        self._background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self._view = self.view()
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self.animated_artists():
+            if isinstance(artist, Collection):
+                # 3D collections are only projected when the whole axes are drawn
+                artist.do_3d_projection()
+            self.figure.draw_artist(artist)
+
     def fit_all(self, coeff=1.2):
         max_outlier = 0
         for particle in self.particles:
-            max_outlier = max(max_outlier, abs(particle.position.x), abs(particle.position.x), abs(particle.position.z))
-            max_outlier *= coeff
+            max_outlier = max(max_outlier, abs(particle.position.x), abs(particle.position.y), abs(particle.position.z))
+        max_outlier *= coeff
         self.axes.set_ylim3d(-max_outlier, max_outlier)
         self.axes.set_xlim3d(-max_outlier, max_outlier)
         self.axes.set_zlim3d(-max_outlier, max_outlier)
@@ -123,17 +288,83 @@ class PointMarker:
         self.line.set_3d_properties([self.z])
 
 
-class Line3DHandler:
-    xs = None
-    ys = None
-    zs = None
+class Trail:
+    """The last `max_length` positions of a particle
+
+    Points are kept in a NumPy ring buffer twice as long as the trail, each one written in both
+    halves, so the newest points are always one contiguous slice which can be handed to
+    matplotlib as it is, without any copying. With a `decimator`, only the points it picks out as
+    visible are drawn.
+    """
+    max_length: int
+    length: int = 0
+    pushed: int = 0 #points ever added
+    decimator: Optional[TrailDecimator]
+
+    def __init__(self, axes, xs=None, ys=None, zs=None, max_length: int=TRAIL_LENGTH, decimator: TrailDecimator=None):
+        self.axes = axes
+        self.decimator = decimator
+        self.max_length = max_length
+        self._buffer = np.empty((2 * max_length, 3))
+        self._end = 0 # one past the newest point, in the second half of the buffer
+        for point in zip(xs or [], ys or [], zs or []):
+            self._push(point)
+
+    def _push(self, point):
+        index = self._end % self.max_length
+        self._buffer[index] = self._buffer[index + self.max_length] = point
+        self._end = index + self.max_length + 1
+        self.length = min(self.length + 1, self.max_length)
+        self.pushed += 1
+
+    def add_point(self, x, y, z):
+        self._push((x, y, z))
+        self.update()
+
+    def truncate(self, length: int):
+        """Forget all but the newest `length` points"""
+        self.length = min(self.length, length)
+
+    def update(self): pass
+
+    def visible(self) -> np.ndarray:
+        """The points worth drawing, as an (n, 3) array"""
+        return self.array if self.decimator is None else self.decimator.decimate(self, self.axes)
+
+    @property
+    def array(self) -> np.ndarray:
+        """The trail's points, oldest first, as a (length, 3) view"""
+        return self._buffer[self._end - self.length:self._end]
+
+    @property
+    def newest(self) -> np.ndarray:
+        return self._buffer[self._end - 1]
+
+    @property
+    def xs(self) -> np.ndarray:
+        return self.array[:, 0]
+
+    @property
+    def ys(self) -> np.ndarray:
+        return self.array[:, 1]
+
+    @property
+    def zs(self) -> np.ndarray:
+        return self.array[:, 2]
+
+    @property
+    def points(self):
+        return zip(self.xs, self.ys, self.zs)
+
+
+class Line3DHandler(Trail):
+    """A trail drawn as its own line, with a `PointMarker` at its head"""
     marker: PointMarker
 
-    def __init__(self, axes, xs=None, ys=None, zs=None, marker=None, colour="black"):
-        self.xs = xs or []
-        self.ys = ys or []
-        self.zs = zs or []
-        self.line = axes.plot(self.xs, self.ys, self.zs, color=colour)[0]
+    def __init__(self, axes, xs=None, ys=None, zs=None, marker=None, colour="black", max_length: int=TRAIL_LENGTH,
+                 decimator: TrailDecimator=None, style: str='-'):
+        super().__init__(axes, xs, ys, zs, max_length, decimator)
+        self.line = axes.plot(self.xs, self.ys, self.zs, color=colour, linestyle=style)[0]
         if marker is True:
             marker = PointMarker(axes, self.xs[-1], self.ys[-1], self.zs[-1], colour=colour)
         self.marker = marker
@@ -145,21 +376,12 @@ class Line3DHandler:
     def empty(cls):
         return cls([], [], [])
 
-    def add_point(self, x, y, z):
-        self.xs.append(x)
-        self.ys.append(y)
-        self.zs.append(z)
-        self.update()
-
     def update(self):
-        self.line.set_data(self.xs, self.ys)
-        self.line.set_3d_properties(self.zs)
-        if self.marker:
-            self.marker.set_point(self.xs[-1], self.ys[-1], self.zs[-1])
-
-    @property
-    def points(self):
-        return zip(self.xs, self.ys, self.zs)
+        points = self.visible()
+        self.line.set_data(points[:, 0], points[:, 1])
+        self.line.set_3d_properties(points[:, 2])
+        if self.marker and self.length:
+            self.marker.set_point(*self.newest)
 
     @property
     def colour(self):
@@ -169,3 +391,66 @@ class Line3DHandler:
     def colour(self, value: str):
         self.line.set_color(value)
         self.marker.line.set_color(value)
+
+
+class CollectionTrail(Trail):
+    """A trail drawn as part of a `ParticleCollection`, rather than by itself"""
+    colour: str
+    size: float
+    style: str
+
+    def __init__(self, collection: 'ParticleCollection', xs=None, ys=None, zs=None, colour="black", size: float=10,
+                 max_length: int=TRAIL_LENGTH, decimator: TrailDecimator=None, style: str='-'):
+        super().__init__(collection.axes, xs, ys, zs, max_length, decimator)
+        self.collection = collection
+        self._colour = colour
+        self.size = size
+        self.style = style
+
+    @property
+    def colour(self) -> str:
+        return self._colour
+
+    @colour.setter
+    def colour(self, value: str):
+        self._colour = value
+        self.collection.restyle()
+
+
+class ParticleCollection:
+    """Every particle's marker as one 3D scatter, and every trail as one `Line3DCollection`
+
+    However many particles there are, matplotlib only has two artists to deal with, and each
+    frame they are given all their new data in one call apiece. Colours and sizes are only
+    passed on when they, or the set of trails, change.
+    """
+    trails: List[CollectionTrail]
+
+    def __init__(self, axes):
+        self.axes = axes
+        self.trails = []
+        self.lines = Line3DCollection([], linewidths=1)
+        axes.add_collection(self.lines, autolim=False)
+        self.markers = axes.scatter([], [], [], depthshade=False)
+        self._styled = None
+
+    @property
+    def artists(self) -> tuple:
+        return self.lines, self.markers
+
+    def restyle(self):
+        self._styled = None
+
+    def update(self, trails: List[CollectionTrail]):
+        trails = [trail for trail in trails if trail.length]
+        if self._styled != trails:
+            colours = [trail.colour for trail in trails]
+            self.lines.set_color(colours)
+            self.lines.set_linestyle([trail.style for trail in trails])
+            self.markers.set_color(colours)
+            self.markers.set_sizes(np.array([trail.size**2 for trail in trails]))
+            self._styled = trails
+        self.lines.set_segments([trail.visible() for trail in trails])
+        heads = np.array([trail.newest for trail in trails]).reshape(-1, 3)
+        self.markers.set_offsets(heads[:, :2])
+        self.markers.set_3d_properties(heads[:, 2], 'z')
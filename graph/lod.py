@@ -0,0 +1,89 @@
+from typing import Optional
+
+import numpy as np
+
+
+class TrailDecimator:
+    """Cuts a trail down to the points that can actually be seen, at the axes' current scale
+
+    Space is divided into cells `pixels` pixels across (judged from the axes' limits and size on
+    screen), and a point is only kept where it moves into a different cell from the point before,
+    so nothing dropped is more than a cell's width from a point that is drawn. The trail's newest
+    point is always kept. Points already looked at are remembered, so each update only looks at
+    those added since; everything is worked out again only if the scale changes by more than
+    `slack`, from zooming or resizing.
+    """
+    pixels: float
+    slack: float
+    size: Optional[float] = None # of a cell, in the axes' units
+    count: int = 0 # points kept
+    processed: int = 0 # points of the trail looked at so far, counting those since forgotten
+    _last_cell: Optional[np.ndarray] = None
+
+    def __init__(self, pixels: float=1, slack: float=0.25):
+        self.pixels = pixels
+        self.slack = slack
+        self._points = np.empty((0, 3))
+        self._indices = np.empty(0, np.int64)
+
+    def cell_size(self, axes) -> float:
+        extent = axes.get_window_extent()
+        span = max(np.ptp(limits) for limits in (axes.get_xlim3d(), axes.get_ylim3d(), axes.get_zlim3d()))
+        return self.pixels * span / max(min(extent.width, extent.height), 1)
+
+    def reset(self):
+        self.size = None
+        self.count = 0
+        self._last_cell = None
+
+    def decimate(self, trail, axes) -> np.ndarray:
+        """The points of `trail` (a `Line3DHandler`) worth drawing, as an (n, 3) view"""
+        if len(self._points) < trail.max_length + 1:
+            self._points = np.empty((trail.max_length + 1, 3))
+            self._indices = np.empty(trail.max_length + 1, np.int64)
+            self.reset()
+        size = self.cell_size(axes)
+        if self.size is None or abs(size / self.size - 1) > self.slack:
+            self.reset()
+            self.size = size
+            self.processed = 0
+
+        # forget points which have fallen off the end of the trail
+        first = trail.pushed - trail.length
+        dropped = int(np.searchsorted(self._indices[:self.count], first))
+        if dropped:
+            remaining = self.count - dropped
+            # the trail has to start where it really does, even if that point was passed over
+            start = 0 if self.processed <= first or remaining and self._indices[dropped] == first else 1
+            self._points[start:start + remaining] = self._points[dropped:self.count]
+            self._indices[start:start + remaining] = self._indices[dropped:self.count]
+            if start:
+                self._points[0] = trail.array[0]
+                self._indices[0] = first
+            self.count = start + remaining
+        if self.processed <= first:
+            # none of the points looked at are left, so the next one starts afresh
+            self.processed = first
+            self._last_cell = None
+
+        new = trail.array[self.processed - first:]
+        if len(new):
+            cells = np.floor(new / self.size)
+            previous = cells[:-1] if self._last_cell is None else np.vstack((self._last_cell, cells[:-1]))
+            moved = np.any(cells[len(cells) - len(previous):] != previous, axis=1)
+            if self._last_cell is None:
+                moved = np.concatenate(([True], moved))
+            kept, = np.nonzero(moved)
+            self._points[self.count:self.count + len(kept)] = new[kept]
+            self._indices[self.count:self.count + len(kept)] = kept + self.processed
+            self.count += len(kept)
+            self._last_cell = cells[-1:]
+            self.processed = trail.pushed
+
+        if not trail.length:
+            return self._points[:0]
+        if self.count and self._indices[self.count - 1] == trail.pushed - 1:
+            return self._points[:self.count]
+        # the line has to reach the particle, so the newest point goes on the end, but isn't kept
+        self._points[self.count] = trail.array[-1]
+        return self._points[:self.count + 1]
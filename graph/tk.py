@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
 
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2TkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+try:
+    from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
+except ImportError: # matplotlib before 2.2
+    from matplotlib.backends.backend_tkagg import NavigationToolbar2TkAgg as NavigationToolbar2Tk
 from matplotlib.figure import Figure
 from tkinter import *
 
@@ -10,7 +14,7 @@ class FigureTk(Figure, Frame):
         Figure.__init__(self)
         self.canvas = FigureCanvasTkAgg(self, master=self)
         self.canvas.get_tk_widget().pack(fill=BOTH)
-        self.toolbar = NavigationToolbar2TkAgg(self.canvas, self)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, self)
         self.toolbar.update()
         self.canvas._tkcanvas.pack(side=TOP, fill=BOTH, expand=1)
 
@@ -0,0 +1,2 @@
+from .batch import BatchRun, load_experiment
+from .sweep import Sweep, grid
@@ -0,0 +1,176 @@
+import csv
+import importlib
+import importlib.util
+import json
+import time
+from typing import Dict, Optional, Type
+
+from app.experiment import Experiment, EXPERIMENTS
+from mechanics import (Universe, ArrayUniverse, Integrator, Euler, Leapfrog, VelocityVerlet, Yoshida, BlockTimestep,
+                       WisdomHolman, TrajectoryRecorder, ConservationMonitor, instrumentation, checkpoint)
+
+CHECKPOINT_EVERY = 10000 #ticks
+
+INTEGRATORS: Dict[str, Type[Integrator]] = {
+    'euler': Euler,
+    'leapfrog': Leapfrog,
+    'velocity-verlet': VelocityVerlet,
+    'yoshida': Yoshida,
+    'block': BlockTimestep,
+    'wisdom-holman': WisdomHolman,
+}
+
+
+def load_experiment(spec: str) -> Experiment:
+    """Load an experiment by built in name, or from a function given as `module:function` or `file.py:function`
+
+    The function is called with no arguments, and has to return an `Experiment`.
+    """
+    if spec in EXPERIMENTS:
+        return EXPERIMENTS[spec]()
+    source, _, name = spec.rpartition(':')
+    if not source:
+        raise ValueError("Unknown experiment {!r}, expected one of {} or module:function".format(
+            spec, ", ".join(EXPERIMENTS)))
+    if source.endswith('.py'):
+        module_spec = importlib.util.spec_from_file_location("experiment", source)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(source)
+    return getattr(module, name)()
+
+
+def resume(path: str) -> Experiment:
+    """An experiment carrying on from the checkpoint at `path`"""
+    universe, header = checkpoint.load(path)
+    experiment = Experiment(header['name'] or path, universe)
+    experiment.speed = header['extra'].get('speed', experiment.speed)
+    return experiment
+
+
+def as_array_universe(universe: Universe) -> ArrayUniverse:
+    if isinstance(universe, ArrayUniverse):
+        return universe
+    array_universe = ArrayUniverse([field.copy() for field in universe.fields],
+                                   [particle.copy() for particle in universe.particles])
+    array_universe.TICK_LENGTH = universe.TICK_LENGTH
+    array_universe.time = universe.time
+    return array_universe
+
+
+class BatchRun:
+    """Advances an experiment's universe without any GUI, writing out its trajectories as it goes
+
+    Runs for `ticks` ticks, or until `duration` simulated seconds have passed. Every `every`
+    ticks, each particle's state is written as a row of the `trajectory` CSV file, and as a frame
+    of the binary `record`ing, if either is given. With a `checkpoint` path, the universe is saved
+    there every `checkpoint_every` ticks and at the end, to be carried on from with `resume`.
+    A run taking longer than `timeout` seconds of real time is stopped where it is. A `monitor`
+    is attached to the universe, and its summary included in the diagnostics.
+    """
+    experiment: Experiment
+    universe: ArrayUniverse
+    ticks: int = 0
+    wall_time: float = 0
+    timed_out: bool = False
+
+    def __init__(self, experiment: Experiment, ticks: Optional[int]=None, duration: Optional[float]=None,
+                 every: int=1, trajectory: Optional[str]=None, record: Optional[str]=None,
+                 checkpoint: Optional[str]=None, checkpoint_every: int=CHECKPOINT_EVERY,
+                 timeout: Optional[float]=None, monitor: Optional[ConservationMonitor]=None):
+        if ticks is None and duration is None:
+            raise ValueError("A batch run needs a number of ticks or a duration")
+        self.experiment = experiment
+        self.universe = as_array_universe(experiment.universe.copy())
+        self.target_ticks = ticks
+        self.end_time = None if duration is None else self.universe.time + duration
+        self.every = every
+        self.trajectory = trajectory
+        self.record = record
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.timeout = timeout
+        self.monitor = monitor
+
+    @property
+    def finished(self) -> bool:
+        if self.target_ticks is not None and self.ticks >= self.target_ticks:
+            return True
+        # allow for rounding in the accumulated time
+        return self.end_time is not None and self.universe.time >= self.end_time - 1e-9 * self.universe.TICK_LENGTH
+
+    def run(self) -> Dict[str, object]:
+        recorder = TrajectoryRecorder(self.record, self.universe, self.every) if self.record else _Discard()
+        with open(self.trajectory, 'w', newline='') if self.trajectory else _Discard() as output, recorder:
+            writer = csv.writer(output)
+            if self.trajectory:
+                writer.writerow(('tick', 'time', 'particle', 'x', 'y', 'z', 'vx', 'vy', 'vz'))
+                self.write(writer)
+            recorder.record(self.universe)
+            if self.monitor is not None:
+                # only now, so it starts from the universe as changed since the run was set up
+                self.monitor.attach(self.universe)
+            start = time.perf_counter()
+            deadline = None if self.timeout is None else start + self.timeout
+            while not self.finished:
+                if deadline is not None and time.perf_counter() > deadline:
+                    self.timed_out = True
+                    break
+                self.universe.tick(self.ticks)
+                self.ticks += 1
+                if self.ticks % self.every == 0:
+                    if self.trajectory:
+                        self.write(writer)
+                    recorder.record(self.universe)
+                if self.checkpoint and self.ticks % self.checkpoint_every == 0:
+                    self.save_checkpoint()
+            self.wall_time = time.perf_counter() - start
+        if self.checkpoint:
+            self.save_checkpoint()
+        return self.diagnostics()
+
+    def save_checkpoint(self):
+        checkpoint.save(self.universe, self.checkpoint, self.experiment.name, speed=self.experiment.speed)
+
+    def write(self, writer):
+        state = self.universe.state
+        for particle, position, velocity in zip(self.universe.particles, state.positions, state.velocities):
+            writer.writerow((self.ticks, self.universe.time, particle.name, *position, *velocity))
+
+    def diagnostics(self) -> Dict[str, object]:
+        diagnostics = {
+            'experiment': self.experiment.name,
+            'particles': len(self.universe.particles),
+            'fields': [field.__class__.__name__ for field in self.universe.fields],
+            'integrator': repr(self.universe.integrator),
+            'tick_length': self.universe.TICK_LENGTH,
+            'ticks': self.ticks,
+            'simulated_time': self.universe.time,
+            'wall_time': self.wall_time,
+            'ticks_per_second': self.ticks / self.wall_time if self.wall_time else None,
+            'timed_out': self.timed_out,
+        }
+        if self.monitor is not None:
+            diagnostics['conservation'] = self.monitor.summary()
+        if instrumentation.enabled:
+            diagnostics['timings'] = instrumentation.timings()
+        return diagnostics
+
+    def save_diagnostics(self, path: str):
+        with open(path, 'w') as file:
+            json.dump(self.diagnostics(), file, indent=2)
+
+
+class _Discard:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+    def write(self, _):
+        pass
+
+    def record(self, _):
+        pass
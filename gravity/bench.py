@@ -0,0 +1,223 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from mechanics import Universe, ArrayUniverse, EnsembleUniverse, ParticleState, Particle, Gravity, Leapfrog, Vector3D, Coords, Velocity
+
+SIZES = (2, 100, 1000, 10000)
+LEGACY_LIMIT = 100 #particles, beyond which the original object-by-object code takes too long
+MEMBERS = 64 #universes in the ensemble benchmarks
+G = 6.67408e-11
+
+
+def random_state(count: int, seed: int=0) -> ParticleState:
+    """A reproducible, roughly virialised cluster of `count` bodies"""
+    random = np.random.default_rng(seed)
+    return ParticleState(random.uniform(1e22, 1e24, count), random.normal(0, 1e10, (count, 3)),
+                         random.normal(0, 1e3, (count, 3)))
+
+
+def array_universe(count: int, seed: int=0) -> ArrayUniverse:
+    return ArrayUniverse.from_state(random_state(count, seed), fields=[Gravity(G, softening=1e7)],
+                                    integrator=Leapfrog())
+
+
+def legacy_universe(count: int, seed: int=0) -> Universe:
+    state = random_state(count, seed)
+    return Universe([Gravity(G, softening=1e7)], [
+        Particle(str(index), mass, Coords(*position), Velocity.from_components(*velocity))
+        for index, (mass, position, velocity) in enumerate(zip(state.masses, state.positions, state.velocities))
+    ])
+
+
+class Benchmark:
+    """Something to time, made ready by `setup`, which returns the function to call
+
+    `sizes` are the particle counts it is run at, if it depends on one.
+    """
+    def __init__(self, name: str, setup: Callable[..., Callable[[], object]], sizes: Iterable[Optional[int]]=(None,)):
+        self.name = name
+        self.setup = setup
+        self.sizes = tuple(sizes)
+
+    def run(self, size: Optional[int], repeat: int) -> Dict[str, object]:
+        function = self.setup() if size is None else self.setup(size)
+        timer = timeit.Timer(function)
+        number, _ = timer.autorange()
+        times = [total / number for total in timer.repeat(repeat, number)]
+        return {
+            'name': self.name,
+            'n': size,
+            'number': number,
+            'best': min(times),
+            'median': statistics.median(times),
+        }
+
+
+def vector_arithmetic():
+    a, b = Vector3D.from_components(1.0, 2.0, 3.0), Vector3D.from_components(-3.0, 0.5, 2.0)
+    return lambda: (a + b) * 2 - a
+
+
+def vector_from_components():
+    return lambda: Vector3D.from_components(1.0, 2.0, 3.0)
+
+
+def vector_polar():
+    vector = Vector3D.from_components(1.0, 2.0, 3.0)
+
+    def polar():
+        vector.x = 1.0 # invalidates the cached polar form
+        return vector.direction
+    return polar
+
+
+def gravity_apply(count: int):
+    universe = array_universe(count)
+    return universe.accelerate
+
+
+def legacy_gravity_apply(count: int):
+    universe = legacy_universe(count)
+    return lambda: universe.fields[0].apply(universe)
+
+
+def universe_tick(count: int):
+    universe = array_universe(count)
+    return universe.tick
+
+
+def legacy_universe_tick(count: int):
+    universe = legacy_universe(count)
+    return universe.tick
+
+
+def ensemble_tick(count: int):
+    # to compare with MEMBERS times universe.tick
+    ensemble = EnsembleUniverse.from_universes([array_universe(count, seed) for seed in range(MEMBERS)])
+    return ensemble.tick
+
+
+def universe_copy(count: int):
+    return array_universe(count).copy
+
+
+def update_positions_draw(count: int):
+    # imported here, so the other benchmarks can run without a display or plotting libraries
+    import matplotlib
+    matplotlib.use('Agg')
+    from graph.graph import MotionGraphHandler
+
+    universe = array_universe(count)
+    graph = MotionGraphHandler.create_graph(universe, collection=count > 50)
+    graph.ensure_lines()
+    graph.fit_all()
+
+    def frame():
+        universe.state.positions += universe.state.velocities * 100
+        graph.update_positions()
+        graph.figure.canvas.draw()
+    return frame
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark('vector.arithmetic', vector_arithmetic),
+    Benchmark('vector.from_components', vector_from_components),
+    Benchmark('vector.polar', vector_polar),
+    Benchmark('gravity.apply', gravity_apply, SIZES),
+    Benchmark('gravity.apply.legacy', legacy_gravity_apply, [size for size in SIZES if size <= LEGACY_LIMIT]),
+    Benchmark('universe.tick', universe_tick, SIZES),
+    Benchmark('universe.tick.legacy', legacy_universe_tick, [size for size in SIZES if size <= LEGACY_LIMIT]),
+    Benchmark('universe.tick.ensemble', ensemble_tick, (2, 100, 1000)),
+    Benchmark('universe.copy', universe_copy, SIZES),
+    Benchmark('graph.update_positions+draw', update_positions_draw, (2, 100, 1000)),
+]
+
+
+def machine() -> Dict[str, object]:
+    """What the benchmarks were run on, for comparing like with like"""
+    info = {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'python': sys.version,
+        'numpy': np.__version__,
+    }
+    try:
+        import matplotlib
+        info['matplotlib'] = matplotlib.__version__
+    except ImportError:
+        pass
+    try:
+        info['commit'] = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                        cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def run(names: Optional[List[str]]=None, sizes: Optional[List[int]]=None, repeat: int=5,
+        report: Callable[[Dict[str, object]], None]=None) -> Dict[str, object]:
+    """Run the benchmarks whose names start with any of `names`, at those of `sizes` they support
+
+    A benchmark that can't be run here (say, for want of a plotting library) is recorded as
+    skipped, with the reason, rather than stopping the rest.
+    """
+    results = []
+    for benchmark in BENCHMARKS:
+        if names and not any(benchmark.name.startswith(name) for name in names):
+            continue
+        skipped = None
+        for size in benchmark.sizes:
+            if size is not None and sizes and size not in sizes:
+                continue
+            if skipped is None:
+                try:
+                    result = benchmark.run(size, repeat)
+                except ImportError as error:
+                    skipped = str(error)
+            if skipped is not None:
+                result = {'name': benchmark.name, 'n': size, 'skipped': skipped}
+            results.append(result)
+            if report:
+                report(result)
+    return {'machine': machine(), 'repeat': repeat, 'results': results}
+
+
+def compare(results: Dict[str, object], baseline: Dict[str, object], tolerance: float=0.1) -> List[Dict[str, object]]:
+    """Each benchmark's best time relative to the same one in `baseline`, flagging slowdowns beyond `tolerance`"""
+    before = {(result['name'], result['n']): result for result in baseline['results'] if 'best' in result}
+    comparisons = []
+    for result in results['results']:
+        old = before.get((result['name'], result['n']))
+        if old is None or 'best' not in result:
+            continue
+        ratio = result['best'] / old['best']
+        comparisons.append({'name': result['name'], 'n': result['n'], 'ratio': ratio,
+                            'regression': ratio > 1 + tolerance})
+    return comparisons
+
+
+def format_result(result: Dict[str, object]) -> str:
+    name = result['name'] if result['n'] is None else "{name} [N={n}]".format(**result)
+    if 'skipped' in result:
+        return "{:<40} skipped: {}".format(name, result['skipped'])
+    return "{:<40} {:>12.3f} µs  (median {:.3f} µs)".format(name, result['best'] * 1e6, result['median'] * 1e6)
+
+
+def save(results: Dict[str, object], path: str):
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2)
+
+
+def load(path: str) -> Dict[str, object]:
+    with open(path) as file:
+        return json.load(file)
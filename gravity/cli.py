@@ -0,0 +1,174 @@
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from mechanics import ConservationMonitor, instrumentation
+from mechanics.conservation import THRESHOLD
+from .batch import BatchRun, INTEGRATORS, CHECKPOINT_EVERY, load_experiment, resume
+
+
+def run(arguments: argparse.Namespace):
+    instrumentation.enable(arguments.timings)
+    if (arguments.experiment is None) == (arguments.resume is None):
+        sys.exit("Give either an experiment to run, or a checkpoint to --resume from")
+    experiment = load_experiment(arguments.experiment) if arguments.resume is None else resume(arguments.resume)
+    universe = experiment.universe
+    if arguments.tick_length is not None:
+        universe.TICK_LENGTH = arguments.tick_length
+    monitor = None
+    if arguments.monitor is not None:
+        monitor = ConservationMonitor(arguments.monitor, arguments.energy_threshold, adapt=arguments.adapt,
+                                      on_alert=[_alert])
+    batch = BatchRun(experiment, ticks=arguments.ticks, duration=arguments.duration, every=arguments.every,
+                     trajectory=arguments.trajectory, record=arguments.record, checkpoint=arguments.checkpoint,
+                     checkpoint_every=arguments.checkpoint_every, monitor=monitor)
+    if arguments.integrator is not None:
+        batch.universe.integrator = INTEGRATORS[arguments.integrator]()
+    results = batch.run()
+    if arguments.diagnostics:
+        batch.save_diagnostics(arguments.diagnostics)
+    print("{experiment}: {ticks} ticks, {simulated_time:g} s simulated in {wall_time:.2f} s "
+          "({ticks_per_second:,.1f} ticks/s)".format(**results))
+    if monitor is not None:
+        print("Energy error at most {max_energy_error:.3g}, momentum drift {max_momentum_drift:.3g}, "
+              "{alerts} alerts".format(**results['conservation']))
+    if arguments.timings:
+        print(instrumentation.format_timings())
+
+
+def _alert(monitor: ConservationMonitor, alert: dict):
+    print("Energy error {:.3g} at {:g} s, past {:g}; a tick length of {:g} s (not {:g}) would keep within it".format(
+        float(alert['energy_error']), alert['time'], monitor.threshold, alert['suggested_tick_length'], alert['tick_length']), file=sys.stderr, flush=True)
+
+
+def replay(arguments: argparse.Namespace):
+    # only replaying needs a window, so the plotting libraries are left until now
+    from graph import MotionGraphHandler
+    from mechanics import TrajectoryReader
+
+    reader = TrajectoryReader(arguments.recording)
+    graph = MotionGraphHandler.replay(reader, arguments.speed)
+    graph.figure.suptitle(arguments.recording)
+    graph.show()
+
+
+def bench(arguments: argparse.Namespace):
+    from . import bench
+
+    results = bench.run(arguments.only, arguments.sizes, arguments.repeat,
+                        report=lambda result: print(bench.format_result(result), flush=True))
+    if arguments.output:
+        bench.save(results, arguments.output)
+    if arguments.compare:
+        regressions = 0
+        for comparison in bench.compare(results, bench.load(arguments.compare), arguments.tolerance):
+            name = comparison['name'] if comparison['n'] is None else "{name} [N={n}]".format(**comparison)
+            flag = "  REGRESSION" if comparison['regression'] else ""
+            print("{:<40} {:>6.2f}x{}".format(name, comparison['ratio'], flag))
+            regressions += comparison['regression']
+        if regressions:
+            sys.exit(1)
+
+
+def sweep(arguments: argparse.Namespace):
+    from .sweep import Sweep, grid
+
+    runs = []
+    if arguments.runs:
+        with open(arguments.runs) as file:
+            runs += json.load(file)
+    if arguments.set:
+        # values are JSON, so positions and velocities can be given as [x, y, z]
+        runs += grid({name: [_value(value) for value in values] for name, *values in arguments.set})
+    if not runs:
+        sys.exit("Give the runs to do, with --set or --runs")
+    sweep = Sweep(arguments.experiment, runs, arguments.results, ticks=arguments.ticks, duration=arguments.duration,
+                  processes=arguments.processes, timeout=arguments.timeout, retry=arguments.retry)
+    already = sweep.already()
+    done = sweep.run(_report)
+    print("{} runs done, {} already in {}".format(done, already, arguments.results))
+
+
+def _report(result: dict):
+    if 'error' in result:
+        print("{key}: {status}, {error}".format(**result), flush=True)
+    else:
+        # there's no relative error to give for a universe starting with no energy
+        energy_error = "n/a" if result['energy_error'] is None else "{:.3g}".format(result['energy_error'])
+        print("{key}: {status}, {ticks} ticks in {wall_time:.2f} s, energy error {}".format(
+            energy_error, **result), flush=True)
+
+
+def _value(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m gravity", description="Simulate gravity experiments")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('run', help="advance an experiment without the GUI")
+    command.add_argument('experiment', nargs='?', help="a built in experiment, module:function or file.py:function")
+    length = command.add_mutually_exclusive_group(required=True)
+    length.add_argument('--ticks', type=int, help="number of ticks to run")
+    length.add_argument('--duration', type=float, help="simulated seconds to run for")
+    command.add_argument('--tick-length', type=float, help="seconds per tick")
+    command.add_argument('--integrator', choices=sorted(INTEGRATORS), help="integrator to use instead")
+    command.add_argument('--every', type=int, default=1, help="ticks between trajectory rows")
+    command.add_argument('--trajectory', help="CSV file to write trajectories to")
+    command.add_argument('--diagnostics', help="JSON file to write run diagnostics to")
+    command.add_argument('--record', help="binary file to record trajectories to, for replaying")
+    command.add_argument('--timings', action='store_true', help="time each phase of a tick, and print them")
+    command.add_argument('--checkpoint', help="file to save the universe to as it runs, and at the end")
+    command.add_argument('--checkpoint-every', type=int, default=CHECKPOINT_EVERY, help="ticks between checkpoints")
+    command.add_argument('--resume', help="checkpoint to carry on from, instead of starting an experiment")
+    command.add_argument('--monitor', type=int, metavar='TICKS',
+                         help="check energy and momentum are conserved, every so many ticks")
+    command.add_argument('--energy-threshold', type=float, default=THRESHOLD,
+                         help="relative energy error beyond which the monitor raises an alert")
+    command.add_argument('--adapt', action='store_true', help="shorten the tick length when the monitor alerts")
+    command.set_defaults(handler=run)
+
+    command = commands.add_parser('replay', help="play back a recording made with run --record")
+    command.add_argument('recording')
+    command.add_argument('--speed', type=int, default=1, help="recorded frames per frame shown")
+    command.set_defaults(handler=replay)
+
+    command = commands.add_parser('bench', help="time the hot paths, to compare between versions and machines")
+    command.add_argument('--only', nargs='+', help="benchmarks whose names start with these")
+    command.add_argument('--sizes', type=int, nargs='+', help="particle counts to run at, of 2, 100, 1000, 10000")
+    command.add_argument('--repeat', type=int, default=5, help="timings taken of each, the best being reported")
+    command.add_argument('--output', help="JSON file to write the results and machine details to")
+    command.add_argument('--compare', help="JSON results of an earlier run, to compare against")
+    command.add_argument('--tolerance', type=float, default=0.1,
+                         help="slowdown allowed when comparing before it counts as a regression")
+    command.set_defaults(handler=bench)
+
+    command = commands.add_parser('sweep', help="run an experiment over a grid of parameters, in parallel")
+    command.add_argument('experiment', help="a built in experiment, module:function or file.py:function")
+    length = command.add_mutually_exclusive_group(required=True)
+    length.add_argument('--ticks', type=int, help="number of ticks for each run")
+    length.add_argument('--duration', type=float, help="simulated seconds for each run")
+    command.add_argument('--set', nargs='+', action='append', metavar=('NAME', 'VALUE'),
+                         help="values of G, softening, tick_length, integrator or <particle>.mass, .position or "
+                              ".velocity to run with, every combination of which is run")
+    command.add_argument('--runs', help="JSON file of a list of overrides to run with, as well")
+    command.add_argument('--results', required=True, help="JSON lines file of results, carried on with if it exists")
+    command.add_argument('--processes', type=int, help="processes to run at once, by default one per CPU")
+    command.add_argument('--timeout', type=float, help="seconds after which a run is stopped")
+    command.add_argument('--retry', action='store_true', help="do runs which failed before again")
+    command.set_defaults(handler=sweep)
+    return parser
+
+
+def main(argv: Optional[List[str]]=None):
+    arguments = parser().parse_args(argv)
+    arguments.handler(arguments)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,223 @@
+"""Running an experiment many times over, with different parameters, in a pool of processes
+
+Each run is described by its overrides, a dictionary of what to change about the experiment's
+universe before it starts:
+
+ * `G` and `softening`, of every `Gravity` field
+ * `tick_length`, and `integrator`, by its name in `INTEGRATORS`
+ * `<particle>.mass`, `<particle>.position` and `<particle>.velocity`, of the particle of that name
+   (in any case, as particles' names are always title case)
+
+Results are appended to a JSON lines file as each run finishes, one object per run, so a sweep
+that is stopped can be started again with the same file and only does the runs still missing.
+"""
+import itertools
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from mechanics import Gravity, ArrayUniverse, Coords, Velocity, conservation
+from .batch import BatchRun, INTEGRATORS, load_experiment
+
+PARTICLE_OVERRIDES = ('mass', 'position', 'velocity')
+GRACE = 5.0 #seconds a run is given beyond its timeout, to start up and stop itself, before it's killed
+
+
+def grid(axes: Dict[str, Iterable]) -> List[Dict[str, object]]:
+    """The overrides of every combination of the values of each of `axes`, like a nested for loop"""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[name] for name in names))]
+
+
+def key(overrides: Dict[str, object]) -> str:
+    """What identifies a run in the results, whatever order its overrides were given in"""
+    return json.dumps(overrides, sort_keys=True)
+
+
+def apply_overrides(universe: ArrayUniverse, overrides: Dict[str, object]):
+    gravities = [field for field in universe.fields if isinstance(field, Gravity)]
+    particles = {particle.name: particle for particle in universe.particles}
+    for name, value in overrides.items():
+        if name in ('G', 'softening'):
+            if not gravities:
+                raise ValueError("{} can't be overridden in a universe without gravity".format(name))
+            for gravity in gravities:
+                setattr(gravity, name, float(value))
+        elif name == 'tick_length':
+            universe.TICK_LENGTH = float(value)
+        elif name == 'integrator':
+            if value not in INTEGRATORS:
+                raise ValueError("Unknown integrator {!r}, expected one of {}".format(value, ", ".join(INTEGRATORS)))
+            universe.integrator = INTEGRATORS[value]()
+        else:
+            particle_name, _, attribute = name.rpartition('.')
+            particle_name = particle_name.title()
+            if particle_name not in particles or attribute not in PARTICLE_OVERRIDES:
+                raise ValueError("Unknown override {!r}".format(name))
+            particle = particles[particle_name]
+            if attribute == 'mass':
+                particle.mass = float(value)
+            elif attribute == 'position':
+                particle.position = Coords(*value)
+            else:
+                particle.velocity = Velocity.from_components(*value)
+    universe.touch()
+
+
+def energy(universe: ArrayUniverse) -> float:
+    return float(conservation.measure(universe)['energy'])
+
+
+def run_one(experiment: str, overrides: Dict[str, object], ticks: Optional[int], duration: Optional[float],
+            timeout: Optional[float]) -> Dict[str, object]:
+    """Do one run of a sweep, returning its diagnostics; this is what the pool's processes are given"""
+    batch = BatchRun(load_experiment(experiment), ticks=ticks, duration=duration, timeout=timeout)
+    apply_overrides(batch.universe, overrides)
+    start = energy(batch.universe)
+    summary = batch.run()
+    end = energy(batch.universe)
+    summary['energy_error'] = abs((end - start) / start) if start else None
+    return summary
+
+
+def _run_in(connection, *arguments):
+    # the body of each run's process, sending back whether it finished and its summary or error
+    try:
+        connection.send(('ok', run_one(*arguments)))
+    except Exception as error:
+        connection.send(('error', "{}: {}".format(error.__class__.__name__, error)))
+    finally:
+        connection.close()
+
+
+def completed(path: str) -> Dict[str, Dict[str, object]]:
+    """The results already in the file at `path`, by run key"""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path) as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue # the last line of a sweep that was killed while writing it
+            results[result['key']] = result
+    return results
+
+
+def _finish_line(path: str):
+    # so a line cut short, by a sweep being killed while writing it, doesn't spoil the next one
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return
+    with open(path, 'rb+') as file:
+        file.seek(-1, os.SEEK_END)
+        if file.read(1) != b"\n":
+            file.write(b"\n")
+
+
+class Sweep:
+    """Runs `experiment` (anything `load_experiment` takes) once for each of `runs` overrides
+
+    Each run goes for `ticks` ticks or `duration` simulated seconds, in a process of its own, at
+    most `processes` at once. A run stops itself between ticks once it has taken `timeout`
+    seconds, and its process is killed if it still hasn't finished `GRACE` seconds later (say,
+    in the middle of one very long tick). Its summary is written to the `results` file as soon as
+    it finishes, whether it finished, timed out or failed; runs whose key is already there are
+    skipped, unless they failed and `retry` is set.
+    """
+    experiment: str
+    runs: List[Dict[str, object]]
+    results: str
+
+    def __init__(self, experiment: str, runs: List[Dict[str, object]], results: str, ticks: Optional[int]=None,
+                 duration: Optional[float]=None, processes: Optional[int]=None, timeout: Optional[float]=None,
+                 retry: bool=False):
+        if ticks is None and duration is None:
+            raise ValueError("A sweep needs a number of ticks or a duration")
+        self.experiment = experiment
+        self.runs = runs
+        self.results = results
+        self.ticks = ticks
+        self.duration = duration
+        self.processes = processes
+        self.timeout = timeout
+        self.retry = retry
+
+    def remaining(self) -> List[Dict[str, object]]:
+        done = completed(self.results)
+        seen: Set[str] = set()
+        remaining = []
+        for overrides in self.runs:
+            run_key = key(overrides)
+            result = done.get(run_key)
+            if run_key in seen or result is not None and (result['status'] != 'error' or not self.retry):
+                continue
+            seen.add(run_key)
+            remaining.append(overrides)
+        return remaining
+
+    def already(self) -> int:
+        """How many different runs are already in the results, and so won't be done again"""
+        return len({key(overrides) for overrides in self.runs}) - len(self.remaining())
+
+    def run(self, report: Callable[[Dict[str, object]], None]=None) -> int:
+        """Do every run not already in the results, returning how many were done"""
+        remaining = self.remaining()
+        if not remaining:
+            return 0
+        # the experiment is checked here, where a mistake is quicker to see than from every process
+        load_experiment(self.experiment)
+        _finish_line(self.results)
+        processes = self.processes or os.cpu_count() or 1
+        pending = list(reversed(remaining))
+        running = {} # each run's end of its pipe, to its process, overrides and when it is to be killed
+        with open(self.results, 'a') as output:
+            try:
+                while pending or running:
+                    while pending and len(running) < processes:
+                        overrides = pending.pop()
+                        receiver, sender = multiprocessing.Pipe(duplex=False)
+                        process = multiprocessing.Process(target=_run_in, daemon=True, args=(
+                            sender, self.experiment, overrides, self.ticks, self.duration, self.timeout))
+                        process.start()
+                        sender.close()
+                        deadline = None if self.timeout is None else time.monotonic() + self.timeout + GRACE
+                        running[receiver] = process, overrides, deadline
+                    deadlines = [deadline for _, _, deadline in running.values() if deadline is not None]
+                    wait = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                    ready = multiprocessing.connection.wait(list(running), wait)
+                    for receiver in list(running):
+                        process, overrides, deadline = running[receiver]
+                        result = {'key': key(overrides), 'overrides': overrides}
+                        if receiver in ready:
+                            try:
+                                status, outcome = receiver.recv()
+                            except EOFError:
+                                process.join()
+                                status, outcome = 'error', "The run's process exited with code {}".format(
+                                    process.exitcode)
+                            if status == 'ok':
+                                result.update(status='timeout' if outcome['timed_out'] else 'ok', **outcome)
+                            else:
+                                result.update(status='error', error=outcome)
+                        elif deadline is not None and time.monotonic() >= deadline:
+                            process.terminate()
+                            result.update(status='timeout', timed_out=True,
+                                          error="Killed after {:g} s".format(self.timeout + GRACE))
+                        else:
+                            continue
+                        del running[receiver]
+                        receiver.close()
+                        process.join()
+                        output.write(json.dumps(result) + "\n")
+                        output.flush()
+                        os.fsync(output.fileno())
+                        if report:
+                            report(result)
+            finally:
+                for process, _, _ in running.values():
+                    process.terminate()
+        return len(remaining)
@@ -1,3 +1,4 @@
 from app.app import App
 
-app = App().demo()
+if __name__ == '__main__':
+    app = App().demo()
@@ -1,2 +1,11 @@
-from .particle import Particle, Universe, Tickable, Field, Gravity
-from .vectors import Vector3D, Velocity, Displacement, Acceleration, Force, Coords, Direction
\ No newline at end of file
+from .particle import Particle, Universe, ArrayUniverse, Tickable, Field, Gravity
+from .state import ParticleState
+from .ensemble import EnsembleUniverse, EnsembleState
+from .barneshut import BarnesHutGravity
+from .mesh import MeshGravity
+from .parallel import ParallelGravity
+from .recording import TrajectoryRecorder, TrajectoryReader
+from .conservation import ConservationMonitor
+from . import instrumentation, checkpoint, conservation
+from .vectors import Vector3D, Velocity, Displacement, Acceleration, Force, Coords, Direction
+from .integrators import Integrator, Euler, Leapfrog, VelocityVerlet, Yoshida, ForestRuth, BlockTimestep, WisdomHolman
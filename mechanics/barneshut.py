@@ -0,0 +1,263 @@
+from typing import List, Optional
+
+import numpy as np
+
+from .particle import Gravity, ArrayUniverse
+
+DEPTH = 21 # bits per axis in a Morton key, 3 * 21 fit in 64 bits
+
+
+def _spread(values: np.ndarray) -> np.ndarray:
+    # put two zero bits between each of the low 21 bits, so three axes can be interleaved
+    values = values.astype(np.uint64) & np.uint64(0x1fffff)
+    for shift, mask in ((32, 0x1f00000000ffff), (16, 0x1f0000ff0000ff), (8, 0x100f00f00f00f00f),
+                        (4, 0x10c30c30c30c30c3), (2, 0x1249249249249249)):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def morton_keys(positions: np.ndarray) -> np.ndarray:
+    low = positions.min(axis=0)
+    size = (positions.max(axis=0) - low).max() or 1.0
+    cells = np.floor((positions - low) / size * (2**DEPTH - 1)).astype(np.int64)
+    return (_spread(cells[:, 0]) << np.uint64(2)) | (_spread(cells[:, 1]) << np.uint64(1)) | _spread(cells[:, 2])
+
+
+def _expand(first: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    # [first[0], first[0]+1, ..., first[0]+counts[0]-1, first[1], ...]
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(first, counts) + offsets
+
+
+class Level:
+    """The nodes of one depth of an `Octree`
+
+    Each node covers the particles `order[start:end]`. Leaves have no children; the children of
+    any other node are the nodes `first_child:last_child` of the next level.
+    """
+    starts: np.ndarray
+    ends: np.ndarray
+    leaves: np.ndarray
+    first_child: np.ndarray
+    last_child: np.ndarray
+    masses: np.ndarray
+    centres: np.ndarray
+    sizes: np.ndarray
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray):
+        self.starts = starts
+        self.ends = ends
+        self.first_child = np.zeros(len(starts), dtype=np.int64)
+        self.last_child = np.zeros(len(starts), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+class Octree:
+    """A Barnes–Hut octree over particles sorted into Morton (Z-curve) order
+
+    The topology comes from `build`; `refit` keeps it and only recomputes the mass, centre of
+    mass and bounding size of each node, which is much cheaper and still valid (if a little less
+    tight) after the particles have moved a short way.
+    """
+    order: np.ndarray = None
+    ranks: np.ndarray = None
+    levels: List[Level]
+
+    def __init__(self, leaf_size: int=8):
+        self.leaf_size = leaf_size
+        self.levels = []
+
+    def __len__(self) -> int:
+        return 0 if self.order is None else len(self.order)
+
+    def build(self, positions: np.ndarray, masses: np.ndarray):
+        keys = morton_keys(positions)
+        if self.order is not None and len(self.order) == len(keys):
+            # last tick's order is almost sorted already, which a stable sort takes advantage of
+            self.order = self.order[np.argsort(keys[self.order], kind='stable')]
+        else:
+            self.order = np.argsort(keys, kind='stable')
+        self.ranks = np.empty_like(self.order)
+        self.ranks[self.order] = np.arange(len(self.order))
+        keys = keys[self.order]
+
+        count = len(keys)
+        level = Level(np.array([0]), np.array([count]))
+        self.levels = [level]
+        for depth in range(1, DEPTH + 1):
+            level.leaves = (level.ends - level.starts) <= self.leaf_size
+            parents, = np.nonzero(~level.leaves)
+            if not len(parents):
+                break
+            # a child starts wherever its parent does, or where the key prefix changes inside an open parent
+            prefixes = keys >> np.uint64(3 * (DEPTH - depth))
+            inside = np.zeros(count + 1, dtype=np.int64)
+            inside[level.starts[parents]] += 1
+            inside[level.ends[parents]] -= 1
+            inside = np.cumsum(inside[:-1]).astype(bool)
+            boundary = np.zeros(count, dtype=bool)
+            boundary[level.starts[parents]] = True
+            boundary[1:] |= (prefixes[1:] != prefixes[:-1]) & inside[1:]
+            starts, = np.nonzero(boundary)
+            owner = np.searchsorted(level.starts[parents], starts, side='right') - 1
+            ends = np.minimum(np.append(starts[1:], count), level.ends[parents][owner])
+
+            level.first_child[parents] = np.searchsorted(starts, level.starts[parents])
+            level.last_child[parents] = np.searchsorted(starts, level.ends[parents])
+            level = Level(starts, ends)
+            self.levels.append(level)
+        level.leaves = np.ones(len(level), dtype=bool)
+        self.refit(positions, masses)
+
+    def refit(self, positions: np.ndarray, masses: np.ndarray):
+        masses = masses[self.order]
+        positions = positions[self.order]
+        # sums over any [start, end) come from differences of running totals
+        mass_totals = np.concatenate(([0], np.cumsum(masses)))
+        moment_totals = np.concatenate((np.zeros((1, 3)), np.cumsum(positions * masses[:, np.newaxis], axis=0)))
+        # reduceat needs a valid index for a node ending at the last particle
+        padded = np.concatenate((positions, positions[-1:]))
+        for level in self.levels:
+            level.masses = mass_totals[level.ends] - mass_totals[level.starts]
+            moments = moment_totals[level.ends] - moment_totals[level.starts]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                level.centres = moments / level.masses[:, np.newaxis]
+            # massless nodes have no centre of mass, so use their first particle instead
+            massless = level.masses == 0
+            level.centres[massless] = positions[level.starts[massless]]
+            bounds = np.stack((level.starts, level.ends), axis=1).reshape(-1)
+            extent = np.maximum.reduceat(padded, bounds)[::2] - np.minimum.reduceat(padded, bounds)[::2]
+            level.sizes = extent.max(axis=1)
+
+    def accelerations(self, positions: np.ndarray, masses: np.ndarray, targets: np.ndarray, G: float, theta: float,
+                      softening: float=0, potentials: np.ndarray=None) -> np.ndarray:
+        """Acceleration on each of the particles `targets`, walking the tree for all of them at once
+
+        A node far enough away, where size / distance < theta, is treated as a point mass at its
+        centre of mass; otherwise its children (or, for a leaf, its particles) are used instead.
+        If `potentials` is given, the potential at each target, -ΣGm/r, is added onto it from the
+        same nodes and particles.
+        """
+        out = np.zeros((len(targets), 3))
+        ranks = self.ranks[targets]
+        # pairs of (row in targets, node of the current level) still to be dealt with
+        rows = np.arange(len(targets))
+        nodes = np.zeros(len(targets), dtype=np.int64)
+        direct_rows, direct_sources = [], []
+        for depth, level in enumerate(self.levels):
+            if not len(rows):
+                break
+            separations = level.centres[nodes] - positions[targets[rows]]
+            squared = np.einsum('ij,ij->i', separations, separations) + softening**2
+            contains = (level.starts[nodes] <= ranks[rows]) & (ranks[rows] < level.ends[nodes])
+            accepted = ~contains & (level.sizes[nodes]**2 < theta**2 * squared)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scale = np.where(accepted, G * level.masses[nodes] / (squared * np.sqrt(squared)), 0)
+            for axis in range(3):
+                out[:, axis] += np.bincount(rows, scale * separations[:, axis], minlength=len(targets))
+            if potentials is not None:
+                potentials -= np.bincount(rows, scale * squared, minlength=len(targets))
+
+            opened = ~accepted
+            leaf = opened & level.leaves[nodes]
+            counts = level.ends[nodes[leaf]] - level.starts[nodes[leaf]]
+            direct_rows.append(np.repeat(rows[leaf], counts))
+            direct_sources.append(self.order[_expand(level.starts[nodes[leaf]], counts)])
+
+            branch = opened & ~level.leaves[nodes]
+            counts = level.last_child[nodes[branch]] - level.first_child[nodes[branch]]
+            rows = np.repeat(rows[branch], counts)
+            nodes = _expand(level.first_child[nodes[branch]], counts)
+
+        rows = np.concatenate(direct_rows)
+        sources = np.concatenate(direct_sources)
+        others = sources != targets[rows]
+        rows, sources = rows[others], sources[others]
+        separations = positions[sources] - positions[targets[rows]]
+        squared = np.einsum('ij,ij->i', separations, separations) + softening**2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = G * masses[sources] / (squared * np.sqrt(squared))
+        for axis in range(3):
+            out[:, axis] += np.bincount(rows, scale * separations[:, axis], minlength=len(targets))
+        if potentials is not None:
+            potentials -= np.bincount(rows, scale * squared, minlength=len(targets))
+        return out
+
+
+class BarnesHutGravity(Gravity):
+    """Gravity approximated with a Barnes–Hut octree, taking O(N log N) rather than O(N²) per tick
+
+    `theta` trades accuracy for speed: 0 is exact (and slower than `Gravity`), around 0.5 is
+    usually accurate to a fraction of a percent, and 1 is fast but rough. The tree is fully
+    rebuilt every `rebuild_every` ticks and refitted in between, however many times the
+    integrator asks for forces in each (ticks being told apart by the universe's time). Targets
+    are processed `chunk_size` at a time to bound memory.
+    """
+    theta: float
+    leaf_size: int
+    rebuild_every: int
+    chunk_size: int
+    tree: Optional[Octree] = None
+    _time: Optional[float] = None #of the universe when forces were last worked out
+
+    def __init__(self, G: float, theta: float=0.5, softening: float=0, leaf_size: int=8, rebuild_every: int=5,
+                 chunk_size: int=4096):
+        super().__init__(G, softening)
+        self.theta = theta
+        self.leaf_size = leaf_size
+        self.rebuild_every = rebuild_every
+        self.chunk_size = chunk_size
+        self._ticks_since_build = 0
+
+    def apply(self, universe, active=None):
+        if not isinstance(universe, ArrayUniverse):
+            return super().apply(universe)
+        state = universe.state
+        state.detach()
+        if not len(state):
+            return
+        self.update_tree(state.positions, state.masses, universe.time)
+        # the potential energy is only of use for all the particles at once
+        potentials = np.zeros(len(state)) if self.wants_potential and active is None else None
+        active = np.arange(len(state)) if active is None else np.asarray(active)
+        for start in range(0, len(active), self.chunk_size):
+            targets = active[start:start + self.chunk_size]
+            state.accelerations[targets] += self.tree.accelerations(
+                state.positions, state.masses, targets, self.G, self.theta, self.softening,
+                None if potentials is None else potentials[start:start + self.chunk_size])
+        if potentials is not None:
+            self.keep_potential(state, np.asarray(0.5 * (state.masses @ potentials)))
+
+    def potential_energy(self, state) -> np.ndarray:
+        # from a walk of the tree, refitted (or built) for the particles as they are now
+        if not len(state):
+            return np.zeros(())
+        tree = self.tree
+        if tree is None or len(tree) != len(state):
+            tree = self.tree = Octree(self.leaf_size)
+            tree.build(state.positions, state.masses)
+        else:
+            tree.refit(state.positions, state.masses)
+        potentials = np.zeros(len(state))
+        for start in range(0, len(state), self.chunk_size):
+            targets = np.arange(start, min(start + self.chunk_size, len(state)))
+            tree.accelerations(state.positions, state.masses, targets, self.G, self.theta, self.softening,
+                               potentials[start:start + self.chunk_size])
+        return np.asarray(0.5 * (state.masses @ potentials))
+
+    def update_tree(self, positions: np.ndarray, masses: np.ndarray, time: float):
+        if time != self._time:
+            self._time = time
+            self._ticks_since_build += 1
+        if self.tree is None:
+            self.tree = Octree(self.leaf_size)
+        if len(self.tree) != len(masses) or self._ticks_since_build >= self.rebuild_every:
+            self.tree.build(positions, masses)
+            self._ticks_since_build = 0
+        else:
+            self.tree.refit(positions, masses)
+
+    def copy(self):
+        return self.__class__(self.G, self.theta, self.softening, self.leaf_size, self.rebuild_every, self.chunk_size)
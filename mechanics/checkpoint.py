@@ -0,0 +1,150 @@
+"""Saving a universe to disk part way through a simulation, and carrying on from it later
+
+A checkpoint is a short preamble, a pickled header describing the universe (its class, fields,
+integrator, time, the particles' names and colours and any accelerations still to be applied
+from outside its fields), then the particles' masses, positions,
+velocities and accelerations as raw float64 arrays. It is written in one go, to a temporary file
+which then replaces the old checkpoint, so a crash part way through never leaves a broken one,
+and read back in one go too.
+
+Unpickling can be made to run any code, so the header is read back with an `Unpickler` which
+only lets it name the universes, fields and integrators of this package and NumPy's arrays.
+Even so, only resume checkpoints you trust.
+"""
+import importlib
+import io
+import os
+import pickle
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .particle import Universe, ArrayUniverse, Particle, Field
+from .state import ParticleState
+from .vectors import Coords, Velocity, Acceleration
+from .integrators import Integrator
+from .ensemble import EnsembleUniverse
+
+MAGIC = b'GRAVCKP1'
+PREAMBLE = struct.Struct('<8sQ') # magic, header length
+VERSION = 1
+PACKAGE = __name__.rpartition('.')[0]
+ALLOWED = { # besides this package's universes, fields and integrators, what NumPy needs to rebuild its arrays
+    ('numpy', 'dtype'), ('numpy', 'ndarray'),
+    ('numpy._core.numeric', '_frombuffer'), ('numpy.core.numeric', '_frombuffer'),
+    ('numpy._core.multiarray', '_reconstruct'), ('numpy.core.multiarray', '_reconstruct'),
+    ('numpy._core.multiarray', 'scalar'), ('numpy.core.multiarray', 'scalar'),
+}
+
+
+class HeaderUnpickler(pickle.Unpickler):
+    """Unpickles a checkpoint's header, refusing anything but the classes it should hold"""
+    def find_class(self, module: str, name: str):
+        if (module, name) in ALLOWED:
+            return super().find_class(module, name)
+        if module == PACKAGE or module.startswith(PACKAGE + '.'):
+            found = getattr(importlib.import_module(module), name, None)
+            if isinstance(found, type) and issubclass(found, (Universe, Field, Integrator)):
+                return found
+        raise pickle.UnpicklingError("A checkpoint can't hold {}.{}".format(module, name))
+
+
+def _arrays(universe: Universe) -> Tuple[np.ndarray, ...]:
+    if isinstance(universe, ArrayUniverse):
+        state = universe.state
+        return state.masses, state.positions, state.velocities, state.accelerations
+    particles = universe.particles
+    return (np.array([particle.mass for particle in particles], dtype=np.float64).reshape(-1),
+            np.array([particle.position.components for particle in particles], dtype=np.float64).reshape(-1, 3),
+            np.array([particle.velocity.components for particle in particles], dtype=np.float64).reshape(-1, 3),
+            np.array([particle.acceleration.components for particle in particles], dtype=np.float64).reshape(-1, 3))
+
+
+def save(universe: Universe, path: str, name: Optional[str]=None, **extra):
+    """Write `universe` to a checkpoint at `path`, along with any `extra` details to keep with it
+
+    Fields are stored as their `copy()`, so only their parameters are kept, not anything they
+    have cached; integrators keep whatever state their `copy()` carries over. Ensembles can't be
+    saved as a whole, only each of their `member`s.
+    """
+    if isinstance(universe, EnsembleUniverse):
+        raise ValueError("An ensemble can't be checkpointed as a whole; save each of its members instead")
+    header = pickle.dumps({
+        'version': VERSION,
+        'class': universe.__class__,
+        'name': name,
+        'fields': [field.copy() for field in universe.fields],
+        'integrator': universe.integrator.copy() if isinstance(universe, ArrayUniverse) else None,
+        'time': universe.time,
+        'tick_length': universe.TICK_LENGTH,
+        'revision': universe.revision,
+        'external': universe.state.external if isinstance(universe, ArrayUniverse) else None,
+        'names': [particle.name for particle in universe.particles],
+        'colours': [particle.colour for particle in universe.particles],
+        'extra': extra,
+    }, protocol=pickle.HIGHEST_PROTOCOL)
+    header += b'\0' * (-(PREAMBLE.size + len(header)) % 8) # keep the arrays 8-byte aligned
+    # an empty array's view can't be cast to bytes, but there's nothing to write for it anyway
+    buffers = [PREAMBLE.pack(MAGIC, len(header)), header] + \
+              [memoryview(np.ascontiguousarray(array, dtype=np.float64)).cast('B')
+               for array in _arrays(universe) if array.size]
+
+    temporary = path + '.tmp'
+    descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        total, written = sum(len(buffer) for buffer in buffers), 0
+        if hasattr(os, 'writev'):
+            written = os.writev(descriptor, buffers)
+        if written != total:
+            # writev may stop short for very large checkpoints, and isn't everywhere anyway
+            os.write(descriptor, b''.join(buffers)[written:])
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+    os.replace(temporary, path)
+
+
+def load(path: str) -> Tuple[Universe, dict]:
+    """Restore a universe from the checkpoint at `path`, with the header it was saved with"""
+    size = os.path.getsize(path)
+    data = bytearray(size)
+    with open(path, 'rb', buffering=0) as file:
+        if file.readinto(data) != size:
+            raise ValueError("{} was cut short while it was being read".format(path))
+    magic, length = PREAMBLE.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("{} is not a checkpoint".format(path))
+    try:
+        header = HeaderUnpickler(io.BytesIO(data[PREAMBLE.size:PREAMBLE.size + length])).load()
+    except pickle.UnpicklingError as error:
+        raise ValueError("{} has an unexpected header: {}".format(path, error))
+    if header['version'] != VERSION:
+        raise ValueError("{} is a version {} checkpoint, not {}".format(path, header['version'], VERSION))
+
+    count = len(header['names'])
+    offset = PREAMBLE.size + length
+    if size != offset + count * 10 * 8:
+        raise ValueError("{} is the wrong size for a checkpoint of {} particles".format(path, count))
+    arrays: List[np.ndarray] = []
+    for shape in ((count,), (count, 3), (count, 3), (count, 3)):
+        arrays.append(np.frombuffer(data, np.float64, int(np.prod(shape)), offset).reshape(shape))
+        offset += arrays[-1].nbytes
+    masses, positions, velocities, accelerations = arrays
+
+    if issubclass(header['class'], ArrayUniverse):
+        universe = header['class'].from_state(ParticleState(masses, positions, velocities, accelerations),
+                                              header['names'], header['colours'], header['fields'],
+                                              header['integrator'])
+        universe.state.external = header.get('external')
+    else:
+        universe = header['class'](header['fields'], [
+            Particle(name, float(mass), Coords(*position), Velocity.from_components(*velocity),
+                     Acceleration.from_components(*acceleration), colour)
+            for name, colour, mass, position, velocity, acceleration
+            in zip(header['names'], header['colours'], masses, positions, velocities, accelerations)
+        ])
+    universe.time = header['time']
+    universe.TICK_LENGTH = header['tick_length']
+    universe.revision = header['revision']
+    return universe, header
@@ -0,0 +1,231 @@
+"""Keeping track of whether a simulation still conserves what it should
+
+A `ConservationMonitor` attached to an `ArrayUniverse` or `EnsembleUniverse` samples its total
+energy, linear and angular momentum and centre of mass every so many ticks, and compares them
+with where they started. The kinetic energy and momenta only take a pass over the particles.
+The potential energy is the expensive part, so, with integrators whose last accelerations are
+for the positions a tick ends at (see `Integrator.FORCES_AT_END`), `Gravity` fields are asked to
+work it out along with them on the ticks that are sampled, which costs little more than the
+tick would anyway. Otherwise each field works it out by itself, the same way it works out its
+accelerations (so a Barnes–Hut or mesh field never takes a pass over every pair), for about the
+cost of one more force evaluation per sample.
+
+    monitor = ConservationMonitor(every=100, threshold=1e-6).attach(universe)
+"""
+import collections
+from typing import Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+from .particle import Gravity
+
+EVERY = 100 #ticks between samples
+THRESHOLD = 1e-6 #relative energy error beyond which an alert is raised
+HISTORY = 1000 #samples kept
+SAFETY = 0.8 #of the tick length suggested, to leave room before the threshold is reached again
+
+
+def totals(universe) -> Dict[str, np.ndarray]:
+    """Everything conserved but the potential energy, of an array or ensemble universe
+
+    For an ensemble, each is indexed by member first.
+    """
+    state = universe.state
+    masses, positions, velocities = state.masses, state.positions, state.velocities
+    weights = masses[..., np.newaxis]
+    mass = masses.sum(axis=-1)
+    moments = np.cross(positions, velocities)
+    return {
+        'kinetic': 0.5 * np.einsum('...n,...nk,...nk->...', masses, velocities, velocities),
+        'momentum': (weights * velocities).sum(axis=-2),
+        'angular_momentum': (weights * moments).sum(axis=-2),
+        'centre_of_mass': (weights * positions).sum(axis=-2) / mass[..., np.newaxis],
+        'mass': mass,
+        # what the momenta's drift is measured against, as they may well start at nothing
+        'momentum_scale': (masses * np.linalg.norm(velocities, axis=-1)).sum(axis=-1),
+        'angular_momentum_scale': (masses * np.linalg.norm(moments, axis=-1)).sum(axis=-1),
+    }
+
+
+def potential(universe) -> np.ndarray:
+    """The potential energy of the universe's `Gravity` fields, from their last accelerations if possible"""
+    state = universe.state
+    total = np.zeros(state.masses.shape[:-1])
+    for field in universe.fields:
+        if not isinstance(field, Gravity):
+            continue
+        energy = field.potential_at(state)
+        if energy is None:
+            energy = field.potential_energy(state)
+        total = total + energy
+    return total
+
+
+def measure(universe) -> Dict[str, np.ndarray]:
+    measured = totals(universe)
+    measured['potential'] = potential(universe)
+    measured['energy'] = measured['kinetic'] + measured['potential']
+    return measured
+
+
+class ConservationMonitor:
+    """Samples a universe's conserved quantities every `every` ticks, raising alerts if they drift
+
+    Each sample holds the totals from `measure` and how far each has drifted since the first:
+    `energy_error` relative to the starting energy, `momentum_drift` and
+    `angular_momentum_drift` relative to the sum of their magnitudes over the particles, and
+    `centre_of_mass_drift` in metres from where the starting momentum would have taken it. The
+    last `history` are kept in `samples`. Drift is measured from the first sample after
+    attaching, and afresh from the first after the universe is edited (see `Universe.touch`),
+    so neither costs a measurement of its own.
+
+    When the relative energy error crosses `threshold`, an alert is added to `alerts` and passed
+    to every `on_alert` function. If `adapt`, the universe's tick length is also cut to the
+    `suggested_tick_length`, and the error counted afresh from there. Only forces from `Gravity`
+    fields count towards the potential energy.
+    """
+    every: int
+    threshold: float
+    adapt: bool
+    universe = None
+    ticks: int = 0
+    reference: Optional[Dict[str, np.ndarray]] = None
+    revision: int = 0 #of the universe when the reference was measured
+    reused: int = 0 #samples whose potential energy came from the fields' own accelerations
+    computed: int = 0 #samples whose potential energy took a pass of its own
+
+    def __init__(self, every: int=EVERY, threshold: float=THRESHOLD, adapt: bool=False, history: int=HISTORY,
+                 on_alert: Optional[List[Callable[['ConservationMonitor', Dict[str, object]], None]]]=None):
+        if every < 1:
+            raise ValueError("A monitor has to sample at least every tick, not every {}".format(every))
+        self.every = every
+        self.threshold = threshold
+        self.adapt = adapt
+        self.samples: Deque[Dict[str, object]] = collections.deque(maxlen=history)
+        self.alerts: List[Dict[str, object]] = []
+        self.on_alert = on_alert or []
+        self._alerting = None
+
+    def attach(self, universe) -> 'ConservationMonitor':
+        """Start monitoring `universe`, from how it is now"""
+        universe.monitor = self
+        self.universe = universe
+        self.ticks = 0
+        self.samples.clear()
+        self.rebase()
+        return self
+
+    def detach(self):
+        if self.universe is not None:
+            self._want_potential(False)
+            self.universe.monitor = None
+            self.universe = None
+
+    def rebase(self):
+        """Measure drift from the next sample, rather than from where it was measured from so far"""
+        self.reference = None
+        self.revision = self.universe.revision
+        self._alerting = None
+
+    def _want_potential(self, wanted: bool):
+        for field in self.universe.fields:
+            if isinstance(field, Gravity):
+                field.wants_potential = wanted
+
+    def before(self, universe):
+        """Called at the start of each tick"""
+        # with other integrators, the potential worked out with the last accelerations would be
+        # for positions part way through the tick, and so thrown away
+        if (self.ticks + 1) % self.every == 0 and universe.integrator.FORCES_AT_END:
+            self._want_potential(True)
+
+    def after(self, universe):
+        """Called at the end of each tick"""
+        if universe.revision != self.revision:
+            # edited from outside the simulation, which isn't expected to conserve anything
+            self.rebase()
+        self.ticks += 1
+        if self.ticks % self.every == 0:
+            self.sample()
+
+    def sample(self) -> Dict[str, object]:
+        universe = self.universe
+        state = universe.state
+        reused = all(field.potential_at(state) is not None
+                     for field in universe.fields if isinstance(field, Gravity))
+        measured = measure(universe)
+        self._want_potential(False)
+        if reused:
+            self.reused += 1
+        else:
+            self.computed += 1
+        if self.reference is None:
+            self.reference = dict(measured, time=universe.time)
+        reference = self.reference
+
+        expected = reference['centre_of_mass'] + (reference['momentum'] / reference['mass'][..., np.newaxis]) * \
+            (universe.time - reference['time'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            measured.update(
+                tick=self.ticks,
+                time=universe.time,
+                energy_error=np.abs((measured['energy'] - reference['energy']) / reference['energy']),
+                momentum_drift=np.linalg.norm(measured['momentum'] - reference['momentum'], axis=-1) /
+                reference['momentum_scale'],
+                angular_momentum_drift=np.linalg.norm(measured['angular_momentum'] - reference['angular_momentum'],
+                                                      axis=-1) / reference['angular_momentum_scale'],
+                centre_of_mass_drift=np.linalg.norm(measured['centre_of_mass'] - expected, axis=-1),
+            )
+        self.samples.append(measured)
+        self._check(measured)
+        return measured
+
+    def _check(self, sample: Dict[str, object]):
+        # alerts are raised as the error crosses the threshold, rather than on every sample beyond it
+        alerting = sample['energy_error'] > self.threshold
+        crossed = alerting if self._alerting is None else alerting & ~self._alerting
+        self._alerting = alerting
+        if not np.any(crossed):
+            return
+        alert = {'tick': sample['tick'], 'time': sample['time'], 'energy_error': sample['energy_error'],
+                 'tick_length': self.universe.TICK_LENGTH, 'suggested_tick_length': self.suggested_tick_length()}
+        if np.ndim(crossed):
+            alert['members'] = np.flatnonzero(crossed).tolist()
+        self.alerts.append(alert)
+        for function in self.on_alert:
+            function(self, alert)
+        if self.adapt:
+            self.universe.TICK_LENGTH = min(self.universe.TICK_LENGTH, alert['suggested_tick_length'])
+            self.rebase()
+
+    def suggested_tick_length(self) -> float:
+        """A tick length which would have kept the worst energy error so far within the threshold
+
+        The error of an integrator of order p grows with the tick length to the power p.
+        """
+        if not self.samples:
+            return self.universe.TICK_LENGTH
+        error = float(np.max(self.samples[-1]['energy_error']))
+        if not error or not np.isfinite(error):
+            return self.universe.TICK_LENGTH
+        order = self.universe.integrator.ORDER
+        return self.universe.TICK_LENGTH * min(1.0, SAFETY * (self.threshold / error) ** (1 / order))
+
+    @property
+    def latest(self) -> Optional[Dict[str, object]]:
+        return self.samples[-1] if self.samples else None
+
+    def summary(self) -> Dict[str, object]:
+        """The worst drift of each kind over the samples kept, and the alerts, for diagnostics"""
+        drifts = ('energy_error', 'momentum_drift', 'angular_momentum_drift', 'centre_of_mass_drift')
+        summary = {
+            'every': self.every,
+            'samples': len(self.samples),
+            'potential_reused': self.reused,
+            'potential_computed': self.computed,
+            'alerts': len(self.alerts),
+        }
+        for drift in drifts:
+            values = [np.nanmax(sample[drift]) for sample in self.samples]
+            summary['max_' + drift] = float(max(values)) if values else None
+        return summary
@@ -0,0 +1,210 @@
+"""Many variants of one universe, advanced together as a single batch of arrays
+
+An `EnsembleUniverse` stacks M universes of the same N particles into (M, N, 3) arrays, each with
+its own G, so a parameter study advances every variant with one call of the force kernel and one
+integrator step, rather than paying Python's overheads M times over.
+"""
+import math as maths
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .particle import Universe, ArrayUniverse, Gravity
+from .state import ParticleState
+from .integrators import Integrator, Euler, BlockTimestep, WisdomHolman
+from . import kernels, instrumentation, conservation
+
+
+class EnsembleState:
+    """Structure-of-arrays storage for the particles of every member of an ensemble
+
+    Masses are (M, N), and positions, velocities and accelerations (M, N, 3), indexed by member
+    first, so `positions[m]` is the (N, 3) positions of member m.
+    """
+    masses: np.ndarray
+    positions: np.ndarray
+    velocities: np.ndarray
+    accelerations: np.ndarray
+
+    def __init__(self, masses, positions, velocities, accelerations=None):
+        self.masses = np.array(masses, dtype=np.float64)
+        if self.masses.ndim != 2:
+            raise ValueError("Ensemble masses have to be (members, particles), not {}".format(self.masses.shape))
+        shape = self.masses.shape + (3,)
+        self.positions = np.array(positions, dtype=np.float64).reshape(shape)
+        self.velocities = np.array(velocities, dtype=np.float64).reshape(shape)
+        if accelerations is None:
+            self.accelerations = np.zeros(shape)
+        else:
+            self.accelerations = np.array(accelerations, dtype=np.float64).reshape(shape)
+
+    @classmethod
+    def stack(cls, states: Sequence[ParticleState]) -> 'EnsembleState':
+        if len({len(state) for state in states}) > 1:
+            raise ValueError("Every member of an ensemble needs the same number of particles")
+        return cls(*(np.stack([getattr(state, name) for state in states])
+                     for name in ('masses', 'positions', 'velocities', 'accelerations')))
+
+    @property
+    def members(self) -> int:
+        return self.masses.shape[0]
+
+    @property
+    def count(self) -> int:
+        return self.masses.shape[1]
+
+    def __len__(self) -> int:
+        return self.members
+
+    def __repr__(self) -> str:
+        return "{}({} members of {} particles)".format(self.__class__.__name__, self.members, self.count)
+
+    def detach(self):
+        # ensembles are copied rather than forked, so their arrays are never shared
+        pass
+
+    def member(self, index: int) -> ParticleState:
+        """A copy of member `index`'s particles"""
+        return ParticleState(self.masses[index], self.positions[index], self.velocities[index],
+                             self.accelerations[index])
+
+    def copy(self):
+        return self.__class__(self.masses, self.positions, self.velocities, self.accelerations)
+
+
+class EnsembleUniverse(Universe):
+    """M variants of a universe of the same particles, under gravity, ticked together
+
+    Each member has its own masses, positions and velocities, and its own G (`G` is an (M,)
+    array, which can be changed in place), but they share the softening, tick length and
+    integrator, and so the same simulated time. Integrators working on whole arrays (`Euler`,
+    `Leapfrog`, `VelocityVerlet`, `Yoshida`) work for ensembles unchanged; those with
+    per-particle bookkeeping don't. There are no `Particle` objects: `member` gives an ordinary
+    `ArrayUniverse` of any one member, to look at, record or carry on with by itself.
+    """
+    state: EnsembleState
+    names: List[str]
+    colours: List[str]
+
+    INTEGRATED = True
+    UNSUPPORTED = (BlockTimestep, WisdomHolman) # they keep per-particle state, of one universe's shape
+
+    def __init__(self, state: EnsembleState, G, softening: float=0, integrator: Integrator=None,
+                 names: Optional[List[str]]=None, colours: Optional[List[str]]=None,
+                 block_size: int=kernels.BLOCK_SIZE):
+        G = np.broadcast_to(np.asarray(G, dtype=np.float64), (state.members,)).copy()
+        # the kernel's tiles are M times larger for an ensemble, so are made narrower to make up
+        block_size = max(1, int(block_size / maths.sqrt(max(state.members, 1))))
+        super().__init__([Gravity(G, softening, block_size)])
+        self.state = state
+        self.integrator = integrator or Euler()
+        self.names = names or ["Particle {}".format(index + 1) for index in range(state.count)]
+        self.colours = colours or ["black"] * state.count
+
+    @classmethod
+    def from_universes(cls, universes: Sequence[ArrayUniverse]) -> 'EnsembleUniverse':
+        """An ensemble of `universes`, which need the same particles, tick length and softening
+
+        The first universe's integrator, names and colours, and time, are used for all of them.
+        """
+        first = universes[0]
+        gravities = [cls._gravity(universe) for universe in universes]
+        if len({gravity.softening for gravity in gravities}) > 1:
+            raise ValueError("Every member of an ensemble needs the same softening")
+        if len({universe.TICK_LENGTH for universe in universes}) > 1:
+            raise ValueError("Every member of an ensemble needs the same tick length")
+        ensemble = cls(EnsembleState.stack([universe.state for universe in universes]),
+                       [gravity.G for gravity in gravities], gravities[0].softening, first.integrator.copy(),
+                       [particle.name for particle in first.particles],
+                       [particle.colour for particle in first.particles], gravities[0].block_size)
+        ensemble.TICK_LENGTH = first.TICK_LENGTH
+        ensemble.time = first.time
+        return ensemble
+
+    @classmethod
+    def from_universe(cls, universe: ArrayUniverse, members: int) -> 'EnsembleUniverse':
+        """An ensemble of `members` identical copies of `universe`, to be varied through `state` and `G`"""
+        return cls.from_universes([universe] * members)
+
+    @staticmethod
+    def _gravity(universe: ArrayUniverse) -> Gravity:
+        if len(universe.fields) != 1 or type(universe.fields[0]) is not Gravity:
+            raise ValueError("Only universes with just a Gravity field can be put in an ensemble")
+        return universe.fields[0]
+
+    @property
+    def gravity(self) -> Gravity:
+        return self.fields[0]
+
+    @property
+    def G(self) -> np.ndarray:
+        return self.gravity.G
+
+    @G.setter
+    def G(self, value):
+        self.gravity.G[:] = value
+
+    @property
+    def members(self) -> int:
+        return self.state.members
+
+    def add_particle(self, particle):
+        raise ValueError("Particles can't be added to an ensemble, only to the universes it's made from")
+
+    def remove_particle(self, particle):
+        raise ValueError("Particles can't be removed from an ensemble, only from the universes it's made from")
+
+    def accelerate(self, active=None):
+        """Work out every member's particles' accelerations, for their current positions"""
+        if active is not None:
+            raise ValueError("An ensemble can only work out the accelerations of all its particles at once")
+        state, gravity = self.state, self.gravity
+        state.accelerations[:] = 0
+        potential = np.zeros(self.members) if gravity.wants_potential else None
+        with instrumentation.phase('field.Gravity'), np.errstate(invalid='ignore'):
+            kernels.accelerations(state.positions, state.masses, gravity.G, gravity.softening, gravity.block_size,
+                                  out=state.accelerations, potential=potential)
+        if potential is not None:
+            gravity.keep_potential(state, potential)
+        return state.accelerations
+
+    def tick(self, t: int=0):
+        if isinstance(self.integrator, self.UNSUPPORTED):
+            raise ValueError("{!r} can't advance an ensemble".format(self.integrator))
+        if self.monitor is not None:
+            self.monitor.before(self)
+        with instrumentation.phase('integrate.ensemble'):
+            self.integrator.step(self, self.TICK_LENGTH)
+        self.time += self.TICK_LENGTH
+        if self.monitor is not None:
+            self.monitor.after(self)
+
+    def member(self, index: int) -> ArrayUniverse:
+        """A copy of member `index`, as a universe by itself"""
+        gravity = self.gravity
+        universe = ArrayUniverse.from_state(self.state.member(index), self.names, self.colours,
+                                            [Gravity(float(gravity.G[index]), gravity.softening)],
+                                            self.integrator.copy())
+        universe.time = self.time
+        universe.TICK_LENGTH = self.TICK_LENGTH
+        return universe
+
+    def diagnostics(self) -> Dict[str, np.ndarray]:
+        """Each member's energies, momentum, angular momentum and centre of mass, indexed by member
+
+        Unless the last tick worked out the potential energy along the way (as it does for ticks
+        sampled by a `ConservationMonitor`), that is another pass over every pair.
+        """
+        return conservation.measure(self)
+
+    def copy(self):
+        gravity = self.gravity
+        ensemble = self.__class__(self.state.copy(), gravity.G, gravity.softening, self.integrator.copy(),
+                                  list(self.names), list(self.colours))
+        ensemble.gravity.block_size = gravity.block_size
+        ensemble.time = self.time
+        ensemble.TICK_LENGTH = self.TICK_LENGTH
+        return ensemble
+
+    def fork(self):
+        return self.copy()
@@ -0,0 +1,137 @@
+"""Timings of each phase of ticking and drawing, to see where the time goes
+
+Nothing is timed unless `enabled` is set. Each phase (say `'integrate'` or `'field.Gravity'`)
+keeps a `RollingHistogram` of its last few hundred durations, available from `timings()`, and
+every duration is also passed to any functions added with `add_hook`. A phase can be entered
+again before it has finished, as fields are from inside the integrator's sub-steps; each
+entry is timed by itself.
+
+    with instrumentation.phase('draw'):
+        canvas.draw()
+"""
+import bisect
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+WINDOW = 500 #samples kept of each phase
+BINS = np.logspace(-7, 1, 8 * 8 + 1) #seconds, 8 a decade from 0.1 µs to 10 s
+_EDGES = BINS.tolist() # bisecting a list is much quicker than searching an array, for one value
+
+enabled: bool = False
+_phases: Dict[str, 'Phase'] = {}
+_hooks: List[Callable[[str, float], None]] = []
+
+
+class RollingHistogram:
+    """Durations of the last `window` samples of a phase, binned on a log scale as they come in"""
+    window: int
+    count: int = 0 #samples ever added
+
+    def __init__(self, window: int=WINDOW):
+        self.window = window
+        self.samples = np.zeros(window)
+        self.bins = np.zeros(window, dtype=np.int64)
+        self.counts = np.zeros(len(BINS) + 1, dtype=np.int64)
+
+    def add(self, seconds: float):
+        index = self.count % self.window
+        if self.count >= self.window:
+            self.counts[self.bins[index]] -= 1
+        bin = bisect.bisect_left(_EDGES, seconds)
+        self.samples[index] = seconds
+        self.bins[index] = bin
+        self.counts[bin] += 1
+        self.count += 1
+
+    def __len__(self) -> int:
+        return min(self.count, self.window)
+
+    @property
+    def recent(self) -> np.ndarray:
+        return self.samples[:len(self)]
+
+    def percentile(self, q: float) -> float:
+        """The upper edge of the bin holding the `q`th percentile, which is accurate to a bin (about 33%)"""
+        if not len(self):
+            return 0.0
+        bin = int(np.searchsorted(np.cumsum(self.counts), q / 100 * len(self)))
+        return float(BINS[min(bin, len(BINS) - 1)])
+
+    def summary(self) -> Dict[str, float]:
+        recent = self.recent
+        return {
+            'count': self.count,
+            'mean': float(recent.mean()) if len(recent) else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'max': float(recent.max()) if len(recent) else 0.0,
+        }
+
+    def clear(self):
+        self.count = 0
+        self.counts[:] = 0
+
+
+class Phase:
+    """A context manager timing whatever is done inside it, when instrumentation is enabled"""
+    name: str
+
+    def __init__(self, name: str):
+        self.name = name
+        self.histogram = RollingHistogram()
+        self._starts: List[Optional[float]] = [] #of each entry not yet exited, innermost last
+
+    def __enter__(self):
+        self._starts.append(time.perf_counter() if enabled else None)
+        return self
+
+    def __exit__(self, *_):
+        start = self._starts.pop()
+        if start is not None:
+            seconds = time.perf_counter() - start
+            self.histogram.add(seconds)
+            for hook in _hooks:
+                hook(self.name, seconds)
+        return False
+
+
+def phase(name: str) -> Phase:
+    if name not in _phases:
+        _phases[name] = Phase(name)
+    return _phases[name]
+
+
+def timings() -> Dict[str, Dict[str, float]]:
+    """A summary of every phase timed so far, in seconds"""
+    return {name: phase.histogram.summary() for name, phase in _phases.items() if phase.histogram.count}
+
+
+def histogram(name: str) -> RollingHistogram:
+    return phase(name).histogram
+
+
+def reset():
+    for phase in _phases.values():
+        phase.histogram.clear()
+
+
+def enable(on: bool=True):
+    global enabled
+    enabled = on
+
+
+def add_hook(hook: Callable[[str, float], None]):
+    """Have `hook(phase, seconds)` called each time a phase finishes"""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[str, float], None]):
+    _hooks.remove(hook)
+
+
+def format_timings(summary: Dict[str, Dict[str, float]]=None) -> str:
+    summary = timings() if summary is None else summary
+    return "\n".join("{:<20} {:8.2f} ms  p95 {:8.2f} ms".format(name, values['mean'] * 1e3, values['p95'] * 1e3)
+                     for name, values in sorted(summary.items()))
@@ -0,0 +1,267 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import numpy as np
+
+from .particle import Copyable, Gravity
+from . import kepler
+
+
+class Integrator(Copyable, ABC):
+    """Advances an `ArrayUniverse` by one step of `dt` seconds
+
+    Integrators work on the arrays of `universe.state`, and get accelerations for the current
+    positions from `universe.accelerate()`.
+    """
+    ORDER: int = 1 #the error over a fixed time goes with the step length to this power
+    FORCES_AT_END: bool = False #whether a step's last accelerations are for the positions it ends at
+
+    @abstractmethod
+    def step(self, universe, dt: float): pass
+
+    def copy(self):
+        return self.__class__()
+
+    def __repr__(self) -> str:
+        return "{}()".format(self.__class__.__name__)
+
+
+class Euler(Integrator):
+    """The original first-order scheme: s = ut + ½at², v = u + at, with a taken at the start of the step"""
+    def step(self, universe, dt: float):
+        state = universe.state
+        state.detach()
+        accelerations = universe.accelerate()
+        state.positions += state.velocities * dt + 0.5 * accelerations * dt**2
+        state.velocities += accelerations * dt
+
+
+class Leapfrog(Integrator):
+    """Second-order, symplectic drift-kick-drift leapfrog, one force evaluation a step"""
+    ORDER = 2
+
+    def step(self, universe, dt: float):
+        state = universe.state
+        state.detach()
+        state.positions += 0.5 * dt * state.velocities
+        state.velocities += dt * universe.accelerate()
+        state.positions += 0.5 * dt * state.velocities
+
+
+class VelocityVerlet(Integrator):
+    """Second-order, symplectic kick-drift-kick leapfrog, one force evaluation a step
+
+    The accelerations are worked out at the end of each step and kept for the start of the next,
+    so, unlike with `Leapfrog`, they (and the potential energy, if the fields are asked for it)
+    are always for the universe's current positions between ticks.
+    """
+    ORDER = 2
+    FORCES_AT_END = True
+    _positions: Optional[np.ndarray] = None
+    _revision: Optional[int] = None
+
+    def step(self, universe, dt: float):
+        state = universe.state
+        state.detach()
+        if self._revision != universe.revision or self._positions is None or \
+                self._positions.shape != state.positions.shape or not np.array_equal(self._positions, state.positions):
+            # the first step, or the particles or fields have been changed since the last one
+            universe.accelerate()
+        state.velocities += 0.5 * dt * state.accelerations
+        state.positions += dt * state.velocities
+        state.velocities += 0.5 * dt * universe.accelerate()
+        self._positions = state.positions.copy()
+        self._revision = universe.revision
+
+
+class Yoshida(Integrator):
+    """Fourth-order, symplectic Forest–Ruth/Yoshida scheme: three leapfrog steps of 1.35, -1.70 and 1.35 dt
+
+    It costs three force evaluations a step, but the energy error falls with dt⁴ rather than dt²,
+    so much longer steps can be taken for the same accuracy.
+    """
+    ORDER = 4
+    W1 = 1 / (2 - 2**(1/3))
+    W0 = -2**(1/3) * W1
+    DRIFTS = (W1 / 2, (W0 + W1) / 2, (W0 + W1) / 2, W1 / 2)
+    KICKS = (W1, W0, W1)
+
+    def step(self, universe, dt: float):
+        state = universe.state
+        state.detach()
+        for drift, kick in zip(self.DRIFTS, self.KICKS):
+            state.positions += drift * dt * state.velocities
+            state.velocities += kick * dt * universe.accelerate()
+        state.positions += self.DRIFTS[-1] * dt * state.velocities
+
+
+class BlockTimestep(Integrator):
+    """Kick-drift-kick leapfrog where each particle takes its own power-of-two fraction of the step
+
+    A particle on level k steps dt / 2**k, for k up to `levels`. Its level is chosen afresh at the
+    end of each of its own steps from `accuracy` * |a| / |da/dt| (the jerk being estimated from
+    its last two accelerations), so only particles in close encounters are made to take short
+    steps. A particle can move to a finer level whenever its step ends, but to a coarser one only
+    where the longer step lines up with the others. Every particle drifts up to each step's end,
+    but only those whose own step ends there have their forces recomputed, which fields supporting
+    `active` can do for just those particles.
+    """
+    ORDER = 2
+    levels: int
+    accuracy: float
+    particle_levels: Optional[np.ndarray] = None
+    accelerations: Optional[np.ndarray] = None
+    _revision: Optional[int] = None
+
+    def __init__(self, levels: int=10, accuracy: float=0.02):
+        self.levels = levels
+        self.accuracy = accuracy
+
+    def step(self, universe, dt: float):
+        state = universe.state
+        state.detach()
+        if self._revision != universe.revision or self.particle_levels is None or \
+                len(self.particle_levels) != len(state):
+            # the first step, or the particles or fields have been changed since the last one
+            self.accelerations = universe.accelerate().copy()
+            # with no jerk yet, estimate it from the accelerations a whole step's drift later, which
+            # (unlike |v| / |a|) doesn't send a particle at rest down to the deepest level
+            positions = state.positions.copy()
+            state.positions += dt * state.velocities
+            jerks = (universe.accelerate() - self.accelerations) / dt
+            state.positions[:] = positions
+            with np.errstate(divide='ignore', invalid='ignore'):
+                timescales = np.linalg.norm(self.accelerations, axis=1) / np.linalg.norm(jerks, axis=1)
+            self.particle_levels = self.level_for(timescales, dt)
+
+        # times are counted in the finest steps allowed, so every step starts and ends on a whole one
+        total = 2**self.levels
+        unit = dt / total
+        strides = 2**(self.levels - self.particle_levels)
+        state.velocities += 0.5 * unit * strides[:, np.newaxis] * self.accelerations
+        ends = strides.copy()
+        time = 0
+        while time < total:
+            next = int(ends.min())
+            state.positions += (next - time) * unit * state.velocities
+            time = next
+
+            ending, = np.nonzero(ends == time)
+            steps = (unit * strides[ending])[:, np.newaxis]
+            accelerations = universe.accelerate(ending)[ending]
+            jerks = (accelerations - self.accelerations[ending]) / steps
+            self.accelerations[ending] = accelerations
+            state.velocities[ending] += 0.5 * steps * accelerations
+            if time == total:
+                break
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                timescales = np.linalg.norm(accelerations, axis=1) / np.linalg.norm(jerks, axis=1)
+            # shorter steps can start at once, but longer ones only where they line up with this time
+            trailing_zeros = (time & -time).bit_length() - 1
+            levels = np.clip(self.level_for(timescales, dt), self.levels - trailing_zeros, self.levels)
+            self.particle_levels[ending] = levels
+            strides[ending] = 2**(self.levels - levels)
+            state.velocities[ending] += 0.5 * (unit * strides[ending])[:, np.newaxis] * accelerations
+            ends[ending] = time + strides[ending]
+
+        # every step ends together at the end of the tick, where any level can be chosen for the next
+        with np.errstate(divide='ignore', invalid='ignore'):
+            timescales = np.linalg.norm(accelerations, axis=1) / np.linalg.norm(jerks, axis=1)
+        self.particle_levels[ending] = self.level_for(timescales, dt)
+        self._revision = universe.revision
+
+    def level_for(self, timescales: np.ndarray, dt: float) -> np.ndarray:
+        wanted = self.accuracy * np.nan_to_num(timescales, nan=np.inf)
+        with np.errstate(divide='ignore'):
+            levels = np.ceil(np.log2(dt / wanted))
+        return np.clip(np.nan_to_num(levels, nan=0), 0, self.levels).astype(np.int64)
+
+    def copy(self):
+        integrator = self.__class__(self.levels, self.accuracy)
+        if self.particle_levels is not None:
+            integrator.particle_levels = self.particle_levels.copy()
+            integrator.accelerations = self.accelerations.copy()
+            integrator._revision = self._revision
+        return integrator
+
+    def __repr__(self) -> str:
+        return "{}({}, {})".format(self.__class__.__name__, self.levels, self.accuracy)
+
+
+class WisdomHolman(Integrator):
+    """Mixed-variable symplectic integrator for systems dominated by one central mass
+
+    Each body's orbit about the central mass is followed exactly with a Kepler drift, so only the
+    small pull of the bodies on each other has to be integrated by kicks (in democratic
+    heliocentric coordinates). This allows steps of a sizeable fraction of the shortest orbit.
+    The central mass is the heaviest particle, unless `central` gives its index, and G is taken
+    from the universe's `Gravity` field.
+    """
+    ORDER = 2
+    FORCES_AT_END = True
+    central: Optional[int]
+    _positions: Optional[np.ndarray] = None
+    _revision: Optional[int] = None
+    _interactions: Optional[np.ndarray] = None
+
+    def __init__(self, central: Optional[int]=None):
+        self.central = central
+
+    def step(self, universe, dt: float):
+        state = universe.state
+        state.detach()
+        masses = state.masses
+        central = int(np.argmax(masses)) if self.central is None else self.central
+        orbiting = np.arange(len(state)) != central
+        mu = self.gravity(universe).G * masses[central]
+        weights = masses[orbiting, np.newaxis]
+
+        total = masses.sum()
+        centre = (masses[:, np.newaxis] * state.positions).sum(axis=0) / total
+        drift = (masses[:, np.newaxis] * state.velocities).sum(axis=0) / total
+        relative = state.positions[orbiting] - state.positions[central]
+        barycentric = state.velocities[orbiting] - drift
+
+        barycentric += 0.5 * dt * self.interactions(universe, central, orbiting, mu)
+        relative += 0.5 * dt * (weights * barycentric).sum(axis=0) / masses[central]
+        relative, barycentric = kepler.drift(relative, barycentric, mu, dt)
+        relative += 0.5 * dt * (weights * barycentric).sum(axis=0) / masses[central]
+        centre += drift * dt
+
+        state.positions[central] = centre - (weights * relative).sum(axis=0) / total
+        state.positions[orbiting] = relative + state.positions[central]
+        barycentric += 0.5 * dt * self.interactions(universe, central, orbiting, mu)
+        state.velocities[orbiting] = barycentric + drift
+        state.velocities[central] = drift - (weights * barycentric).sum(axis=0) / masses[central]
+
+    def interactions(self, universe, central: int, orbiting: np.ndarray, mu: float) -> np.ndarray:
+        """Accelerations of the orbiting bodies, apart from the central mass' own pull"""
+        positions = universe.state.positions
+        if self._revision == universe.revision and self._positions is not None and \
+                self._positions.shape == positions.shape and np.array_equal(self._positions, positions):
+            # the last kick of a step is at the same positions as the first kick of the next, unless
+            # the particles or fields have been changed in between
+            return self._interactions
+        relative = positions[orbiting] - positions[central]
+        radii = np.linalg.norm(relative, axis=1)[:, np.newaxis]
+        self._interactions = universe.accelerate()[orbiting] + mu * relative / radii**3
+        self._positions = positions.copy()
+        self._revision = universe.revision
+        return self._interactions
+
+    @staticmethod
+    def gravity(universe) -> Gravity:
+        for field in universe.fields:
+            if isinstance(field, Gravity):
+                return field
+        raise ValueError("The Wisdom–Holman integrator needs a universe with a Gravity field")
+
+    def copy(self):
+        return self.__class__(self.central)
+
+    def __repr__(self) -> str:
+        return "{}({})".format(self.__class__.__name__, self.central)
+
+
+ForestRuth = Yoshida
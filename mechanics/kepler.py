@@ -0,0 +1,67 @@
+from typing import Tuple
+
+import numpy as np
+
+SERIES_TERMS = 8
+
+
+def stumpff(z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """The Stumpff functions C(z) and S(z), for any sign of z"""
+    z = np.asarray(z, dtype=np.float64)
+    C, S = np.empty_like(z), np.empty_like(z)
+    elliptic, hyperbolic = z > 0.1, z < -0.1
+    small = ~(elliptic | hyperbolic)
+
+    root = np.sqrt(z[elliptic])
+    C[elliptic] = 2 * np.sin(root / 2)**2 / z[elliptic]
+    S[elliptic] = (root - np.sin(root)) / root**3
+    root = np.sqrt(-z[hyperbolic])
+    C[hyperbolic] = 2 * np.sinh(root / 2)**2 / -z[hyperbolic]
+    S[hyperbolic] = (np.sinh(root) - root) / root**3
+
+    # near z = 0 both expressions cancel badly, so use their series instead:
+    # C = Σ(-z)^k / (2k+2)!, S = Σ(-z)^k / (2k+3)!
+    term_c, term_s = np.full(small.sum(), 0.5), np.full(small.sum(), 1 / 6)
+    C[small], S[small] = term_c, term_s
+    for k in range(1, SERIES_TERMS):
+        term_c = term_c * -z[small] / ((2 * k + 1) * (2 * k + 2))
+        term_s = term_s * -z[small] / ((2 * k + 2) * (2 * k + 3))
+        C[small] += term_c
+        S[small] += term_s
+    return C, S
+
+
+def drift(positions: np.ndarray, velocities: np.ndarray, mu: float, dt: float,
+          tolerance: float=1e-13, iterations: int=50) -> Tuple[np.ndarray, np.ndarray]:
+    """Move bodies along their two-body (Kepler) orbits around a mass with μ = GM, for `dt` seconds
+
+    Positions and velocities are (N, 3), relative to the central mass. This uses the universal
+    variable χ, so circular, elliptic, parabolic and hyperbolic orbits are all handled alike.
+    """
+    radii = np.linalg.norm(positions, axis=1)
+    root_mu = np.sqrt(mu)
+    alpha = 2 / radii - np.einsum('ij,ij->i', velocities, velocities) / mu # 1/a
+    sigma = np.einsum('ij,ij->i', positions, velocities) / root_mu
+    chi = root_mu * np.abs(alpha) * dt
+    # solve √μ dt = σχ²C + (1 - αr)χ³S + rχ, by Newton's method
+    for _ in range(iterations):
+        z = alpha * chi**2
+        C, S = stumpff(z)
+        f = sigma * chi**2 * C + (1 - alpha * radii) * chi**3 * S + radii * chi - root_mu * dt
+        derivative = sigma * chi * (1 - z * S) + (1 - alpha * radii) * chi**2 * C + radii
+        change = f / derivative
+        chi -= change
+        if np.all(np.abs(change) <= tolerance * np.maximum(np.abs(chi), 1)):
+            break
+    z = alpha * chi**2
+    C, S = stumpff(z)
+
+    # Lagrange's f and g coefficients
+    f = 1 - chi**2 / radii * C
+    g = dt - chi**3 / root_mu * S
+    new_positions = f[:, np.newaxis] * positions + g[:, np.newaxis] * velocities
+    new_radii = np.linalg.norm(new_positions, axis=1)
+    f_dot = root_mu / (new_radii * radii) * (alpha * chi**3 * S - chi)
+    g_dot = 1 - chi**2 / new_radii * C
+    new_velocities = f_dot[:, np.newaxis] * positions + g_dot[:, np.newaxis] * velocities
+    return new_positions, new_velocities
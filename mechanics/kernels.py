@@ -0,0 +1,124 @@
+"""Batched NumPy kernels for direct-summation gravity
+
+Positions are (N, 3) arrays, masses (N,). Pairs are evaluated in square tiles of at most
+`block_size` particles a side, so the temporary arrays stay a fixed size however large N is.
+
+`accelerations` also takes whole ensembles of universes at once, as (M, N, 3) positions and
+(M, N) masses (or any number of leading dimensions), with G a scalar or one per universe.
+"""
+import numpy as np
+
+BLOCK_SIZE = 512
+
+
+def _squared(targets: np.ndarray, sources: np.ndarray, softening: float):
+    # separation vectors from every target to every source, and the (softened) square of each one's length
+    separations = sources[..., np.newaxis, :, :] - targets[..., :, np.newaxis, :]
+    squared = np.einsum('...ijk,...ijk->...ij', separations, separations)
+    if softening:
+        squared += softening**2
+    return separations, squared
+
+
+def _tile(targets: np.ndarray, sources: np.ndarray, softening: float, inverses: bool=False):
+    # separation vectors from every target to every source, and 1/r^3 for each pair (and 1/r, if wanted)
+    separations, squared = _squared(targets, sources, softening)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # a particle paired with itself comes out as inf (or inf * 0 for 1/r), for the caller to zero
+        inverse_cubes = squared ** -1.5
+        if inverses:
+            return separations, inverse_cubes, inverse_cubes * squared
+    return separations, inverse_cubes
+
+
+def accelerations(positions: np.ndarray, masses: np.ndarray, G: float, softening: float=0,
+                  block_size: int=BLOCK_SIZE, out: np.ndarray=None, potential: np.ndarray=None) -> np.ndarray:
+    """Gravitational acceleration on every particle from every other particle
+
+    Each tile above the diagonal is used twice, since the force between two particles is equal
+    and opposite, so only half of the pairs are evaluated. Results are added onto `out` if given.
+    If `potential` is given (an array of the positions' leading dimensions, so 0-d for one
+    universe) the total potential energy is added onto it too, from the same tiles, which costs
+    much less than working it out separately with `potential_energy`.
+    """
+    count = masses.shape[-1]
+    if out is None:
+        out = np.zeros(positions.shape)
+    G = np.asarray(G, dtype=np.float64)[..., np.newaxis, np.newaxis]
+    energy = None if potential is None else np.zeros(masses.shape[:-1])
+    for i_start in range(0, count, block_size):
+        i_end = min(i_start + block_size, count)
+        for j_start in range(i_start, count, block_size):
+            j_end = min(j_start + block_size, count)
+            separations, inverse_cubes, *inverses = _tile(positions[..., i_start:i_end, :],
+                                                          positions[..., j_start:j_end, :], softening,
+                                                          potential is not None)
+            if i_start == j_start:
+                diagonal = np.arange(i_end - i_start)
+                inverse_cubes[..., diagonal, diagonal] = 0
+                if inverses:
+                    inverses[0][..., diagonal, diagonal] = 0
+                    inverses[0] *= 0.5 # each pair is in this tile twice
+            out[..., i_start:i_end, :] += G * np.einsum('...ij,...ijk->...ik',
+                                                        inverse_cubes * masses[..., np.newaxis, j_start:j_end],
+                                                        separations)
+            if i_start != j_start:
+                out[..., j_start:j_end, :] -= G * np.einsum('...ij,...ijk->...jk',
+                                                            inverse_cubes * masses[..., i_start:i_end, np.newaxis],
+                                                            separations)
+            if inverses:
+                energy -= np.einsum('...i,...ij,...j->...', masses[..., i_start:i_end], inverses[0],
+                                    masses[..., j_start:j_end])
+    if potential is not None:
+        potential += G[..., 0, 0] * energy
+    return out
+
+
+def potential_energy(positions: np.ndarray, masses: np.ndarray, G: float, softening: float=0,
+                     block_size: int=BLOCK_SIZE) -> np.ndarray:
+    """Total gravitational potential energy, -G m_i m_j / r summed over every pair once
+
+    This is a pass over every pair by itself; `accelerations` can work it out along the way.
+    """
+    count = masses.shape[-1]
+    total = np.zeros(masses.shape[:-1])
+    for i_start in range(0, count, block_size):
+        i_end = min(i_start + block_size, count)
+        for j_start in range(i_start, count, block_size):
+            j_end = min(j_start + block_size, count)
+            _, squared = _squared(positions[..., i_start:i_end, :], positions[..., j_start:j_end, :], softening)
+            with np.errstate(divide='ignore'):
+                inverses = squared ** -0.5
+            if i_start == j_start:
+                diagonal = np.arange(i_end - i_start)
+                inverses[..., diagonal, diagonal] = 0
+                inverses *= 0.5 # each pair is in this tile twice
+            total -= np.einsum('...i,...ij,...j->...', masses[..., i_start:i_end], inverses,
+                               masses[..., j_start:j_end])
+    return np.asarray(G, dtype=np.float64) * total
+
+
+def target_accelerations(positions: np.ndarray, masses: np.ndarray, targets: np.ndarray, G: float, softening: float=0,
+                         block_size: int=BLOCK_SIZE, potentials: np.ndarray=None) -> np.ndarray:
+    """Gravitational acceleration on the particles at the indices `targets`, from every particle
+
+    If `potentials` is given, the gravitational potential at each target, -ΣGm/r over every
+    other particle, is added onto it.
+    """
+    targets = np.asarray(targets)
+    out = np.zeros((len(targets), 3))
+    for t_start in range(0, len(targets), block_size):
+        t_end = min(t_start + block_size, len(targets))
+        indices = targets[t_start:t_end]
+        for s_start in range(0, len(masses), block_size):
+            s_end = min(s_start + block_size, len(masses))
+            separations, inverse_cubes, *inverses = _tile(positions[indices], positions[s_start:s_end], softening,
+                                                          potentials is not None)
+            # a particle exerts no force on itself
+            rows, = np.nonzero((indices >= s_start) & (indices < s_end))
+            inverse_cubes[rows, indices[rows] - s_start] = 0
+            out[t_start:t_end] += G * np.einsum('ij,ijk->ik', inverse_cubes * masses[s_start:s_end], separations)
+            if inverses:
+                inverses[0][rows, indices[rows] - s_start] = 0
+                potentials[t_start:t_end] -= G * (inverses[0] @ masses[s_start:s_end])
+    return out
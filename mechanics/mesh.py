@@ -0,0 +1,152 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from .particle import Gravity, ArrayUniverse
+
+CORNERS = np.array([(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)])
+
+
+class MeshGravity(Gravity):
+    """Particle-mesh gravity: forces come from a potential solved on a grid with FFTs
+
+    Masses are spread onto a `cells`³ grid with cloud-in-cell weights, the potential is found by
+    FFT and its gradient interpolated back to the particles with the same weights. This costs
+    O(N + M log M) for M grid cells, but cannot resolve anything smaller than a cell.
+
+    An isolated box (the default) is fitted around the particles every tick, and zero padded
+    so distant images do not interact. A periodic box has to be given with `size` (and
+    `origin`, its lowest corner), and particles outside it wrap around.
+
+    The potential energy is read off the same grid potential. In an isolated box each
+    particle's pull on itself through the grid is taken back out; in a periodic one it is left
+    in, so the energy is only good up to a (near enough) constant.
+    """
+    cells: int
+    periodic: bool
+    origin: Optional[np.ndarray]
+    size: Optional[float]
+    _green: Optional[Tuple[float, int, np.ndarray]] = None
+
+    def __init__(self, G: float, cells: int=64, periodic: bool=False, origin: Sequence[float]=None, size: float=None):
+        super().__init__(G)
+        if periodic and size is None:
+            raise ValueError("A periodic mesh needs a box size")
+        self.cells = cells
+        self.periodic = periodic
+        self.origin = None if origin is None else np.array(origin, dtype=np.float64)
+        self.size = size
+
+    def apply(self, universe, active=None):
+        if not isinstance(universe, ArrayUniverse):
+            return super().apply(universe)
+        state = universe.state
+        state.detach()
+        if not len(state):
+            return
+        origin, spacing = self.box(state.positions)
+        indices, weights = self.weights(state.positions, origin, spacing)
+        masses = self.deposit(indices, weights * state.masses[:, np.newaxis])
+        potential = self.solve(masses, spacing)
+        field = self.gradient(potential, spacing)
+        if active is None:
+            state.accelerations += self.interpolate(field, indices, weights)
+            if self.wants_potential:
+                self.keep_potential(state, self.energy(potential, indices, weights, state.masses, spacing))
+        else:
+            # every particle still contributes mass, but only the active ones need their acceleration
+            state.accelerations[active] += self.interpolate(field, indices[active], weights[active])
+
+    def potential_energy(self, state) -> np.ndarray:
+        if not len(state):
+            return np.zeros(())
+        origin, spacing = self.box(state.positions)
+        indices, weights = self.weights(state.positions, origin, spacing)
+        masses = self.deposit(indices, weights * state.masses[:, np.newaxis])
+        return self.energy(self.solve(masses, spacing), indices, weights, state.masses, spacing)
+
+    def energy(self, potential: np.ndarray, indices: np.ndarray, weights: np.ndarray, masses: np.ndarray,
+               spacing: float) -> np.ndarray:
+        """½Σmφ, with φ interpolated to the particles from the grid's `potential`"""
+        grid = np.ascontiguousarray(potential[:self.cells, :self.cells, :self.cells])
+        energy = 0.5 * masses @ self.interpolate(grid[..., np.newaxis], indices, weights)[:, 0]
+        if not self.periodic:
+            # each particle's own mass, spread over its 8 cells, pulls on it through the -G/r kernel
+            offsets = np.linalg.norm(CORNERS[:, np.newaxis] - CORNERS, axis=2)
+            kernel = -self.G / np.where(offsets, offsets, 0.5) / spacing
+            energy -= 0.5 * np.einsum('i,ij,jk,ik->', masses**2, weights, kernel, weights)
+        return np.asarray(energy)
+
+    def box(self, positions: np.ndarray) -> Tuple[np.ndarray, float]:
+        if self.periodic:
+            origin = self.origin if self.origin is not None else np.zeros(3)
+            return origin, self.size / self.cells
+        low = positions.min(axis=0)
+        extent = (positions.max(axis=0) - low).max() or 1.0
+        # leave a cell spare at the top, so every particle's upper neighbours are on the grid
+        spacing = extent / (self.cells - 2)
+        return low - spacing / 2, spacing
+
+    def weights(self, positions: np.ndarray, origin: np.ndarray, spacing: float) -> Tuple[np.ndarray, np.ndarray]:
+        """The flat grid index of each of the 8 cells around each particle, (N, 8), and their weights"""
+        # in units of cells, measured from the centre of cell 0
+        scaled = (positions - origin) / spacing - 0.5
+        if self.periodic:
+            scaled %= self.cells
+        lower = np.floor(scaled).astype(np.int64)
+        if not self.periodic:
+            # rounding can leave particles on the edge of the box a hair outside it
+            np.clip(lower, 0, self.cells - 2, out=lower)
+        fraction = scaled - lower
+        corners = lower[:, np.newaxis, :] + CORNERS
+        if self.periodic:
+            corners %= self.cells
+        weights = np.where(CORNERS, fraction[:, np.newaxis, :], 1 - fraction[:, np.newaxis, :]).prod(axis=2)
+        return np.ravel_multi_index(corners.transpose(2, 0, 1), (self.cells,) * 3), weights
+
+    def deposit(self, indices: np.ndarray, masses: np.ndarray) -> np.ndarray:
+        grid = np.bincount(indices.reshape(-1), masses.reshape(-1), minlength=self.cells**3)
+        return grid.reshape((self.cells,) * 3)
+
+    def solve(self, masses: np.ndarray, spacing: float) -> np.ndarray:
+        """The potential over the grid; for an isolated box, over the doubled, padded grid"""
+        if self.periodic:
+            # ∇²φ = 4πGρ, using the eigenvalues of the finite difference Laplacian so it matches gradient()
+            density = masses / spacing**3
+            wavenumbers = [np.fft.fftfreq(self.cells)] * 2 + [np.fft.rfftfreq(self.cells)]
+            kx, ky, kz = np.meshgrid(*(np.sin(np.pi * k)**2 for k in wavenumbers), indexing='ij')
+            laplacian = -4 * (kx + ky + kz) / spacing**2
+            laplacian[0, 0, 0] = 1
+            transformed = 4 * np.pi * self.G * np.fft.rfftn(density) / laplacian
+            transformed[0, 0, 0] = 0
+            return np.fft.irfftn(transformed, masses.shape, axes=(0, 1, 2))
+
+        # φ = -GΣm/r as a convolution, doubling the grid so the circular convolution doesn't wrap
+        padded = 2 * self.cells
+        transformed = np.fft.rfftn(masses, (padded,) * 3, axes=(0, 1, 2)) * self.green() / spacing
+        return np.fft.irfftn(transformed, (padded,) * 3, axes=(0, 1, 2))
+
+    def green(self) -> np.ndarray:
+        """The transformed -G/r kernel over the padded grid, for a spacing of 1"""
+        if self._green is None or self._green[:2] != (self.G, self.cells):
+            padded = 2 * self.cells
+            distance = np.minimum(np.arange(padded), padded - np.arange(padded))
+            dx, dy, dz = np.meshgrid(distance, distance, distance, indexing='ij', sparse=True)
+            radius = np.sqrt(dx**2 + dy**2 + dz**2)
+            radius[0, 0, 0] = 0.5
+            self._green = (self.G, self.cells, np.fft.rfftn(-self.G / radius))
+        return self._green[2]
+
+    def gradient(self, potential: np.ndarray, spacing: float) -> np.ndarray:
+        """g = -∇φ by central differences, as a (cells, cells, cells, 3) grid"""
+        # on the padded grid, index -1 wraps round to the (valid) potential just below cell 0
+        field = np.stack([(np.roll(potential, 1, axis) - np.roll(potential, -1, axis)) / (2 * spacing)
+                          for axis in range(3)], axis=-1)
+        return field[:self.cells, :self.cells, :self.cells]
+
+    def interpolate(self, grid: np.ndarray, indices: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        values = grid.reshape(-1, grid.shape[-1])[indices]
+        return np.einsum('ij,ijk->ik', weights, values)
+
+    def copy(self):
+        return self.__class__(self.G, self.cells, self.periodic, self.origin, self.size)
@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .particle import Gravity, ArrayUniverse
+from . import kernels
+
+SERIAL_BELOW = 1000 #particles, below which handing out the work costs more than sharing it saves
+
+_attached: Dict[str, SharedMemory] = {}
+
+
+def _arrays(buffer, count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # masses, positions, accelerations, target indices and potentials, one after the other
+    masses = np.ndarray((count,), np.float64, buffer)
+    positions = np.ndarray((count, 3), np.float64, buffer, offset=count * 8)
+    accelerations = np.ndarray((count, 3), np.float64, buffer, offset=count * 4 * 8)
+    targets = np.ndarray((count,), np.int64, buffer, offset=count * 7 * 8)
+    potentials = np.ndarray((count,), np.float64, buffer, offset=count * 8 * 8)
+    return masses, positions, accelerations, targets, potentials
+
+
+def _accelerate(task: tuple):
+    name, count, start, end, G, softening, block_size, wants_potential = task
+    if name not in _attached:
+        for memory in _attached.values():
+            memory.close()
+        _attached.clear()
+        _attached[name] = SharedMemory(name=name)
+    masses, positions, accelerations, targets, potentials = _arrays(_attached[name].buf, count)
+    indices = targets[start:end]
+    potential = np.zeros(len(indices)) if wants_potential else None
+    with np.errstate(invalid='ignore'):
+        accelerations[indices] = kernels.target_accelerations(positions, masses, indices, G, softening, block_size,
+                                                              potential)
+    if potential is not None:
+        potentials[indices] = potential
+
+
+class ParallelGravity(Gravity):
+    """`Gravity` with the particles' accelerations shared out between a pool of processes
+
+    Masses and positions are copied once per evaluation into shared memory, which every process
+    reads directly; each works out the accelerations of its own share of the particles, against
+    all of them, and writes them straight back. Only small task descriptions are ever pickled.
+    Call `close` to shut the pool down.
+
+    Each process works out every pair for its own particles, where `Gravity` uses each pair
+    twice, so one process alone would be half as fast: with only one (by default, one per CPU),
+    or fewer than `serial_below` particles, the accelerations are worked out here as `Gravity`
+    does, and no pool is started.
+    """
+    processes: int
+    serial_below: int
+    pool = None
+    memory: Optional[SharedMemory] = None
+    count: int = 0
+
+    def __init__(self, G: float, softening: float=0, block_size: int=kernels.BLOCK_SIZE, processes: int=None,
+                 serial_below: int=SERIAL_BELOW):
+        super().__init__(G, softening, block_size)
+        self.processes = processes or os.cpu_count() or 1
+        self.serial_below = serial_below
+
+    def apply(self, universe, active=None):
+        if not isinstance(universe, ArrayUniverse) or self.serial(len(universe.state)):
+            return super().apply(universe, active)
+        state = universe.state
+        state.detach()
+        targets = np.arange(len(state)) if active is None else np.asarray(active)
+        if not len(targets):
+            return
+        wants_potential = self.wants_potential and active is None
+        accelerations, potentials = self.evaluate(state, targets, wants_potential)
+        state.accelerations[targets] += accelerations[targets]
+        if wants_potential:
+            self.keep_potential(state, np.asarray(0.5 * (state.masses @ potentials)))
+
+    def potential_energy(self, state) -> np.ndarray:
+        # shared out between the processes like the accelerations, rather than in one pass here
+        if self.serial(len(state)):
+            return super().potential_energy(state)
+        if not len(state):
+            return np.zeros(())
+        _, potentials = self.evaluate(state, np.arange(len(state)), True)
+        return np.asarray(0.5 * (state.masses @ potentials))
+
+    def serial(self, count: int) -> bool:
+        """Whether `count` particles are better done in this process alone"""
+        return self.processes == 1 or count < self.serial_below
+
+    def evaluate(self, state, targets: np.ndarray, wants_potential: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """The shared accelerations and potentials, filled in for `targets` by the pool"""
+        masses, positions, accelerations, shared_targets, potentials = self.share(len(state))
+        masses[:] = state.masses
+        positions[:] = state.positions
+        shared_targets[:len(targets)] = targets
+
+        # a few chunks per process, so that one slow process doesn't hold the rest up
+        bounds = np.linspace(0, len(targets), min(4 * self.processes, len(targets)) + 1).astype(int)
+        self.pool.map(_accelerate, [(self.memory.name, self.count, start, end, self.G, self.softening, self.block_size,
+                                     wants_potential) for start, end in zip(bounds[:-1], bounds[1:])])
+        return accelerations, potentials
+
+    def share(self, count: int):
+        """Make sure there is a pool, and shared arrays for `count` particles"""
+        if self.memory is None or self.count != count:
+            self.release()
+            self.memory = SharedMemory(create=True, size=max(count * 9 * 8, 1))
+            self.count = count
+        if self.pool is None:
+            # only now, so the pool shares the resource tracker started for the shared memory
+            self.pool = multiprocessing.Pool(self.processes)
+        return _arrays(self.memory.buf, count)
+
+    def release(self):
+        if self.memory is not None:
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        self.release()
+
+    def __getstate__(self):
+        # neither the pool nor the shared memory can go to another process
+        state = super().__getstate__()
+        for attribute in ('pool', 'memory', 'count'):
+            state.pop(attribute, None)
+        return state
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def copy(self):
+        return self.__class__(self.G, self.softening, self.block_size, self.processes, self.serial_below)
@@ -2,7 +2,11 @@ from abc import ABC, abstractmethod
 from typing import Optional, List
 import copy
 
+import numpy as np
+
 from .vectors import *
+from .state import ParticleState
+from . import kernels, instrumentation
 
 
 class Tickable(ABC):
@@ -16,24 +20,32 @@ class Copyable(ABC):
     def copy(self): pass
 
 class Particle(Tickable, Copyable):
-    mass: Number = 0
-    position: Coords = Coords(0, 0, 0)
-    velocity: Velocity = Velocity(0, 0)
-    acceleration: Acceleration = Acceleration(0, 0)
     colour: str
     __name: str
+    __mass: Number = 0
+    __position: Coords
+    __velocity: Velocity
+    __acceleration: Acceleration
+    __state: Optional[ParticleState] = None
+    __index: Optional[int] = None
 
     def __init__(self, name: str, mass: Number, position: Coords=None, velocity: Velocity=None, acceleration: Acceleration=None, colour: str="black"):
         self.name = name
         self.mass = mass
-        if position is not None:
-            self.position = position
-        if velocity is not None:
-            self.velocity = velocity
-        if acceleration is not None:
-            self.acceleration = acceleration
+        self.position = position if position is not None else Coords(0, 0, 0)
+        self.velocity = velocity if velocity is not None else Velocity(0, 0)
+        self.acceleration = acceleration if acceleration is not None else Acceleration(0, 0)
         self.colour = colour
 
+    @classmethod
+    def view(cls, state: ParticleState, index: int, name: str, colour: str="black"):
+        """Create a particle backed by row `index` of `state`, without copying its values"""
+        particle = cls.__new__(cls)
+        particle.name = name
+        particle.colour = colour
+        particle.bind(state, index)
+        return particle
+
     def tick(self, t: int=0): #tick number later?
         # ut + 1/2a(t^2)
         self.position += self.velocity.to_displacement(self.TICK_LENGTH) + self.acceleration.to_displacement(self.TICK_LENGTH)
@@ -41,7 +53,14 @@ class Particle(Tickable, Copyable):
         self.acceleration = Acceleration(0, 0)
 
     def apply_force(self, force: Force):
-        self.acceleration += force.to_acceleration(self.mass)
+        if self.__state is None:
+            self.acceleration += force.to_acceleration(self.mass)
+        else:
+            # kept apart too, as the fields' accelerations are worked out afresh during each tick
+            self.__state.detach()
+            acceleration = force.to_acceleration(self.mass).components
+            self.__state.accelerations[self.__index] += acceleration
+            self.__state.external_accelerations()[self.__index] += acceleration
 
     def __repr__(self) -> str:
         return "{}({!r}, {}, {}, {}, {})".format(self.__class__.__name__, self.name, self.mass, self.position, self.velocity, self.acceleration)
@@ -61,21 +80,132 @@ class Particle(Tickable, Copyable):
     def name(self, value: str):
         self.__name = value.title()
 
+    @property
+    def state(self) -> Optional[ParticleState]:
+        return self.__state
+
+    @property
+    def index(self) -> Optional[int]:
+        return self.__index
+
+    def bind(self, state: ParticleState, index: int):
+        """Make the particle a view into row `index` of `state`"""
+        self.__state = state
+        self.__index = index
+
+    def unbind(self):
+        """Take a copy of the particle's row, so it no longer depends on any state"""
+        if self.__state is None:
+            return
+        mass, position, velocity, acceleration = self.mass, self.position, self.velocity, self.acceleration
+        self.__state = self.__index = None
+        self.mass = mass
+        self.position = position
+        self.velocity = velocity
+        self.acceleration = acceleration
+
+    @property
+    def mass(self) -> Number:
+        if self.__state is None:
+            return self.__mass
+        return float(self.__state.masses[self.__index])
+
+    @mass.setter
+    def mass(self, value: Number):
+        if self.__state is None:
+            self.__mass = value
+        else:
+            self.__state.detach()
+            self.__state.masses[self.__index] = value
+
+    @property
+    def position(self) -> Coords:
+        if self.__state is None:
+            return self.__position
+        return Coords(*self.__state.positions[self.__index].tolist())
+
+    @position.setter
+    def position(self, value: Coords):
+        if self.__state is None:
+            self.__position = value
+        else:
+            self.__state.detach()
+            self.__state.positions[self.__index] = value.components
+
+    @property
+    def velocity(self) -> Velocity:
+        if self.__state is None:
+            return self.__velocity
+        return Velocity.from_components(*self.__state.velocities[self.__index].tolist())
+
+    @velocity.setter
+    def velocity(self, value: Velocity):
+        if self.__state is None:
+            self.__velocity = value
+        else:
+            self.__state.detach()
+            self.__state.velocities[self.__index] = value.components
+
+    @property
+    def acceleration(self) -> Acceleration:
+        if self.__state is None:
+            return self.__acceleration
+        return Acceleration.from_components(*self.__state.accelerations[self.__index].tolist())
+
+    @acceleration.setter
+    def acceleration(self, value: Acceleration):
+        if self.__state is None:
+            self.__acceleration = value
+        else:
+            self.__state.detach()
+            self.__state.accelerations[self.__index] = value.components
+            self.__state.external_accelerations()[self.__index] = value.components
+
 
 class Field(Copyable, ABC):
+    # `active`, when given, holds the indices of the only particles of an ArrayUniverse whose
+    # accelerations are wanted; fields that don't set SUPPORTS_ACTIVE are never passed it, and
+    # are just asked for all of them
+    SUPPORTS_ACTIVE: bool = False
+
     @abstractmethod
-    def apply(self, universe): pass
+    def apply(self, universe, active=None): pass
 
     def copy(self):
         return self
 
 class Gravity(Field):
+    SUPPORTS_ACTIVE = True
     G: Number
+    softening: Number
+    block_size: int
+    wants_potential: bool = False #have the kernel work out the potential energy too, for monitoring
+    potential = None #the potential energy when the accelerations were last worked out, if wanted
+    _potential_for: Optional[tuple] = None #the positions, masses, G and softening it was for
 
-    def __init__(self, G: Number):
+    def __init__(self, G: Number, softening: Number=0, block_size: int=kernels.BLOCK_SIZE):
         self.G = G
+        self.softening = softening
+        self.block_size = block_size
+
+    def apply(self, universe, active=None):
+        if isinstance(universe, ArrayUniverse):
+            # all pairs at once, straight onto the universe's acceleration array
+            state = universe.state
+            state.detach()
+            with np.errstate(invalid='ignore'):
+                if active is None:
+                    potential = np.zeros(state.masses.shape[:-1]) if self.wants_potential else None
+                    kernels.accelerations(state.positions, state.masses, self.G, self.softening, self.block_size,
+                                          out=state.accelerations, potential=potential)
+                    if potential is not None:
+                        self.keep_potential(state, potential)
+                else:
+                    state.accelerations[active] += kernels.target_accelerations(
+                        state.positions, state.masses, active, self.G, self.softening, self.block_size
+                    )
+            return
 
-    def apply(self, universe):
         for particle in universe.particles:
             for other in universe.particles:
                 if other is particle:
@@ -84,20 +214,57 @@ class Gravity(Field):
                 particle.apply_force(self.calculate_force(particle, other))
                 #print(particle)
 
+    def __getstate__(self):
+        # the potential is only any use for the positions it was worked out for, a copy of which is kept with it
+        state = self.__dict__.copy()
+        state.pop('potential', None)
+        state.pop('_potential_for', None)
+        return state
+
+    def keep_potential(self, state, potential: np.ndarray):
+        self.potential = potential
+        self._potential_for = (state.positions.copy(), state.masses.copy(), np.copy(self.G), self.softening)
+
+    def potential_at(self, state) -> Optional[np.ndarray]:
+        """The potential energy worked out with the last accelerations, if it was for `state` as it is now"""
+        if self._potential_for is None:
+            return None
+        positions, masses, G, softening = self._potential_for
+        if positions.shape == state.positions.shape and np.array_equal(positions, state.positions) and \
+                np.array_equal(masses, state.masses) and np.array_equal(G, self.G) and softening == self.softening:
+            return self.potential
+        return None
+
+    def potential_energy(self, state) -> np.ndarray:
+        """The potential energy of `state`, worked out by itself, to the same accuracy as the accelerations
+
+        Fields approximating the accelerations approximate this the same way, for about the cost
+        of working them out.
+        """
+        return kernels.potential_energy(state.positions, state.masses, self.G, self.softening, self.block_size)
+
     def calculate_force(self, subject: Particle, actor: Particle) -> Force:
-        force = Force(0, 0)
-        force.direction = subject.position.direction_to(actor.position)
-        force.magnitude = self.G * ((subject.mass * actor.mass)/pow(subject.position.distance_to(actor.position),2))
-        #print(force)
-        return force
+        subject_position, actor_position = subject.position, actor.position
+        dx = actor_position.x - subject_position.x
+        dy = actor_position.y - subject_position.y
+        dz = actor_position.z - subject_position.z
+        distance = maths.sqrt(dx**2 + dy**2 + dz**2 + self.softening**2)
+        # G(Mm)/r^2 along the unit vector d/r
+        scale = self.G * (subject.mass * actor.mass) / pow(distance, 3)
+        return Force.from_components(dx * scale, dy * scale, dz * scale)
 
     def copy(self):
-        return self.__class__(self.G)
+        return self.__class__(self.G, self.softening, self.block_size)
 
 
 class Universe(Tickable):
     particles: List[Particle]
     fields: List[Field]
+    time: float = 0 #seconds simulated so far
+    revision: int = 0 #counts edits made from outside the simulation
+    monitor: Optional['ConservationMonitor'] = None #set by the monitor's `attach`, for array universes
+    INTEGRATED: bool = False #whether each tick is a step of an `integrator`, rather than of each particle
+    _integrator: Optional['Integrator'] = None
 
     def __init__(self, fields: Optional[List[Field]]=None, particles: Optional[List[Particle]]=None):
         self.fields = fields or []
@@ -105,6 +272,15 @@ class Universe(Tickable):
 
     def add_particle(self, particle: Particle):
         self.particles.append(particle)
+        self.touch()
+
+    def remove_particle(self, particle: Particle):
+        self.particles.remove(particle)
+        self.touch()
+
+    def touch(self):
+        """Note that the universe has been edited, other than by ticking"""
+        self.revision += 1
 
     def __lshift__(self, particle: Particle):
         self.add_particle(particle)
@@ -112,14 +288,166 @@ class Universe(Tickable):
 
     def tick(self, t: int=0):
         for field in self.fields:
-            field.apply(self)
+            with instrumentation.phase('field.' + field.__class__.__name__):
+                field.apply(self)
 
-        for particle in self.particles:
-            particle.tick(t)
+        with instrumentation.phase('integrate.particles'):
+            for particle in self.particles:
+                particle.tick(t)
+        self.time += self.TICK_LENGTH
+
+    @property
+    def integrator(self) -> Optional['Integrator']:
+        return self._integrator
+
+    @integrator.setter
+    def integrator(self, value: 'Integrator'):
+        if not self.INTEGRATED:
+            raise ValueError("A {} ticks each particle by itself, so can't be given an integrator; "
+                             "use an ArrayUniverse".format(self.__class__.__name__))
+        self._integrator = value
 
     def copy(self):
-        return Universe(
+        universe = Universe(
             fields=[field.copy() for field in self.fields],
             particles=[particle.copy() for particle in self.particles]
         )
+        universe.time = self.time
+        universe.TICK_LENGTH = self.TICK_LENGTH
+        return universe
+
+    def fork(self):
+        """A branch of the universe which can be changed and run without affecting this one
+
+        Only an `ArrayUniverse` can share its particles with its forks; here it's just a copy.
+        """
+        return self.copy()
+
+
+
+class ArrayUniverse(Universe):
+    """A universe which keeps its particles' state in contiguous arrays
+
+    Particles added to it become views into a row of `state`, so the rest of the code can keep
+    treating them as `Particle` objects while ticks work on whole arrays at once. Each tick is
+    one step of its `integrator`.
+
+    Accelerations given to particles from outside the fields, by `Particle.apply_force` or
+    setting `acceleration`, last for the next tick, as they do in any universe; they are added
+    as a kick of half the tick either side of the integrator's step.
+    """
+    state: ParticleState
+
+    INTEGRATED = True
+
+    def __init__(self, fields: Optional[List[Field]]=None, particles: Optional[List[Particle]]=None,
+                 integrator: 'Integrator'=None):
+        super().__init__(fields)
+        self.integrator = integrator or Euler()
+        particles = particles or []
+        self.state = ParticleState(
+            [particle.mass for particle in particles],
+            [particle.position.components for particle in particles],
+            [particle.velocity.components for particle in particles],
+            [particle.acceleration.components for particle in particles]
+        )
+        for index, particle in enumerate(particles):
+            self._adopt(particle, index)
+
+    @classmethod
+    def from_state(cls, state: ParticleState, names: Optional[List[str]]=None, colours: Optional[List[str]]=None,
+                   fields: Optional[List[Field]]=None, integrator: 'Integrator'=None):
+        """Build a universe directly around `state`, creating a view particle for each row"""
+        universe = cls(fields, integrator=integrator)
+        universe.state = state
+        names = names or ["Particle {}".format(index + 1) for index in range(len(state))]
+        colours = colours or ["black"] * len(state)
+        universe.particles = [Particle.view(state, index, name, colour)
+                              for index, (name, colour) in enumerate(zip(names, colours))]
+        return universe
+
+    def _adopt(self, particle: Particle, index: int):
+        if particle.state is not None:
+            raise ValueError("{} already belongs to an array universe".format(particle.name))
+        particle.bind(self.state, index)
+        self.particles.append(particle)
+
+    def add_particle(self, particle: Particle):
+        index = self.state.append(particle.mass, particle.position.components, particle.velocity.components,
+                                  particle.acceleration.components)
+        self._adopt(particle, index)
+        self.touch()
+
+    def remove_particle(self, particle: Particle):
+        index = self.particles.index(particle)
+        particle.unbind()
+        del self.particles[index]
+        self.state.remove(index)
+        self._rebind()
+        self.touch()
+
+    def _rebind(self):
+        for index, particle in enumerate(self.particles):
+            particle.bind(self.state, index)
+
+    def accelerate(self, active=None):
+        """Work out the particles' accelerations from the fields, for the current positions
+
+        If `active` is given, only the accelerations of the particles at those indices are needed.
+        """
+        self.state.detach()
+        self.state.accelerations[:] = 0
+        for field in self.fields:
+            with instrumentation.phase('field.' + field.__class__.__name__):
+                if active is None or not field.SUPPORTS_ACTIVE:
+                    field.apply(self)
+                else:
+                    field.apply(self, active)
+        return self.state.accelerations
+
+    def tick(self, t: int=0):
+        # this includes the time taken by the fields, which are also timed by themselves
+        self.state.detach()
+        external = self.state.external
+        if external is not None:
+            # pushed from outside, so nothing is expected to be conserved over this tick
+            self.touch()
+            self.state.velocities += 0.5 * self.TICK_LENGTH * external
+        if self.monitor is not None:
+            self.monitor.before(self)
+        with instrumentation.phase('integrate'):
+            self.integrator.step(self, self.TICK_LENGTH)
+        if external is not None:
+            self.state.velocities += 0.5 * self.TICK_LENGTH * external
+            self.state.external = None
+        self.time += self.TICK_LENGTH
+        if self.monitor is not None:
+            self.monitor.after(self)
+
+    def copy(self):
+        return self._with_state(self.state.copy())
+
+    def fork(self):
+        """A branch of the universe which shares its particles' arrays, until either changes them
+
+        Fields and the integrator are copied, so each branch can be given different ones (say, a
+        slightly different G) and run on from here, without the state being copied until then.
+        """
+        return self._with_state(self.state.fork())
+
+    def _with_state(self, state: ParticleState):
+        universe = self.from_state(
+            state,
+            [particle.name for particle in self.particles],
+            [particle.colour for particle in self.particles],
+            fields=[field.copy() for field in self.fields],
+            integrator=self.integrator.copy()
+        )
+        universe.time = self.time
+        universe.TICK_LENGTH = self.TICK_LENGTH
+        return universe
+
 
+# Safety Imports
+from .integrators import Integrator, Euler
+from .conservation import ConservationMonitor
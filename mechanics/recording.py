@@ -0,0 +1,166 @@
+import json
+import os
+import struct
+from typing import List, Optional
+
+import numpy as np
+
+from .particle import Universe, ArrayUniverse
+from .state import ParticleState
+
+MAGIC = b'GRAVREC1'
+PREAMBLE = struct.Struct('<8sQQ') # magic, header length, frames written
+CHUNK_FRAMES = 1024
+
+
+def frame_type(count: int) -> np.dtype:
+    """The layout of one recorded frame of `count` particles"""
+    return np.dtype([('time', '<f8'), ('positions', '<f8', (count, 3)), ('velocities', '<f8', (count, 3))])
+
+
+class TrajectoryRecorder:
+    """Streams the state of a universe's particles into a binary file, one frame at a time
+
+    The file starts with a small JSON header (the particles' names, masses and colours, and the
+    tick length), followed by fixed-size frames of time, positions and velocities. The file is
+    grown `chunk_frames` frames at a time, and only the chunk being written is memory-mapped, so
+    recording takes the same memory however long it runs. The frame count in the file is updated
+    whenever a chunk is finished, and on `close`, which also trims off any unused space.
+    """
+    path: str
+    count: int
+    chunk_frames: int
+    frames: int = 0
+    _chunk: Optional[np.memmap] = None
+    _chunk_start: int = 0
+
+    def __init__(self, path: str, universe: Universe, every: int=1, chunk_frames: int=CHUNK_FRAMES):
+        self.path = path
+        self.count = len(universe.particles)
+        self.chunk_frames = chunk_frames
+        self.dtype = frame_type(self.count)
+
+        header = json.dumps({
+            'names': [particle.name for particle in universe.particles],
+            'masses': [float(particle.mass) for particle in universe.particles],
+            'colours': [particle.colour for particle in universe.particles],
+            'tick_length': universe.TICK_LENGTH,
+            'every': every,
+        }).encode()
+        header += b' ' * (-(PREAMBLE.size + len(header)) % 8) # keep the frames 8-byte aligned
+        self.offset = PREAMBLE.size + len(header)
+        self.file = open(path, 'w+b')
+        self.file.write(PREAMBLE.pack(MAGIC, len(header), 0))
+        self.file.write(header)
+
+    def record(self, universe: Universe):
+        """Append a frame of `universe`'s current state"""
+        if len(universe.particles) != self.count:
+            raise ValueError("Particles can't be added or removed partway through a recording")
+        if self._chunk is None or self.frames - self._chunk_start == self.chunk_frames:
+            self._map_chunk()
+        frame = self._chunk[self.frames - self._chunk_start]
+        frame['time'] = getattr(universe, 'time', 0)
+        if isinstance(universe, ArrayUniverse):
+            frame['positions'] = universe.state.positions
+            frame['velocities'] = universe.state.velocities
+        else:
+            frame['positions'] = [particle.position.components for particle in universe.particles]
+            frame['velocities'] = [particle.velocity.components for particle in universe.particles]
+        self.frames += 1
+
+    def _map_chunk(self):
+        self.flush()
+        self._chunk_start = self.frames
+        self.file.truncate(self.offset + (self.frames + self.chunk_frames) * self.dtype.itemsize)
+        self._chunk = np.memmap(self.file, self.dtype, 'r+', self.offset + self.frames * self.dtype.itemsize,
+                                (self.chunk_frames,))
+
+    def flush(self):
+        """Write everything recorded so far out to the file"""
+        if self._chunk is not None:
+            self._chunk.flush()
+        self.file.seek(0)
+        self.file.write(PREAMBLE.pack(MAGIC, self.offset - PREAMBLE.size, self.frames))
+        self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self._chunk = None
+        self.file.truncate(self.offset + self.frames * self.dtype.itemsize)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class TrajectoryReader:
+    """Reads back a file written by `TrajectoryRecorder`, without loading the frames into memory
+
+    `times`, `positions` and `velocities` are memory-mapped arrays, indexed by frame first.
+    """
+    names: List[str]
+    masses: List[float]
+    colours: List[str]
+    tick_length: float
+    every: int
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            magic, length, frames = PREAMBLE.unpack(file.read(PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError("{} is not a trajectory recording".format(path))
+            header = json.loads(file.read(length).decode())
+        self.names = header['names']
+        self.masses = header['masses']
+        self.colours = header['colours']
+        self.tick_length = header['tick_length']
+        self.every = header['every']
+
+        dtype = frame_type(len(self.names))
+        offset = PREAMBLE.size + length
+        # a recording that wasn't closed may have fewer frames in it than its file has room for
+        frames = min(frames, (os.path.getsize(path) - offset) // dtype.itemsize)
+        self.frames = np.memmap(path, dtype, 'r', offset, (frames,)) if frames else np.empty(0, dtype)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def times(self) -> np.ndarray:
+        return self.frames['time']
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.frames['positions']
+
+    @property
+    def velocities(self) -> np.ndarray:
+        return self.frames['velocities']
+
+    def universe(self, frame: int=0) -> ArrayUniverse:
+        """A universe of the recorded particles, with no fields, as they were at `frame`"""
+        count = len(self.names)
+        state = ParticleState(np.array(self.masses, dtype=np.float64), np.zeros((count, 3)), np.zeros((count, 3)))
+        universe = ArrayUniverse.from_state(state, self.names, self.colours)
+        universe.TICK_LENGTH = self.tick_length * self.every
+        if len(self):
+            self.load(universe, frame)
+        return universe
+
+    def load(self, universe: ArrayUniverse, frame: int):
+        """Put the particles of `universe` where they were at `frame`"""
+        universe.state.detach()
+        universe.state.positions[:] = self.positions[frame]
+        universe.state.velocities[:] = self.velocities[frame]
+        universe.time = float(self.times[frame])
+
+    def close(self):
+        # the memory map is closed once nothing refers to it any more
+        self.frames = np.empty(0, self.frames.dtype)
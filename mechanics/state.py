@@ -0,0 +1,108 @@
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class ParticleState:
+    """Structure-of-arrays storage for a universe's particles
+
+    Row i of every array belongs to the same particle. Masses are (N,), and positions, velocities
+    and accelerations are (N, 3) float64 arrays in metres, ms⁻¹ and ms⁻² respectively.
+
+    States made by `fork` share their arrays, copy-on-write: anything changing the arrays in
+    place has to call `detach` first, which takes private copies if they are still shared. Every
+    field, integrator and particle setter does, as do recordings being loaded.
+
+    `external` holds any accelerations given to particles from outside the fields, for the next
+    tick; it is None until there are some.
+    """
+    masses: np.ndarray
+    positions: np.ndarray
+    velocities: np.ndarray
+    accelerations: np.ndarray
+    external: Optional[np.ndarray] = None
+    _sharers: Optional[List[int]] = None # how many states share these arrays, itself shared between them
+
+    def __init__(self, masses: Iterable=(), positions: Iterable=(), velocities: Iterable=(), accelerations: Iterable=None):
+        self.masses = np.array(masses, dtype=np.float64).reshape(-1)
+        count = len(self.masses)
+        self.positions = np.array(positions, dtype=np.float64).reshape(count, 3)
+        self.velocities = np.array(velocities, dtype=np.float64).reshape(count, 3)
+        if accelerations is None:
+            self.accelerations = np.zeros((count, 3))
+        else:
+            self.accelerations = np.array(accelerations, dtype=np.float64).reshape(count, 3)
+
+    def __len__(self) -> int:
+        return len(self.masses)
+
+    def __repr__(self) -> str:
+        return "{}({} particles)".format(self.__class__.__name__, len(self))
+
+    def fork(self) -> 'ParticleState':
+        """Another state with the same arrays, which are only copied when one of them changes them"""
+        if self._sharers is None:
+            self._sharers = [1]
+        self._sharers[0] += 1
+        forked = self.__class__.__new__(self.__class__)
+        forked.masses, forked.positions = self.masses, self.positions
+        forked.velocities, forked.accelerations = self.velocities, self.accelerations
+        forked.external = self.external
+        forked._sharers = self._sharers
+        return forked
+
+    @property
+    def shared(self) -> bool:
+        return self._sharers is not None and self._sharers[0] > 1
+
+    def detach(self):
+        """Make sure the arrays are this state's own, so they can be changed in place"""
+        if self.shared:
+            self.masses = self.masses.copy()
+            self.positions = self.positions.copy()
+            self.velocities = self.velocities.copy()
+            self.accelerations = self.accelerations.copy()
+            if self.external is not None:
+                self.external = self.external.copy()
+        self._release()
+
+    def _release(self):
+        if self._sharers is not None:
+            self._sharers[0] -= 1
+            self._sharers = None
+
+    def __del__(self):
+        self._release()
+
+    def append(self, mass: float, position: Tuple[float, float, float], velocity: Tuple[float, float, float],
+               acceleration: Tuple[float, float, float]=(0, 0, 0)) -> int:
+        # new arrays are made, so any others sharing the old ones aren't affected
+        self._release()
+        self.masses = np.append(self.masses, mass)
+        self.positions = np.vstack((self.positions, position))
+        self.velocities = np.vstack((self.velocities, velocity))
+        self.accelerations = np.vstack((self.accelerations, acceleration))
+        if self.external is not None:
+            self.external = np.vstack((self.external, np.zeros(3)))
+        return len(self) - 1
+
+    def remove(self, index: int):
+        self._release()
+        self.masses = np.delete(self.masses, index)
+        self.positions = np.delete(self.positions, index, axis=0)
+        self.velocities = np.delete(self.velocities, index, axis=0)
+        self.accelerations = np.delete(self.accelerations, index, axis=0)
+        if self.external is not None:
+            self.external = np.delete(self.external, index, axis=0)
+
+    def external_accelerations(self) -> np.ndarray:
+        """`external`, made if there isn't one yet; the caller has to `detach` first"""
+        if self.external is None:
+            self.external = np.zeros((len(self), 3))
+        return self.external
+
+    def copy(self):
+        state = self.__class__(self.masses, self.positions, self.velocities, self.accelerations)
+        if self.external is not None:
+            state.external = self.external.copy()
+        return state
@@ -65,22 +65,47 @@ class Direction:
 
 
 class Vector3D:
-    magnitude: Number
-    direction: Direction
+    """A 3D vector, stored as Cartesian components
+
+    It can still be built from, and read as, a magnitude and a `Direction`; those are only worked
+    out (and then cached) when something asks for them, as arithmetic never needs them. The
+    cached direction is the vector's own, so `direction` gives a copy of it; set `direction`
+    to change it.
+    """
+    _x: Number
+    _y: Number
+    _z: Number
+    _polar = None
 
     def __init__(self, magnitude: Number, direction: (Direction, Number)):
-        self.magnitude = magnitude
         if isinstance(direction, Number):
             direction = Direction(direction)
-        self.direction = direction
+        self._set_polar(magnitude, direction)
+
+    @classmethod
+    def from_components(cls, x, y, z):
+        vector = cls.__new__(cls)
+        vector._x = x
+        vector._y = y
+        vector._z = z
+        return vector
+
+    def __copy__(self):
+        vector = self.from_components(self._x, self._y, self._z)
+        vector._polar = self._polar # never changed in place, so can be shared
+        return vector
 
     def __add__(self, other):
+        if isinstance(other, Vector3D):
+            return self.__class__.from_components(self._x + other._x, self._y + other._y, self._z + other._z)
         return self._apply(lambda x,y: x+y,  other)
 
     def __radd__(self, other):
         return self + other
 
     def __mul__(self, other):
+        if not isinstance(other, Vector3D):
+            return self.__class__.from_components(self._x * other, self._y * other, self._z * other)
         return self._apply(lambda x,y: x*y,  other)
 
     def __rmul__(self, other):
@@ -93,46 +118,93 @@ class Vector3D:
         return self._apply(lambda x,y: x%y,  other)
 
     def __sub__(self, other):
+        if isinstance(other, Vector3D):
+            return self.__class__.from_components(self._x - other._x, self._y - other._y, self._z - other._z)
         return self._apply(lambda x,y: x-y,  other)
 
     def __neg__(self):
-        return self.__class__(self.magnitude, -self.direction)
+        return self.__class__.from_components(-self._x, -self._y, -self._z)
 
     def __bool__(self) -> bool:
-        return not not self.magnitude
+        return bool(self._x or self._y or self._z)
 
     def _apply(self, op, other):
-        x, y, z = self.components
         if not isinstance(other, Vector3D):
-            x = op(x, other)
-            y = op(y, other)
-            z = op(z, other)
-        else:
-            x_o, y_o, z_o = other.components
-            x = op(x, x_o)
-            y = op(y, y_o)
-            z = op(z, z_o)
-        return self.__class__.from_components(x, y, z)
+            return self.__class__.from_components(op(self._x, other), op(self._y, other), op(self._z, other))
+        return self.__class__.from_components(op(self._x, other._x), op(self._y, other._y), op(self._z, other._z))
+
+    def _set_polar(self, magnitude: Number, direction: Direction):
+        self._x = maths.sin(direction.plane_r) * maths.cos(direction.z_r) * magnitude
+        self._y = maths.cos(direction.plane_r) * maths.cos(direction.z_r) * magnitude
+        self._z = maths.sin(direction.z_r) * magnitude
+        # a copy, so changing the direction given afterwards doesn't leave the cache out of date
+        self._polar = (magnitude, Direction(direction.plane, direction.z))
 
     @property
-    def components(self):
-        x = maths.sin(self.direction.plane_r) * maths.cos(self.direction.z_r) * self.magnitude
-        y = maths.cos(self.direction.plane_r) * maths.cos(self.direction.z_r) * self.magnitude
-        z = maths.sin(self.direction.z_r) * self.magnitude
-        return x, y, z
+    def polar(self):
+        """The (magnitude, direction) of the vector, computed on first use"""
+        magnitude, direction = self._cached_polar()
+        return magnitude, Direction(direction.plane, direction.z)
+
+    def _cached_polar(self):
+        if self._polar is None:
+            x, y, z = self._x, self._y, self._z
+            planar_magnitude = maths.sqrt(x**2 + y**2)
+            magnitude = maths.sqrt(planar_magnitude**2 + z**2)
+            direction = Direction()
+            if planar_magnitude:
+                direction.plane = bearing(x, y)
+            if magnitude:
+                direction.z = bearing(z, planar_magnitude)
+            self._polar = (magnitude, direction)
+        return self._polar
 
-    @classmethod
-    def from_components(cls, x, y, z):
-        planar_magnitude = maths.sqrt(x**2 + y**2)
-        magnitude = maths.sqrt(planar_magnitude**2 + z**2)
-        #maths.sqrt(sum(n**2 for n in xyz))
-        direction = Direction()
-        if planar_magnitude:
-            #direction.plane = maths.degrees(maths.acos(y / planar_magnitude))
-            direction.plane = bearing(x, y)
-        if magnitude:
-            direction.z = bearing(z, planar_magnitude)
-        return cls(magnitude, direction)
+    @property
+    def magnitude(self) -> Number:
+        return self._cached_polar()[0]
+
+    @magnitude.setter
+    def magnitude(self, value: Number):
+        self._set_polar(value, self.direction)
+
+    @property
+    def direction(self) -> Direction:
+        return self.polar[1]
+
+    @direction.setter
+    def direction(self, value: Direction):
+        self._set_polar(self.magnitude, value)
+
+    @property
+    def x(self) -> Number:
+        return self._x
+
+    @x.setter
+    def x(self, value: Number):
+        self._x = value
+        self._polar = None
+
+    @property
+    def y(self) -> Number:
+        return self._y
+
+    @y.setter
+    def y(self, value: Number):
+        self._y = value
+        self._polar = None
+
+    @property
+    def z(self) -> Number:
+        return self._z
+
+    @z.setter
+    def z(self, value: Number):
+        self._z = value
+        self._polar = None
+
+    @property
+    def components(self):
+        return self._x, self._y, self._z
 
     def __repr__(self) -> str:
         return "{}({}, {})".format(self.__class__.__name__, self.magnitude, self.direction)
@@ -142,21 +214,23 @@ class Displacement(Vector3D): pass
 
 class Velocity(Vector3D):
     def to_displacement(self, time: Number) -> Displacement:
-        return Displacement(self.magnitude * time, +self.direction)
+        return Displacement.from_components(self._x * time, self._y * time, self._z * time)
 
 class Acceleration(Vector3D):
     def to_velocity(self, time: Number) -> Velocity:
-        return Velocity(self.magnitude * time, +self.direction)
+        return Velocity.from_components(self._x * time, self._y * time, self._z * time)
 
     def to_force(self, mass: Number):
-        return Force(self.magnitude * mass, +self.direction)
+        return Force.from_components(self._x * mass, self._y * mass, self._z * mass)
 
-    def to_displacement(self, time: Number, u: Velocity=Velocity(0,0)) -> Displacement:
-        return u.to_displacement(time) + Displacement(0.5 * self.magnitude * pow(time, 2), +self.direction)
+    def to_displacement(self, time: Number, u: Velocity=None) -> Displacement:
+        scale = 0.5 * pow(time, 2)
+        displacement = Displacement.from_components(self._x * scale, self._y * scale, self._z * scale)
+        return displacement if u is None else u.to_displacement(time) + displacement
 
 class Force(Vector3D):
     def to_acceleration(self, mass: Number) -> Acceleration:
-        return Acceleration(self.magnitude / mass, +self.direction)
+        return Acceleration.from_components(self._x / mass, self._y / mass, self._z / mass)
 
 
 class Coords:
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from mechanics import ArrayUniverse, Yoshida, kernels
+from mechanics.barneshut import BarnesHutGravity, Octree
+from mechanics.state import ParticleState
+
+
+def cluster(count=500, seed=3):
+    random = np.random.default_rng(seed)
+    return ParticleState(random.uniform(1, 2, count), random.normal(size=(count, 3)),
+                         random.normal(size=(count, 3)) * 0.01)
+
+
+@pytest.mark.parametrize('theta, tolerance', [(0, 1e-10), (0.5, 3e-2)])
+@pytest.mark.parametrize('softening', [0, 0.05])
+def test_octree_against_direct_summation(theta, tolerance, softening):
+    state = cluster()
+    exact = kernels.accelerations(state.positions, state.masses, 1.0, softening)
+    universe = ArrayUniverse.from_state(state, fields=[BarnesHutGravity(1.0, theta, softening, chunk_size=128)])
+    approximate = universe.accelerate()
+    errors = np.linalg.norm(approximate - exact, axis=1) / np.linalg.norm(exact, axis=1)
+    assert np.sqrt(np.mean(errors**2)) < tolerance
+
+
+def test_only_the_active_particles_are_given_forces():
+    state = cluster(100)
+    exact = kernels.accelerations(state.positions, state.masses, 1.0)
+    universe = ArrayUniverse.from_state(state, fields=[BarnesHutGravity(1.0, theta=0)])
+    active = np.array([3, 50, 99])
+    accelerations = universe.accelerate(active)
+    np.testing.assert_allclose(accelerations[active], exact[active], rtol=1e-10)
+
+
+def test_the_tree_is_rebuilt_every_so_many_ticks(monkeypatch):
+    builds = []
+    build = Octree.build
+    monkeypatch.setattr(Octree, 'build', lambda tree, *arguments: builds.append(None) or build(tree, *arguments))
+    field = BarnesHutGravity(1.0, rebuild_every=5)
+    universe = ArrayUniverse.from_state(cluster(50), fields=[field], integrator=Yoshida())
+    for _ in range(11):
+        universe.tick()
+    # Yoshida asks for forces three times a tick, but the tree is only built on ticks 0, 5 and 10
+    assert len(builds) == 3
@@ -0,0 +1,52 @@
+import csv
+
+import numpy as np
+
+from app.experiment import Experiment, lunar_orbit
+from gravity import cli
+from gravity.batch import BatchRun, load_experiment, resume
+from mechanics import Universe, Gravity, Particle, Coords, Velocity
+
+
+def test_runs_for_a_duration_and_writes_trajectories(tmp_path):
+    path = tmp_path / "trajectory.csv"
+    experiment = lunar_orbit()
+    results = BatchRun(experiment, duration=1000, every=2, trajectory=str(path)).run()
+    assert results['ticks'] == 10 and results['simulated_time'] == 1000
+    with open(path) as file:
+        rows = list(csv.reader(file))
+    assert rows[0][:3] == ['tick', 'time', 'particle']
+    # the start, then every other tick, for each of the two particles
+    assert len(rows) == 1 + 6 * 2
+    # the experiment's own universe is left as it was
+    assert experiment.universe.time == 0
+
+
+def test_a_plain_universe_keeps_its_tick_length_and_time():
+    universe = Universe([Gravity(6.67408e-11)], [Particle("Sun", 1.989e30),
+                                                 Particle("Earth", 5.972e24, Coords(1.496e11, 0, 0), Velocity(29780, 0))])
+    universe.TICK_LENGTH = 60
+    universe.time = 500
+    copied = universe.copy()
+    assert (copied.TICK_LENGTH, copied.time) == (60, 500)
+    batch = BatchRun(Experiment("Plain", universe), ticks=3)
+    results = batch.run()
+    assert results['tick_length'] == 60 and results['simulated_time'] == 500 + 3 * 60
+
+
+def test_checkpoints_can_be_resumed(tmp_path):
+    path = str(tmp_path / "run.checkpoint")
+    first = BatchRun(load_experiment('lunar-orbit'), ticks=7, checkpoint=path, checkpoint_every=5)
+    first.run()
+    experiment = resume(path)
+    assert experiment.name == "Lunar Orbit" and experiment.universe.time == first.universe.time
+    np.testing.assert_array_equal(experiment.universe.state.positions, first.universe.state.positions)
+
+
+def test_the_command_line(capsys, tmp_path):
+    cli.main(['run', 'lunar-orbit', '--ticks', '5', '--integrator', 'yoshida', '--monitor', '1',
+              '--diagnostics', str(tmp_path / "diagnostics.json")])
+    output = capsys.readouterr().out
+    assert output.startswith("Lunar Orbit: 5 ticks, 500 s simulated")
+    assert "Energy error at most" in output
+    assert (tmp_path / "diagnostics.json").exists()
@@ -0,0 +1,42 @@
+import pytest
+
+from gravity import bench, cli
+
+
+def result(name, n, best):
+    return {'name': name, 'n': n, 'number': 1, 'best': best, 'median': best}
+
+
+def test_running_some_of_the_benchmarks():
+    reported = []
+    results = bench.run(['gravity.apply'], [2], repeat=1, report=reported.append)
+    # names are prefixes, so the legacy version comes too
+    assert [(result['name'], result['n']) for result in results['results']] == [
+        ('gravity.apply', 2), ('gravity.apply.legacy', 2)]
+    assert reported == results['results']
+    assert results['results'][0]['best'] > 0
+    assert results['machine']['cpus'] and results['repeat'] == 1
+
+
+def test_comparing_flags_slowdowns():
+    baseline = {'results': [result('a', None, 1.0), result('b', 100, 1.0), {'name': 'c', 'n': None, 'skipped': "-"}]}
+    results = {'results': [result('a', None, 1.05), result('b', 100, 1.5), result('c', None, 1.0)]}
+    comparisons = bench.compare(results, baseline, tolerance=0.1)
+    assert [(comparison['name'], comparison['regression']) for comparison in comparisons] == [('a', False), ('b', True)]
+    assert comparisons[1]['ratio'] == pytest.approx(1.5)
+
+
+def test_saved_results_compare_from_the_command_line(tmp_path, capsys):
+    path = str(tmp_path / "baseline.json")
+    bench.save({'results': [result('vector.arithmetic', None, 1e-9)]}, path)
+    assert bench.load(path)['results'][0]['best'] == 1e-9
+    # nothing takes a nanosecond, so this is bound to be a regression
+    with pytest.raises(SystemExit) as exit:
+        cli.main(['bench', '--only', 'vector.arithmetic', '--repeat', '1', '--compare', path])
+    assert exit.value.code == 1
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+def test_formatting():
+    assert "[N=100]" in bench.format_result(result('gravity.apply', 100, 1e-3))
+    assert "skipped: no display" in bench.format_result({'name': 'graph', 'n': None, 'skipped': "no display"})
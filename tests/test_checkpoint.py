@@ -0,0 +1,81 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from mechanics import (Universe, ArrayUniverse, Particle, Gravity, Coords, Velocity, Leapfrog, BlockTimestep,
+                       checkpoint)
+from mechanics.vectors import Force
+
+
+def two_bodies(cls=ArrayUniverse, **kwargs):
+    universe = cls([Gravity(6.67408e-11)], [
+        Particle("Earth", 5.972e24, colour="blue"),
+        Particle("Moon", 7.348e22, Coords(384.4e6, 0, 0), Velocity(1022, 0), colour="grey"),
+    ], **kwargs)
+    universe.TICK_LENGTH = 600
+    return universe
+
+
+def test_round_trip_carries_on_identically(tmp_path):
+    path = str(tmp_path / 'run.ckpt')
+    universe = two_bodies(integrator=BlockTimestep())
+    for _ in range(10):
+        universe.tick()
+    checkpoint.save(universe, path, "Lunar", speed=2)
+    resumed, header = checkpoint.load(path)
+    assert header['name'] == "Lunar" and header['extra'] == {'speed': 2}
+    assert resumed.time == universe.time and resumed.TICK_LENGTH == 600
+    assert [particle.name for particle in resumed.particles] == ["Earth", "Moon"]
+    for _ in range(10):
+        universe.tick()
+        resumed.tick()
+    np.testing.assert_array_equal(resumed.state.positions, universe.state.positions)
+    np.testing.assert_array_equal(resumed.state.velocities, universe.state.velocities)
+    assert not os.path.exists(path + '.tmp')
+
+
+def test_plain_universes_keep_their_time(tmp_path):
+    path = str(tmp_path / 'plain.ckpt')
+    universe = two_bodies(Universe)
+    universe.tick()
+    checkpoint.save(universe, path)
+    resumed, _ = checkpoint.load(path)
+    assert type(resumed) is Universe
+    assert resumed.time == universe.time == 600
+    assert resumed.particles[1].position.components == pytest.approx(universe.particles[1].position.components)
+
+
+@pytest.mark.parametrize('cls', [Universe, ArrayUniverse])
+def test_empty_universes(tmp_path, cls):
+    path = str(tmp_path / 'empty.ckpt')
+    checkpoint.save(cls([Gravity(1.0)]), path)
+    resumed, _ = checkpoint.load(path)
+    assert type(resumed) is cls and not resumed.particles
+
+
+def test_forces_still_to_be_applied_are_kept(tmp_path):
+    path = str(tmp_path / 'pushed.ckpt')
+    universe = two_bodies(integrator=Leapfrog())
+    universe.particles[1].apply_force(Force.from_components(1e20, 0, 0))
+    checkpoint.save(universe, path)
+    resumed, _ = checkpoint.load(path)
+    universe.tick()
+    resumed.tick()
+    np.testing.assert_array_equal(resumed.state.velocities, universe.state.velocities)
+
+
+class Malicious:
+    def __reduce__(self):
+        return os.system, ('echo unsafe',)
+
+
+def test_unexpected_classes_are_refused(tmp_path):
+    path = str(tmp_path / 'bad.ckpt')
+    header = pickle.dumps({'version': checkpoint.VERSION, 'names': [], 'payload': Malicious()})
+    header += b'\0' * (-(checkpoint.PREAMBLE.size + len(header)) % 8)
+    with open(path, 'wb') as file:
+        file.write(checkpoint.PREAMBLE.pack(checkpoint.MAGIC, len(header)) + header)
+    with pytest.raises(ValueError, match="unexpected header"):
+        checkpoint.load(path)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from mechanics import ArrayUniverse, Gravity, ConservationMonitor, Leapfrog, VelocityVerlet, kernels
+from mechanics.barneshut import BarnesHutGravity
+from mechanics.mesh import MeshGravity
+from mechanics.parallel import ParallelGravity
+from mechanics.state import ParticleState
+
+
+def cluster(count=400, seed=2):
+    random = np.random.default_rng(seed)
+    return ParticleState(random.uniform(1, 2, count), random.normal(size=(count, 3)),
+                         random.normal(size=(count, 3)) * 0.01)
+
+
+@pytest.mark.parametrize('field, tolerance', [
+    (Gravity(1.0), 1e-12),
+    (BarnesHutGravity(1.0, theta=0), 1e-12),
+    (BarnesHutGravity(1.0, theta=0.5), 1e-3),
+    (MeshGravity(1.0, cells=64), 1e-2),
+])
+def test_fields_potential_energy(field, tolerance):
+    state = cluster()
+    exact = kernels.potential_energy(state.positions, state.masses, 1.0)
+    universe = ArrayUniverse.from_state(state, fields=[field])
+    field.wants_potential = True
+    universe.accelerate()
+    assert field.potential_at(state) == pytest.approx(exact, rel=tolerance)
+    assert field.potential_energy(state) == pytest.approx(exact, rel=tolerance)
+
+
+def test_parallel_potential_energy():
+    state = cluster(100)
+    field = ParallelGravity(1.0, processes=2, serial_below=0)
+    try:
+        field.wants_potential = True
+        ArrayUniverse.from_state(state, fields=[field]).accelerate()
+        exact = kernels.potential_energy(state.positions, state.masses, 1.0)
+        assert field.potential_at(state) == pytest.approx(exact, rel=1e-12)
+        assert field.potential_energy(state) == pytest.approx(exact, rel=1e-12)
+    finally:
+        field.close()
+
+
+def test_approximate_fields_never_take_an_exact_pass(monkeypatch):
+    def exact(*_, **__):
+        raise AssertionError("an exact pass over every pair")
+    monkeypatch.setattr(kernels, 'potential_energy', exact)
+    universe = ArrayUniverse.from_state(cluster(), fields=[BarnesHutGravity(1.0, softening=0.1)], integrator=Leapfrog())
+    universe.TICK_LENGTH = 0.01
+    monitor = ConservationMonitor(every=2).attach(universe)
+    for _ in range(6):
+        universe.tick()
+    assert len(monitor.samples) == 3
+
+
+def test_attaching_and_editing_dont_measure():
+    universe = ArrayUniverse.from_state(cluster(50), fields=[Gravity(1.0, softening=0.1)], integrator=VelocityVerlet())
+    universe.TICK_LENGTH = 0.01
+    monitor = ConservationMonitor(every=5).attach(universe)
+    assert monitor.reference is None
+    for _ in range(10):
+        universe.tick()
+    assert monitor.reused == 2 and monitor.computed == 0
+    assert monitor.latest['energy_error'] < 1e-3
+    universe.particles[0].mass *= 2
+    universe.touch()
+    universe.tick()
+    assert monitor.reference is None
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from mechanics import (ArrayUniverse, EnsembleUniverse, Particle, Gravity, Coords, Velocity, Leapfrog, Yoshida,
+                       BlockTimestep, checkpoint)
+
+
+def lunar(G=6.67408e-11, integrator=None):
+    universe = ArrayUniverse([Gravity(G)], [
+        Particle("Earth", 5.972e24),
+        Particle("Moon", 7.348e22, Coords(384.4e6, 0, 0), Velocity(1022, 0)),
+        Particle("Satellite", 1e3, Coords(0, 4.2e7, 0), Velocity(3070, 90)),
+    ], integrator=integrator or Leapfrog())
+    universe.TICK_LENGTH = 300
+    return universe
+
+
+@pytest.mark.parametrize('integrator', [Leapfrog, Yoshida])
+def test_members_match_universes_run_by_themselves(integrator):
+    Gs = [6.6e-11, 6.67408e-11, 6.8e-11]
+    universes = [lunar(G, integrator()) for G in Gs]
+    ensemble = EnsembleUniverse.from_universes(universes)
+    for _ in range(50):
+        ensemble.tick()
+        for universe in universes:
+            universe.tick()
+    for index, universe in enumerate(universes):
+        member = ensemble.member(index)
+        assert member.time == universe.time
+        np.testing.assert_allclose(member.state.positions, universe.state.positions, rtol=1e-12)
+        np.testing.assert_allclose(member.state.velocities, universe.state.velocities, rtol=1e-12)
+
+
+def test_members_are_copies():
+    ensemble = EnsembleUniverse.from_universe(lunar(), 2)
+    member = ensemble.member(0)
+    member.tick()
+    assert ensemble.time == 0
+    np.testing.assert_array_equal(ensemble.state.positions[0], lunar().state.positions)
+
+
+def test_unsupported_integrators_are_refused():
+    ensemble = EnsembleUniverse.from_universe(lunar(integrator=BlockTimestep()), 2)
+    with pytest.raises(ValueError):
+        ensemble.tick()
+
+
+def test_ensembles_cant_be_checkpointed(tmp_path):
+    ensemble = EnsembleUniverse.from_universe(lunar(), 2)
+    with pytest.raises(ValueError, match="ensemble"):
+        checkpoint.save(ensemble, str(tmp_path / 'ensemble.ckpt'))
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app.experiment import lunar_orbit
+from mechanics import Gravity, Particle, Coords, Yoshida, BlockTimestep
+
+
+def test_a_fork_shares_its_arrays_until_it_changes_them():
+    universe = lunar_orbit().universe
+    fork = universe.fork()
+    assert fork.state.positions is universe.state.positions
+    fork.tick()
+    assert fork.state.positions is not universe.state.positions
+    assert universe.time == 0 and not universe.state.shared and not fork.state.shared
+
+
+@pytest.mark.parametrize('change', ['tick', 'field', 'particle', 'force', 'add', 'remove', 'integrator'])
+def test_changing_a_fork_leaves_the_original_alone(change):
+    universe = lunar_orbit().universe
+    universe.integrator = Yoshida()
+    before = universe.copy()
+    fork = universe.fork()
+    if change == 'tick':
+        fork.tick()
+    elif change == 'field':
+        fork.fields[0].G *= 2
+        fork.accelerate()
+    elif change == 'particle':
+        fork.particles[0].position = Coords(1, 2, 3)
+        fork.particles[1].mass = 1
+    elif change == 'force':
+        fork.particles[0].apply_force(Gravity(1).calculate_force(fork.particles[0], fork.particles[1]))
+        fork.tick()
+    elif change == 'add':
+        fork <<= Particle("Probe", 1.0)
+    elif change == 'remove':
+        fork.remove_particle(fork.particles[0])
+    else:
+        fork.integrator = BlockTimestep()
+        fork.tick()
+    for name in ('masses', 'positions', 'velocities', 'accelerations'):
+        np.testing.assert_array_equal(getattr(universe.state, name), getattr(before.state, name))
+    assert universe.state.external is None
+    assert universe.fields[0].G == before.fields[0].G
+    assert isinstance(universe.integrator, Yoshida)
+    assert [particle.name for particle in universe.particles] == ["Moon", "Earth"]
+
+
+def test_changing_the_original_leaves_its_forks_alone():
+    universe = lunar_orbit().universe
+    forks = [universe.fork() for _ in range(3)]
+    universe.tick()
+    universe.particles[0].mass = 1
+    for fork in forks:
+        np.testing.assert_array_equal(fork.state.masses, [7.342e22, 5.97237e24])
+        assert fork.time == 0
+    # the forks still share with each other
+    assert forks[0].state.positions is forks[1].state.positions
+
+
+def test_forks_run_on_as_the_original_would():
+    universe = lunar_orbit().universe
+    fork = universe.fork()
+    for _ in range(10):
+        universe.tick()
+        fork.tick()
+    np.testing.assert_array_equal(fork.state.positions, universe.state.positions)
@@ -0,0 +1,59 @@
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from app.experiment import lunar_orbit
+from graph import MotionGraphHandler
+
+
+def graph(**options):
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot(111, projection='3d')
+    graph = MotionGraphHandler(lunar_orbit().universe, figure, axes, **options)
+    graph.ensure_lines()
+    graph.fit_all()
+    return graph
+
+
+def run(graph, ticks: int=5):
+    for _ in range(ticks):
+        graph.universe.tick()
+        graph.update_positions()
+
+
+def test_one_collection_draws_every_particle():
+    drawn = graph(collection=True)
+    lines = drawn.collection.lines
+    restyled, segments = [], []
+    set_color, set_segments = lines.set_color, lines.set_segments
+    lines.set_color = lambda colours: restyled.append(colours) or set_color(colours)
+    lines.set_segments = lambda given: segments.append(given) or set_segments(given)
+    run(drawn)
+    assert len(segments) == 5 and len(segments[-1]) == 2
+    for segment, trail in zip(segments[-1], drawn.lines):
+        np.testing.assert_allclose(segment, trail.visible())
+    np.testing.assert_allclose(drawn.collection.markers.get_offsets(), drawn.universe.state.positions[:, :2])
+    # colours are only passed on once, until something changes
+    assert len(restyled) == 1
+    drawn.lines[0].colour = "red"
+    run(drawn, 1)
+    assert len(restyled) == 2 and restyled[-1][0] == "red"
+
+
+def test_blitting_only_draws_everything_when_the_view_changes():
+    drawn = graph(blit=True)
+    full = []
+    draw = drawn.figure.canvas.draw
+    drawn.figure.canvas.draw = lambda: full.append(None) or draw()
+    drawn.redraw()
+    assert len(full) == 1 and drawn._background is not None
+    run(drawn, 3)
+    drawn.redraw()
+    drawn.redraw()
+    assert len(full) == 1
+    drawn.axes.view_init(elev=10, azim=20)
+    drawn.redraw()
+    assert len(full) == 2
+    # the trails and markers are left out of the background
+    assert all(line.line.get_animated() for line in drawn.lines)
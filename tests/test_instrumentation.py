@@ -0,0 +1,68 @@
+import types
+
+import pytest
+
+from mechanics import instrumentation
+from mechanics.instrumentation import RollingHistogram, BINS
+from app.experiment import lunar_orbit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=0.0)
+    monkeypatch.setattr(instrumentation, 'time', types.SimpleNamespace(perf_counter=lambda: clock.now))
+    monkeypatch.setattr(instrumentation, 'enabled', True)
+    monkeypatch.setattr(instrumentation, '_phases', {})
+    return clock
+
+
+def test_nested_entries_are_timed_by_themselves(clock):
+    outer = instrumentation.phase('test.nested')
+    with outer:
+        clock.now += 1
+        with instrumentation.phase('test.nested'):
+            clock.now += 2
+        clock.now += 4
+    assert sorted(outer.histogram.recent) == [2, 7]
+
+
+def test_hooks_are_told_each_duration(clock):
+    heard = []
+    hook = lambda name, seconds: heard.append((name, seconds))
+    instrumentation.add_hook(hook)
+    try:
+        with instrumentation.phase('test.hooked'):
+            clock.now += 0.5
+    finally:
+        instrumentation.remove_hook(hook)
+    assert heard == [('test.hooked', 0.5)]
+
+
+def test_nothing_is_timed_unless_enabled(clock, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'enabled', False)
+    with instrumentation.phase('test.disabled'):
+        clock.now += 1
+    assert instrumentation.timings() == {}
+
+
+def test_ticks_time_each_phase(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'enabled', True)
+    monkeypatch.setattr(instrumentation, '_phases', {})
+    universe = lunar_orbit().universe
+    for _ in range(3):
+        universe.tick()
+    timings = instrumentation.timings()
+    assert timings['integrate']['count'] == 3
+    assert timings['field.Gravity']['count'] == 3
+    assert "integrate" in instrumentation.format_timings()
+
+
+def test_the_histogram_rolls_over():
+    histogram = RollingHistogram(window=4)
+    for seconds in (1e-6, 1e-6, 1e-3, 1e-3, 1.0, 1.0):
+        histogram.add(seconds)
+    assert len(histogram) == 4 and histogram.count == 6
+    assert histogram.counts.sum() == 4
+    assert histogram.summary()['max'] == 1.0
+    # accurate to a bin
+    assert 1e-3 <= histogram.percentile(40) <= 1e-3 * BINS[1] / BINS[0]
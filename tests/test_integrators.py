@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from mechanics import Universe, ArrayUniverse, Particle, Gravity, Coords, Velocity, conservation, kepler, \
+    Euler, Leapfrog, VelocityVerlet, Yoshida, BlockTimestep, WisdomHolman
+from mechanics.vectors import Force
+
+
+def solar(integrator, tick_length=3600.0):
+    # the Sun with two planets, Earth-like and Jupiter-like, on circular orbits
+    universe = ArrayUniverse([Gravity(6.67408e-11)], [
+        Particle("Sun", 1.989e30),
+        Particle("Earth", 5.972e24, Coords(1.496e11, 0, 0), Velocity(29780, 0)),
+        Particle("Jupiter", 1.898e27, Coords(0, 7.785e11, 0), Velocity(13070, 90)),
+    ], integrator=integrator)
+    universe.TICK_LENGTH = tick_length
+    return universe
+
+
+def energy(universe) -> float:
+    return float(conservation.measure(universe)['energy'])
+
+
+def test_wisdom_holman_follows_a_lone_orbit_exactly():
+    universe = ArrayUniverse([Gravity(6.67408e-11)], [
+        Particle("Sun", 1.989e30),
+        Particle("Earth", 1.0, Coords(1.496e11, 0, 0), Velocity(29780, 0)),
+    ], integrator=WisdomHolman())
+    universe.TICK_LENGTH = 86400 * 10
+    start = energy(universe)
+    for _ in range(100):
+        universe.tick()
+    assert energy(universe) == pytest.approx(start, rel=1e-9)
+
+
+def test_kepler_drift_against_small_steps():
+    mu = 1.0
+    position, velocity = np.array([[1.0, 0, 0]]), np.array([[0, 1.2, 0.1]])
+    drifted, _ = kepler.drift(position.copy(), velocity.copy(), mu, 2.5)
+    steps = 200000
+    p, v = position[0].copy(), velocity[0].copy()
+    dt = 2.5 / steps
+    for _ in range(steps):
+        p += 0.5 * dt * v
+        v -= dt * mu * p / np.linalg.norm(p)**3
+        p += 0.5 * dt * v
+    np.testing.assert_allclose(drifted[0], p, atol=1e-6)
+
+
+def test_wisdom_holman_notices_edits():
+    universe = solar(WisdomHolman(), 86400)
+    universe.tick()
+    universe.fields[0].G *= 1.1
+    universe.touch()
+    fresh = universe.copy()
+    fresh.integrator = WisdomHolman()
+    universe.tick()
+    fresh.tick()
+    np.testing.assert_allclose(universe.state.velocities, fresh.state.velocities, rtol=1e-12)
+
+
+@pytest.mark.parametrize('integrator', [Euler, Leapfrog, VelocityVerlet, Yoshida, BlockTimestep, WisdomHolman])
+def test_a_force_from_outside_lasts_one_tick(integrator):
+    universe = ArrayUniverse([Gravity(6.67408e-11)], [Particle("Probe", 2.0)], integrator=integrator())
+    universe.particles[0].apply_force(Force.from_components(4.0, 0, 0))
+    universe.tick()
+    universe.tick()
+    # 2 m/s² for the first 100 s tick, then coasting at 200 m/s
+    assert universe.particles[0].velocity.components == pytest.approx((200, 0, 0))
+    assert universe.particles[0].position.components == pytest.approx((10000 + 20000, 0, 0))
+    assert universe.state.external is None
+
+
+def test_a_plain_universe_cant_have_an_integrator():
+    with pytest.raises(ValueError):
+        Universe().integrator = Leapfrog()
+
+
+@pytest.mark.parametrize('integrator, bound', [
+    (Euler, 1e-2), (Leapfrog, 1e-8), (VelocityVerlet, 1e-8), (Yoshida, 1e-12), (BlockTimestep, 1e-8), (WisdomHolman, 1e-8),
+])
+def test_energy_is_conserved(integrator, bound):
+    universe = solar(integrator(), 86400)
+    start = energy(universe)
+    for _ in range(2 * 365):
+        universe.tick()
+    assert abs(energy(universe) - start) < bound * abs(start)
+
+
+def test_block_timestep_notices_edits():
+    universe = solar(BlockTimestep(), 86400)
+    universe.tick()
+    universe.fields[0].G *= 1.1
+    universe.touch()
+    fresh = universe.copy()
+    fresh.integrator = BlockTimestep()
+    universe.tick()
+    fresh.tick()
+    np.testing.assert_allclose(universe.state.velocities, fresh.state.velocities, rtol=1e-12)
+
+
+def test_block_timestep_can_refine_partway_through_a_tick():
+    class Refining(BlockTimestep):
+        chosen = 0
+
+        def level_for(self, timescales, dt):
+            # level 1 to start with, then level 3 from halfway through the first tick
+            self.chosen += 1
+            return np.full(len(timescales), 1 if self.chosen == 1 else 3)
+
+    universe = solar(Refining(levels=3), 86400)
+    evaluations = []
+    accelerate = universe.accelerate
+    universe.accelerate = lambda active=None: evaluations.append(active) or accelerate(active)
+    universe.tick()
+    # two to start, one halfway through, then four more of an eighth of the tick each
+    assert len(evaluations) == 2 + 1 + 4
+    assert list(universe.integrator.particle_levels) == [3, 3, 3]
+
+
+def lunar(integrator, tick_length):
+    universe = ArrayUniverse([Gravity(6.67408e-11)], [
+        Particle("moon", 7.342e22, Coords(384.4e6, 0, 34.6e6), Velocity(1022, 0)),
+        Particle("earth", 5.97237e24),
+    ], integrator=integrator)
+    universe.TICK_LENGTH = tick_length
+    for _ in range(round(30 * 86400 / tick_length)):
+        universe.tick()
+    return universe.state.positions
+
+
+def test_block_timestep_beats_leapfrog_at_the_same_tick():
+    exact = lunar(Yoshida(), 1800)
+    leapfrog = np.linalg.norm(lunar(Leapfrog(), 21600) - exact, axis=1)
+    block = np.linalg.norm(lunar(BlockTimestep(), 21600) - exact, axis=1)
+    assert np.all(block < leapfrog / 4)
@@ -0,0 +1,71 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from mechanics import kernels
+
+
+def direct(positions, masses, G, softening=0):
+    # the textbook double loop, to check the tiled kernels against
+    accelerations = np.zeros_like(positions)
+    potential = 0.0
+    for i in range(len(masses)):
+        for j in range(len(masses)):
+            if i == j:
+                continue
+            separation = positions[j] - positions[i]
+            distance = np.sqrt(separation @ separation + softening**2)
+            accelerations[i] += G * masses[j] * separation / distance**3
+            if j > i:
+                potential -= G * masses[i] * masses[j] / distance
+    return accelerations, potential
+
+
+@pytest.fixture
+def particles():
+    random = np.random.default_rng(1)
+    return random.normal(size=(37, 3)), random.uniform(1, 2, 37)
+
+
+@pytest.mark.parametrize('block_size', [1, 5, 16, 512])
+@pytest.mark.parametrize('softening', [0, 0.1])
+def test_accelerations_match_direct_summation(particles, block_size, softening):
+    positions, masses = particles
+    expected, expected_potential = direct(positions, masses, 2.0, softening)
+    potential = np.zeros(())
+    accelerations = kernels.accelerations(positions, masses, 2.0, softening, block_size, potential=potential)
+    np.testing.assert_allclose(accelerations, expected, rtol=1e-10, atol=1e-12)
+    assert potential == pytest.approx(expected_potential, rel=1e-12)
+    assert kernels.potential_energy(positions, masses, 2.0, softening, block_size) == \
+        pytest.approx(expected_potential, rel=1e-12)
+
+
+def test_target_accelerations_match_direct_summation(particles):
+    positions, masses = particles
+    expected, _ = direct(positions, masses, 2.0)
+    targets = np.array([3, 0, 36, 17])
+    np.testing.assert_allclose(kernels.target_accelerations(positions, masses, targets, 2.0, block_size=7),
+                               expected[targets], rtol=1e-10)
+
+
+def test_ensembles_match_each_member(particles):
+    positions, masses = particles
+    stacked_positions = np.stack([positions, positions * 2, positions + 1])
+    stacked_masses = np.stack([masses, masses, masses[::-1]])
+    G = np.array([1.0, 2.0, 3.0])
+    potential = np.zeros(3)
+    accelerations = kernels.accelerations(stacked_positions, stacked_masses, G, block_size=8, potential=potential)
+    for member in range(3):
+        expected, expected_potential = direct(stacked_positions[member], stacked_masses[member], G[member])
+        np.testing.assert_allclose(accelerations[member], expected, rtol=1e-10, atol=1e-12)
+        assert potential[member] == pytest.approx(expected_potential, rel=1e-12)
+
+
+def test_no_warnings_outside_an_errstate(particles):
+    positions, masses = particles
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        kernels.accelerations(positions, masses, 1.0, potential=np.zeros(()))
+        kernels.target_accelerations(positions, masses, np.arange(5), 1.0)
+        kernels.potential_energy(positions, masses, 1.0)
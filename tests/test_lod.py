@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from graph.graph import Trail
+from graph.lod import TrailDecimator
+
+
+class Extent:
+    width = height = 100
+
+
+class Axes:
+    """Just enough of a set of 3D axes for `TrailDecimator.cell_size`, with cells 0.1 across"""
+    def get_window_extent(self):
+        return Extent()
+
+    def get_xlim3d(self):
+        return (0, 10)
+
+    get_ylim3d = get_zlim3d = get_xlim3d
+
+
+def check(trail, drawn, size):
+    if not trail.length:
+        assert len(drawn) == 0
+        return
+    np.testing.assert_array_equal(drawn[0], trail.array[0])
+    np.testing.assert_array_equal(drawn[-1], trail.array[-1])
+    # nothing left out is further than a cell's diagonal from a point that is drawn
+    distances = np.linalg.norm(trail.array[:, np.newaxis] - drawn[np.newaxis], axis=2).min(axis=1)
+    assert distances.max() <= size * 3**0.5
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_decimated_trails_start_and_end_where_the_trail_does(seed):
+    random = np.random.default_rng(seed)
+    axes = Axes()
+    trail = Trail(axes, max_length=50, decimator=TrailDecimator())
+    position = np.zeros(3)
+    for _ in range(200):
+        if random.random() < 0.1:
+            trail.truncate(int(random.integers(0, trail.length + 1)))
+        else:
+            for _ in range(random.integers(1, 8)):
+                # mostly small moves, so that many points share a cell
+                position += random.normal(0, 0.03, 3)
+                trail._push(position.copy())
+        check(trail, trail.visible().copy(), trail.decimator.size)
+
+
+def test_first_point_after_truncating_everything():
+    axes = Axes()
+    trail = Trail(axes, xs=[0.0], ys=[0.0], zs=[0.0], max_length=10, decimator=TrailDecimator())
+    trail.visible()
+    trail.truncate(0)
+    # the same cell as the point forgotten, which mustn't stop it being drawn
+    trail._push((0.01, 0, 0))
+    trail._push((5.0, 0, 0))
+    np.testing.assert_array_equal(trail.visible(), [[0.01, 0, 0], [5.0, 0, 0]])
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from mechanics import ArrayUniverse, kernels
+from mechanics.mesh import MeshGravity
+from mechanics.state import ParticleState
+
+
+def cluster(count=2000, seed=5):
+    random = np.random.default_rng(seed)
+    return ParticleState(random.uniform(1, 2, count), random.normal(size=(count, 3)), np.zeros((count, 3)))
+
+
+def test_against_direct_summation():
+    state = cluster()
+    # the mesh can't resolve anything under a cell, so it's compared with softened forces
+    exact = kernels.accelerations(state.positions, state.masses, 1.0, 0.1)
+    approximate = ArrayUniverse.from_state(state, fields=[MeshGravity(1.0, cells=64)]).accelerate()
+    errors = np.linalg.norm(approximate - exact, axis=1) / np.linalg.norm(exact, axis=1)
+    assert np.median(errors) < 0.03
+    assert np.sqrt(np.mean(errors**2)) < 0.1
+
+
+def test_a_distant_pair():
+    state = ParticleState([1.0, 3.0], [[0, 0, 0], [1, 0.5, 0.25]], np.zeros((2, 3)))
+    exact = kernels.accelerations(state.positions, state.masses, 1.0)
+    approximate = ArrayUniverse.from_state(state, fields=[MeshGravity(1.0, cells=32)]).accelerate()
+    np.testing.assert_allclose(approximate, exact, rtol=0.02)
+
+
+def test_momentum_is_conserved():
+    state = cluster(500)
+    accelerations = ArrayUniverse.from_state(state, fields=[MeshGravity(1.0, cells=32)]).accelerate()
+    forces = state.masses[:, np.newaxis] * accelerations
+    assert np.abs(forces.sum(axis=0)).max() < 1e-12 * np.abs(forces).sum()
+
+
+def test_active_particles_get_the_same_forces():
+    state = cluster(300)
+    universe = ArrayUniverse.from_state(state, fields=[MeshGravity(1.0, cells=32)])
+    everything = universe.accelerate().copy()
+    active = np.array([1, 100, 299])
+    np.testing.assert_allclose(universe.accelerate(active)[active], everything[active], rtol=1e-12)
+
+
+def test_a_periodic_box_needs_a_size():
+    with pytest.raises(ValueError):
+        MeshGravity(1.0, periodic=True)
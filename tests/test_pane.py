@@ -0,0 +1,64 @@
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+tkinter = pytest.importorskip('tkinter')
+
+from app.experiment import Experiment
+from graph import MotionGraphHandler
+from mechanics import ArrayUniverse, Gravity, Particle, Coords
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError:
+        pytest.skip("no display")
+    yield root
+    root.destroy()
+
+
+@pytest.fixture
+def pane(root):
+    from app.interface.pane import SimulationPane
+
+    experiment = Experiment("Many", ArrayUniverse([Gravity(6.67408e-11)], [
+        Particle("Body {}".format(index), 1.0, Coords(index, 0, 0)) for index in range(20)
+    ]))
+    universe = experiment.universe.copy()
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    simulation = MotionGraphHandler(universe, figure, figure.add_subplot(111, projection='3d'))
+    simulation.ensure_lines()
+    pane = SimulationPane(root, experiment, universe, simulation, rows=6)
+    pane.sync()
+    return pane
+
+
+def shown(pane):
+    return [pane.universe.particles.index(widget.universe_particle) for widget in pane]
+
+
+def test_only_the_rows_in_view_are_built(pane):
+    assert shown(pane) == list(range(6))
+    assert len(pane.particle_widgets) == 6
+
+
+def test_scrolling_builds_and_puts_away_rows(pane):
+    pane.scroll(tkinter.SCROLL, 1, tkinter.PAGES)
+    assert shown(pane) == list(range(6, 12))
+    assert len(pane.particle_widgets) == 6
+    pane.scroll(tkinter.SCROLL, -1, tkinter.UNITS)
+    assert shown(pane) == list(range(5, 11))
+    # past the end, the last rows are shown
+    pane.scroll(tkinter.MOVETO, 1.0)
+    assert shown(pane) == list(range(14, 20))
+
+
+def test_removing_a_particle_takes_its_row_away(pane):
+    particle = pane.universe.particles[0]
+    pane.universe.remove_particle(particle)
+    pane.sync()
+    assert particle not in pane.particle_widgets
+    assert len(list(pane)) == 6
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from mechanics import ArrayUniverse, kernels
+from mechanics.parallel import ParallelGravity
+from mechanics.state import ParticleState
+
+
+def cluster(count=300, seed=4):
+    random = np.random.default_rng(seed)
+    return ParticleState(random.uniform(1, 2, count), random.normal(size=(count, 3)), np.zeros((count, 3)))
+
+
+@pytest.mark.parametrize('processes, serial_below', [(2, 0), (1, 0), (2, 1000)])
+def test_against_direct_summation(processes, serial_below):
+    state = cluster()
+    exact = kernels.accelerations(state.positions, state.masses, 1.0, 0.01)
+    field = ParallelGravity(1.0, 0.01, processes=processes, serial_below=serial_below)
+    try:
+        universe = ArrayUniverse.from_state(state, fields=[field])
+        np.testing.assert_allclose(universe.accelerate(), exact, rtol=1e-10)
+        active = np.array([0, 7, 299])
+        np.testing.assert_allclose(universe.accelerate(active)[active], exact[active], rtol=1e-10)
+        # the pool is only started when the work is shared out
+        assert (field.pool is None) == field.serial(len(state))
+    finally:
+        field.close()
+
+
+def test_one_process_by_default_on_one_cpu(monkeypatch):
+    monkeypatch.setattr('os.cpu_count', lambda: 1)
+    field = ParallelGravity(1.0)
+    assert field.serial(10**6)
+    assert not ParallelGravity(1.0, processes=4).serial(10**6)
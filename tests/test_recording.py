@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from app.experiment import lunar_orbit
+from mechanics import TrajectoryRecorder, TrajectoryReader, Particle
+
+
+def test_round_trip_across_chunks(tmp_path):
+    path = str(tmp_path / "orbit.rec")
+    universe = lunar_orbit().universe
+    positions, velocities = [], []
+    with TrajectoryRecorder(path, universe, every=2, chunk_frames=3) as recorder:
+        for _ in range(8):
+            recorder.record(universe)
+            positions.append(universe.state.positions.copy())
+            velocities.append(universe.state.velocities.copy())
+            universe.tick()
+            universe.tick()
+
+    reader = TrajectoryReader(path)
+    assert len(reader) == 8
+    assert reader.names == ["Moon", "Earth"] and reader.colours == ["grey", "blue"]
+    np.testing.assert_array_equal(reader.positions, positions)
+    np.testing.assert_array_equal(reader.velocities, velocities)
+    np.testing.assert_array_equal(reader.times, np.arange(8) * 200)
+
+    replayed = reader.universe(5)
+    assert replayed.TICK_LENGTH == 200 and replayed.time == 1000
+    np.testing.assert_array_equal(replayed.state.positions, positions[5])
+    np.testing.assert_array_equal(replayed.state.masses, universe.state.masses)
+    reader.close()
+
+
+def test_a_recording_left_open_can_still_be_read(tmp_path):
+    path = str(tmp_path / "open.rec")
+    universe = lunar_orbit().universe
+    recorder = TrajectoryRecorder(path, universe, chunk_frames=4)
+    for _ in range(6):
+        recorder.record(universe)
+        universe.tick()
+    recorder.flush()
+    # the frame count was written as the first chunk filled and on flushing, but the file wasn't trimmed
+    assert len(TrajectoryReader(path)) == 6
+    recorder.close()
+
+
+def test_particles_cant_change_partway(tmp_path):
+    universe = lunar_orbit().universe
+    with TrajectoryRecorder(str(tmp_path / "changed.rec"), universe) as recorder:
+        recorder.record(universe)
+        universe <<= Particle("Probe", 1.0)
+        with pytest.raises(ValueError):
+            recorder.record(universe)
+
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / "other.rec"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        TrajectoryReader(str(path))
@@ -0,0 +1,63 @@
+import pytest
+
+from app.scheduler import Scheduler
+
+
+class Clock:
+    now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Universe:
+    TICK_LENGTH = 100
+
+    def __init__(self, clock: Clock, cost: float=0.0):
+        self.clock = clock
+        self.cost = cost #real seconds each tick takes
+        self.ticks = 0
+
+    def tick(self, t: int=0):
+        self.ticks += 1
+        self.clock.now += self.cost
+
+
+def test_ticks_keep_up_with_the_rate():
+    clock = Clock()
+    universe = Universe(clock)
+    scheduler = Scheduler(fps=8, clock=clock)
+    # 800 simulated seconds a second is one 100 s tick each eighth of a second
+    assert scheduler.run(universe, 800) == 1
+    for _ in range(9):
+        clock.now += 0.125
+        scheduler.run(universe, 800)
+    assert universe.ticks == 10
+    assert scheduler.speed == pytest.approx(800)
+    assert not scheduler.behind
+
+
+def test_a_slow_frame_carries_over_what_it_owes():
+    clock = Clock()
+    universe = Universe(clock, cost=0.02)
+    scheduler = Scheduler(fps=10, budget=0.5, max_lag=1, clock=clock)
+    # 5000 s owed each frame, but only 0.05 s to tick in, so just 3 ticks (the last starting at 0.04 s)
+    assert scheduler.run(universe, 50000) == 3
+    assert scheduler.behind
+    assert scheduler.owed == pytest.approx(5000 - 300)
+
+
+def test_what_is_owed_is_capped():
+    clock = Clock()
+    universe = Universe(clock, cost=1.0)
+    scheduler = Scheduler(fps=10, budget=0.5, max_lag=0.5, clock=clock)
+    for _ in range(20):
+        scheduler.run(universe, 1000)
+    assert scheduler.owed <= 1000 * 0.5
+    scheduler.reset()
+    assert scheduler.owed == 0
+
+
+def test_interval():
+    assert Scheduler(fps=30).interval == 33
+    assert Scheduler(fps=5000).interval == 1
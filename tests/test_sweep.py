@@ -0,0 +1,72 @@
+import textwrap
+import time
+
+import pytest
+
+from gravity import cli, sweep
+from gravity.sweep import Sweep, grid, key, completed, run_one
+
+EXPERIMENTS = '''
+import time
+
+from app.experiment import Experiment
+from mechanics import ArrayUniverse, Gravity, Particle
+
+
+class SlowGravity(Gravity):
+    def apply(self, universe, active=None):
+        time.sleep(2)
+        super().apply(universe, active)
+
+
+def still():
+    return Experiment("Still", ArrayUniverse([Gravity(6.67408e-11)], [Particle("Alone", 1.0)]))
+
+
+def slow():
+    return Experiment("Slow", ArrayUniverse([SlowGravity(6.67408e-11)], [Particle("Alone", 1.0)]))
+'''
+
+
+@pytest.fixture
+def experiments(tmp_path):
+    path = tmp_path / "experiments.py"
+    path.write_text(textwrap.dedent(EXPERIMENTS))
+    return str(path)
+
+
+def test_grid_and_key():
+    runs = grid({'G': [1, 2], 'tick_length': [10]})
+    assert runs == [{'G': 1, 'tick_length': 10}, {'G': 2, 'tick_length': 10}]
+    assert key({'b': 1, 'a': 2}) == key({'a': 2, 'b': 1})
+
+
+def test_resuming_only_does_the_runs_missing(tmp_path):
+    results = str(tmp_path / "results.jsonl")
+    runs = grid({'tick_length': [60, 120]})
+    assert Sweep('lunar-orbit', runs, results, ticks=3, processes=2).run() == 2
+    more = runs + [{'tick_length': 240}, {'tick_length': 60}]
+    again = Sweep('lunar-orbit', more, results, ticks=3, processes=2)
+    assert again.already() == 2
+    assert again.remaining() == [{'tick_length': 240}]
+    assert again.run() == 1
+    done = completed(results)
+    assert sorted(done) == sorted(key(overrides) for overrides in more[:3])
+    assert all(result['status'] == 'ok' and result['ticks'] == 3 for result in done.values())
+
+
+def test_a_run_stuck_in_a_tick_is_killed(tmp_path, experiments, monkeypatch):
+    monkeypatch.setattr(sweep, 'GRACE', 0.2)
+    results = str(tmp_path / "results.jsonl")
+    start = time.monotonic()
+    Sweep(experiments + ":slow", [{}], results, ticks=10, timeout=0.1).run()
+    assert time.monotonic() - start < 2
+    result, = completed(results).values()
+    assert result['status'] == 'timeout' and 'Killed' in result['error']
+
+
+def test_reporting_a_universe_with_no_energy(experiments, capsys):
+    result = run_one(experiments + ":still", {}, 2, None, None)
+    assert result['energy_error'] is None
+    cli._report(dict(result, key=key({}), status='ok'))
+    assert capsys.readouterr().out.rstrip().endswith("energy error n/a")
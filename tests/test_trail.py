@@ -0,0 +1,31 @@
+import numpy as np
+
+from graph.graph import Trail
+
+
+def test_keeps_the_newest_points_in_order():
+    trail = Trail(None, max_length=4)
+    for index in range(10):
+        trail._push((index, 2 * index, 3 * index))
+        expected = np.arange(max(0, index - 3), index + 1)
+        np.testing.assert_array_equal(trail.xs, expected)
+        np.testing.assert_array_equal(trail.zs, 3 * expected)
+        np.testing.assert_array_equal(trail.newest, (index, 2 * index, 3 * index))
+    assert trail.length == 4 and trail.pushed == 10
+
+
+def test_the_points_are_a_view_of_the_buffer():
+    trail = Trail(None, [1, 2, 3], [4, 5, 6], [7, 8, 9], max_length=3)
+    trail._push((0, 0, 0))
+    assert np.shares_memory(trail.array, trail._buffer)
+    assert list(trail.points) == [(2, 5, 8), (3, 6, 9), (0, 0, 0)]
+
+
+def test_truncating():
+    trail = Trail(None, range(5), range(5), range(5), max_length=5)
+    trail.truncate(2)
+    np.testing.assert_array_equal(trail.xs, [3, 4])
+    trail._push((5, 5, 5))
+    np.testing.assert_array_equal(trail.xs, [3, 4, 5])
+    trail.truncate(0)
+    assert len(trail.array) == 0
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from mechanics import Universe, ArrayUniverse, Particle, Gravity, Coords, Velocity
+
+
+def particles():
+    return [
+        Particle("Sun", 1.989e30),
+        Particle("Earth", 5.972e24, Coords(1.496e11, 0, 0), Velocity(29780, 0)),
+        Particle("Mars", 6.417e23, Coords(0, 2.279e11, 1e9), Velocity(24070, 90)),
+    ]
+
+
+def test_particles_are_views_of_the_state():
+    universe = ArrayUniverse([Gravity(6.67408e-11)], particles())
+    earth = universe.particles[1]
+    assert earth.position.components == tuple(universe.state.positions[1])
+    earth.position = Coords(1, 2, 3)
+    np.testing.assert_array_equal(universe.state.positions[1], [1, 2, 3])
+    universe.state.velocities[1] = [4, 5, 6]
+    assert earth.velocity.components == (4, 5, 6)
+
+
+def test_adding_and_removing_particles():
+    universe = ArrayUniverse([Gravity(6.67408e-11)], particles())
+    earth, mars = universe.particles[1:]
+    universe.remove_particle(earth)
+    assert earth.state is None and earth.mass == 5.972e24
+    assert len(universe.state) == 2 and mars.index == 1
+    assert mars.position.components == tuple(universe.state.positions[1])
+    moon = Particle("Moon", 7.342e22, Coords(1, 1, 1))
+    universe <<= moon
+    assert moon.index == 2 and universe.state.masses[2] == 7.342e22
+    with pytest.raises(ValueError):
+        ArrayUniverse([], [moon])
+
+
+def test_ticks_match_a_plain_universe():
+    plain = Universe([Gravity(6.67408e-11)], particles())
+    array = ArrayUniverse([Gravity(6.67408e-11)], particles())
+    for universe in (plain, array):
+        for _ in range(500):
+            universe.tick()
+    for before, after in zip(plain.particles, array.particles):
+        np.testing.assert_allclose(after.position.components, before.position.components, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(after.velocity.components, before.velocity.components, rtol=1e-9, atol=1e-9)
+    assert array.time == plain.time == 500 * Universe.TICK_LENGTH
@@ -0,0 +1,55 @@
+import copy
+
+import pytest
+
+from mechanics import Coords, Velocity
+from mechanics.vectors import Acceleration, Direction, Displacement, Force
+
+
+def test_polar_and_components_agree():
+    velocity = Velocity(10, Direction(30, 20))
+    again = Velocity.from_components(*velocity.components)
+    assert again.magnitude == pytest.approx(10)
+    assert again.direction.plane == pytest.approx(30)
+    assert again.direction.z == pytest.approx(20)
+
+
+def test_the_cached_direction_cant_be_changed_from_outside():
+    direction = Direction(45)
+    velocity = Velocity(1, direction)
+    direction.plane = 90
+    velocity.direction.plane = 180
+    assert velocity.direction.plane == pytest.approx(45)
+    velocity.x = 0
+    assert velocity.direction.plane == pytest.approx(0)
+
+
+def test_copies_are_separate():
+    velocity = Velocity(5, 90)
+    copied = copy.copy(velocity)
+    copied.y = 3
+    assert velocity.components == pytest.approx((5, 0, 0), abs=1e-12)
+    assert copied.magnitude == pytest.approx(34**0.5)
+
+
+def test_arithmetic_keeps_the_class():
+    total = Velocity.from_components(1, 2, 3) + Velocity.from_components(1, 1, 1) * 2
+    assert isinstance(total, Velocity) and total.components == (3, 4, 5)
+    assert (-total).components == (-3, -4, -5)
+    force = Force.from_components(2, 4, 6)
+    assert force.to_acceleration(2).components == (1, 2, 3)
+
+
+def test_displacement_under_acceleration():
+    acceleration = Acceleration.from_components(2, 0, 0)
+    assert acceleration.to_displacement(3).components == (9, 0, 0)
+    moved = acceleration.to_displacement(3, Velocity.from_components(0, 1, 0))
+    assert isinstance(moved, Displacement) and moved.components == (9, 3, 0)
+    # with no starting velocity given, nothing is left over from the call before
+    assert acceleration.to_displacement(1).components == (1, 0, 0)
+
+
+def test_coords():
+    start = Coords(1, 2, 3)
+    assert start.distance_to(Coords(1, 2, 8)) == 5
+    assert (start + Displacement.from_components(1, 1, 1)).components == (2, 3, 4)
@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+
+from app.experiment import lunar_orbit
+from app.worker import SnapshotBuffers, SimulationWorker, SLOTS
+
+
+def universe():
+    return lunar_orbit().universe
+
+
+def test_snapshots_are_copied_in_and_out():
+    source, target = universe(), universe()
+    buffers = SnapshotBuffers(len(source.state))
+    try:
+        for _ in range(SLOTS + 1):
+            source.tick()
+            buffers.publish(source)
+        assert buffers.sequence == SLOTS + 1
+        assert buffers.read(target)
+        np.testing.assert_array_equal(target.state.positions, source.state.positions)
+        assert target.time == source.time
+        # the universe's arrays are its own, not views of the buffers
+        target.state.positions += 1
+        assert not np.array_equal(buffers.positions[buffers.latest], target.state.positions)
+    finally:
+        buffers.close()
+        buffers.memory.unlink()
+
+
+def test_a_snapshot_being_written_isnt_read():
+    source = universe()
+    buffers = SnapshotBuffers(len(source.state))
+    try:
+        buffers.publish(source)
+        buffers.sequences[buffers.latest] += 1 # as if the worker were writing to it
+        assert not buffers.read(universe())
+    finally:
+        buffers.close()
+        buffers.memory.unlink()
+
+
+def wait_for(condition, timeout: float=10):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end
+        time.sleep(0.01)
+
+
+def test_the_worker_runs_the_universe_and_takes_edits():
+    local = universe()
+    worker = SimulationWorker(local, rate=1e6, fps=100)
+    try:
+        worker.play()
+        wait_for(lambda: worker.follow(local) or local.time > 0)
+        # an edit is sent to the worker, which carries on from it
+        local.particles[0].mass *= 2
+        local.touch()
+        worker.follow(local)
+        sent = local.time
+        wait_for(lambda: worker.follow(local) or local.time > sent)
+        worker.pause()
+    finally:
+        worker.stop(local)
+    assert local.state.masses[0] == 2 * 7.342e22
+    assert not worker.process.is_alive()